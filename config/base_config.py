@@ -1,10 +1,15 @@
 from paddle.static import InputSpec
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from paddlenlp.utils.log import logger
 
 entity_type = ["精神慰撫金額", "醫療費用", "薪資收入"]
 
+# Chunks matching none of the patterns of an entity type are skipped by the candidate prefilter (--is_prefilter_candidates).
+entity_candidate_patterns: Dict[str, List[str]] = {
+    entity: [r"\d", r"[元圓]", r"[一二兩三四五六七八九十壹貳參肆伍陸柒捌玖拾][百千萬億佰仟]"] for entity in entity_type
+}
+
 UIE_input_spec = [
     InputSpec(shape=[None, None], dtype="int64", name="input_ids"),
     InputSpec(shape=[None, None], dtype="int64", name="token_type_ids"),
@@ -75,6 +80,37 @@ class TrainModelArguments:
         },
     )
 
+    chunk_overlap: int = field(
+        default=0,
+        metadata={
+            "help": "Number of characters shared by adjacent chunks (sliding window). 0 means disjoint chunks, "
+            "where an entity across a chunk boundary moves to the next chunk."
+        },
+    )
+
+    is_chunk_by_sentence: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to pack whole clauses (ending with 。；，！？：) into each chunk and only cut inside a clause "
+            "longer than a chunk. Cannot be combined with chunk_overlap. Defaults to False."
+        },
+    )
+
+    is_chunk_by_token: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to size chunks by the tokenizer (max_seq_len tokens) instead of characters, so that no chunk "
+            "is truncated and each chunk is filled up. Cannot be combined with chunk_overlap or is_chunk_by_sentence. Defaults to False."
+        },
+    )
+
+    is_dynamic_padding: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to pad each batch to its longest chunk instead of padding every chunk to max_seq_len. Defaults to False."
+        },
+    )
+
 
 @dataclass
 class TrainDataArguments:
@@ -109,6 +145,65 @@ class TrainDataArguments:
         metadata={"help": "Path to directory to store the exported inference model."},
     )
 
+    dataset_cache_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of the tokenized dataset cache (memory-mapped arrays keyed by the data file, tokenizer, max_seq_len "
+            "and chunking settings). If None, data is tokenized on every run."
+        },
+    )
+
+    is_streaming: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to read, shuffle and tokenize chunks on the fly instead of loading every chunk into memory, so that "
+            "memory does not grow with the data. max_steps is counted from the training data if not set. Cannot be combined "
+            "with dataset_cache_dir, is_group_by_length or negative_ratio. Defaults to False."
+        },
+    )
+
+    shuffle_buffer_size: int = field(
+        default=10000,
+        metadata={
+            "help": "Number of chunks kept in memory to shuffle the training data when is_streaming is enabled. "
+            "Should be much larger than the number of chunks per document."
+        },
+    )
+
+    is_batched_tokenization: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to tokenize all chunks up front with many chunks per tokenizer call instead of lazily one chunk at "
+            "a time. Faster, but every tokenized chunk is kept in memory. dataset_cache_dir and is_streaming always tokenize "
+            "in blocks. Defaults to False."
+        },
+    )
+
+    is_group_by_length: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to batch chunks of similar length together to reduce padding (single device only). "
+            "Best combined with is_dynamic_padding. Defaults to False."
+        },
+    )
+
+    negative_ratio: Optional[float] = field(
+        default=None,
+        metadata={
+            "help": "Number of chunks without results sampled per chunk with results in each training epoch (re-sampled every epoch "
+            "with the training seed, single device only). None uses all chunks. Defaults to None."
+        },
+    )
+
+    is_accumulate_metrics: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to accumulate span counts batch by batch during evaluation instead of gathering the probabilities "
+            "and labels of the whole eval set for compute_metrics (single device only). Metrics are identical, but "
+            "evaluate/predict return no predictions. Defaults to False."
+        },
+    )
+
 
 @dataclass
 class EvaluationArguments(TrainModelArguments):
@@ -135,6 +230,65 @@ class EvaluationArguments(TrainModelArguments):
         },
     )
 
+    is_eval_by_document: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to score spans at the document level: chunk predictions are mapped back to document offsets, "
+            "deduplicated and compared with the original result_list. Cannot be combined with dataset_cache_dir or "
+            "is_group_by_length. Defaults to False."
+        },
+    )
+
+    is_prefilter_candidates: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to skip chunks matching none of the entity_candidate_patterns of their prompt (see "
+            "config/base_config.py) instead of running the model on them. Logs the fraction of skipped chunks and the "
+            "labeled results inside them (estimated recall loss). Defaults to False."
+        },
+    )
+
+    eval_checkpoints: List[str] = field(
+        default=None,
+        metadata={
+            "help": "Model directories to evaluate one after another with the same tokenized data. A directory containing "
+            "checkpoint-* subdirectories (e.g. the training output_dir) is expanded to all of them. The tokenizer is loaded "
+            "from model_name_or_path. If None, only model_name_or_path is evaluated."
+        },
+    )
+
+    dataset_cache_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of the tokenized dataset cache (memory-mapped arrays keyed by the data file, tokenizer, max_seq_len "
+            "and chunking settings). If None, data is tokenized on every run."
+        },
+    )
+
+    is_streaming: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to read and tokenize chunks on the fly instead of loading every chunk into memory. "
+            "Cannot be combined with dataset_cache_dir or is_group_by_length. Defaults to False."
+        },
+    )
+
+    is_batched_tokenization: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to tokenize all chunks up front with many chunks per tokenizer call instead of lazily one chunk at "
+            "a time. Faster, but every tokenized chunk is kept in memory. Defaults to False."
+        },
+    )
+
+    is_group_by_length: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to batch chunks of similar length together to reduce padding. "
+            "Best combined with is_dynamic_padding. Defaults to False."
+        },
+    )
+
 
 @dataclass
 class InferenceDataArguments:
@@ -163,6 +317,32 @@ class InferenceDataArguments:
         metadata={"help": "Whether to regularize data (remove special tokens likes \\n). Defaults to False"},
     )
 
+    is_stream_output: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to write one JSON line per document as soon as it is inferred (JSON Lines), instead of one JSON list at the end. Defaults to False."
+        },
+    )
+
+    flush_steps: int = field(
+        default=100,
+        metadata={"help": "Flush the output file every flush_steps documents. Only applied when is_stream_output=True or tabular_layout is set."},
+    )
+
+    is_resume: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to record the progress next to the output file and, on restart, skip the finished documents and append to the output. Only applied when is_stream_output=True and save_dir is set. Defaults to False."
+        },
+    )
+
+    tabular_layout: str = field(
+        default=None,
+        metadata={
+            "help": "Stream inference results into a CSV file instead of JSON: 'doc' (one row per document, one column per entity type) or 'span' (one row per extracted span: doc_id, entity, text, start, end, probability). Only applied when save_dir is set. Defaults to None."
+        },
+    )
+
 
 @dataclass
 class InferenceTaskflowArguments:
@@ -200,6 +380,84 @@ class InferenceTaskflowArguments:
         metadata={"help": "The checkpoint you want to use on inference."},
     )
 
+    is_batch_across_docs: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to group chunks from many documents and all prompts into full batches. Defaults to False."
+        },
+    )
+
+    bucket_size: int = field(
+        default=0,
+        metadata={
+            "help": "Sort every bucket_size pending chunks by length before batching and pad each batch only to its longest chunk. "
+            "0 means file order with padding to max_seq_len. Only applied when is_batch_across_docs=True."
+        },
+    )
+
+    max_seq_len: int = field(
+        default=512,
+        metadata={"help": "The maximum total input sequence length of each chunk ([CLS] prompt [SEP] content [SEP])."},
+    )
+
+    chunk_overlap: int = field(
+        default=0,
+        metadata={
+            "help": "Number of characters shared by adjacent chunks, so that entities across chunk boundaries are "
+            "kept whole. Predictions in the overlaps are merged (max probability). Only applied when is_batch_across_docs=True."
+        },
+    )
+
+    is_chunk_by_sentence: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to pack whole clauses (ending with 。；，！？：) into each chunk instead of cutting every max_seq_len characters. "
+            "Cannot be combined with chunk_overlap. Only applied when is_batch_across_docs=True."
+        },
+    )
+
+    is_chunk_by_token: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to size chunks by the tokenizer (max_seq_len tokens) instead of characters. "
+            "Cannot be combined with chunk_overlap or is_chunk_by_sentence. Only applied when is_batch_across_docs=True."
+        },
+    )
+
+    is_prefilter_candidates: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to skip chunks matching none of the entity_candidate_patterns of the entity type (see "
+            "config/base_config.py) instead of running the model on them. Only applied when is_batch_across_docs=True."
+        },
+    )
+
+    num_workers: int = field(
+        default=1,
+        metadata={
+            "help": "Number of inference processes (designed for CPU, device_id=-1). Each process builds its own Taskflow. Defaults to 1."
+        },
+    )
+
+    num_threads: int = field(
+        default=None,
+        metadata={
+            "help": "Intra-op threads of each Taskflow. Defaults to the available CPU cores divided by num_workers when num_workers > 1."
+        },
+    )
+
+    cache_dir: str = field(
+        default=None,
+        metadata={
+            "help": "Directory of the persistent inference cache (raw Taskflow outputs keyed by text, schema, model and precision). If None, cache is disabled."
+        },
+    )
+
+    cache_max_size_mb: float = field(
+        default=1024,
+        metadata={"help": "Maximum size (MB) of the inference cache. Least recently used results are evicted first."},
+    )
+
 
 @dataclass
 class InferenceStrategyArguments:
@@ -223,3 +481,32 @@ class InferenceStrategyArguments:
             "help": "UIE will output ['text', 'start', 'end', 'probability']. --select_key is to select which key in the list you want to return."
         },
     )
+
+
+@dataclass
+class InferenceServerArguments:
+
+    host: str = field(
+        default="127.0.0.1",
+        metadata={"help": "The host of the inference service."},
+    )
+
+    port: int = field(
+        default=8189,
+        metadata={"help": "The port of the inference service."},
+    )
+
+    max_batch_docs: int = field(
+        default=32,
+        metadata={"help": "Maximum number of documents merged into one micro-batch."},
+    )
+
+    max_wait_ms: float = field(
+        default=10,
+        metadata={"help": "Maximum waiting time (ms) to merge concurrent requests into one micro-batch."},
+    )
+
+    max_queue_size: int = field(
+        default=256,
+        metadata={"help": "Maximum number of pending requests. Requests beyond it are rejected with HTTP 503."},
+    )
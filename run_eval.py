@@ -1,95 +1,176 @@
-from config.base_config import logger, entity_type, EvaluationArguments
+from config.base_config import logger, entity_type, entity_candidate_patterns, EvaluationArguments
 from functools import partial
 import paddle
-from utils.data_utils import read_data_by_chunk, convert_to_uie_format, create_data_loader
-from utils.exceptions import DataError
+from utils.data_utils import (
+    read_data_by_chunk,
+    convert_to_uie_format,
+    convert_to_uie_format_batch,
+    create_data_loader,
+    log_truncation_statistics,
+    log_candidate_filter_statistics,
+    CandidateFilter,
+    UIEDataCollator,
+    StreamingDataset,
+)
+from utils.cache_utils import get_dataset_identity, load_tokenized_dataset
+from utils.model_utils import get_span_counts, get_batch_spans
+import json
 import os
-from paddlenlp.data import DataCollatorWithPadding
 from paddlenlp.datasets import load_dataset
 from paddlenlp.metrics import SpanEvaluator
 from paddlenlp.transformers import UIE, AutoTokenizer
 from paddlenlp.trainer import PdArgumentParser
+from paddlenlp.trainer.trainer_utils import PREFIX_CHECKPOINT_DIR
+import gc
 import numpy as np
-import pandas as pd
+import re
+import time
 from tqdm import tqdm
-from typing import List, Any
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 
-def get_min_word_in_entity_type(entity_type: List[str]) -> int:
-    """取出最短的 entity type 字數，用來區分不同的 entity type。
+@paddle.no_grad()
+def get_progress_bar(data_loader: paddle.io.DataLoader) -> tqdm:
+    """以 tqdm 包裝 data_loader，顯示總 batch 數與剩餘時間；IterableDataset（例如 StreamingDataset）沒有長度，只顯示已處理的 batch 數。"""
+    if isinstance(data_loader.dataset, paddle.io.IterableDataset):
+        # len(DataLoader) raises ValueError for an IterableDataset, its iterator raises TypeError which tqdm accepts.
+        return tqdm(iter(data_loader))
+    return tqdm(data_loader)
 
-    Args:
-        entity_type (List[str]): 所有 entity type 列表。
 
-    Raises:
-        ValueError: 最短的 entity type 字數無法區分不同的 entity type ，重新設定 entity type 或更改區分方法。
+def evaluate_loop_by_class(model, data_loader, entity_type):
+    """分別計算每個 entity type 與全部資料的 precision、recall、F1。
+
+    Note:
+        每筆資料的類別為 read_data_by_chunk(entity_types=entity_type) 加上的 entity_id，
+        每個 batch 只轉換一次 numpy，逐筆的 span 數量（見 get_span_counts）再依 entity_id 加總。
+
+    Args:
+        model (paddle.nn.Layer): UIE model.
+        data_loader (paddle.io.DataLoader): batch 需包含 entity_id（見 UIEDataCollator）。
+        entity_type (List[str]): 所有 entity type 列表，順序與 entity_id 相同。
 
     Returns:
-        int: 可區分不同 entity type 的字數。
+        Tuple[float, float, float]: 全部資料的 precision、recall、F1。
     """
-    min_word = np.min([len(i) for i in entity_type])
-    distinct_entity_type = [i[:min_word] for i in entity_type]
-    if len(pd.unique(distinct_entity_type)) != len(entity_type):
-        raise ValueError(f"Unable to distinguish different entity types. Please adjust entity type or the method.")
-    return min_word
+    counts = np.zeros((len(entity_type), 3), dtype="int64")
+    model.eval()
+    for batch in get_progress_bar(data_loader):
+        entity_ids = batch.pop("entity_id").numpy()
+        start_ids = batch.pop("start_positions").numpy()
+        end_ids = batch.pop("end_positions").numpy()
+        start_prob, end_prob = model(**batch)
+        np.add.at(counts, entity_ids, get_span_counts(start_prob.numpy(), end_prob.numpy(), start_ids, end_ids))
+    for entity, entity_counts in zip(entity_type + ["total"], list(counts) + [counts.sum(axis=0)]):
+        metric = SpanEvaluator()
+        metric.update(*entity_counts)
+        precision, recall, f1 = metric.accumulate()
+        logger.info(f"-----------------{entity}-----------------")
+        logger.info("Evaluation Precision: %.5f | Recall: %.5f | F1: %.5f" % (precision, recall, f1))
+    model.train()
+    return precision, recall, f1
+
 
+def get_checkpoint_paths(paths: List[str]) -> List[str]:
+    """展開要驗證的模型路徑：包含 checkpoint-* 的目錄（如訓練的 output_dir）展開為其中所有 checkpoint（依 step 排序），其餘路徑維持原樣。"""
+    checkpoint_paths = []
+    for path in paths:
+        steps = {}
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                match = re.match(rf"^{PREFIX_CHECKPOINT_DIR}-(\d+)$", name)
+                if match and os.path.isdir(os.path.join(path, name)):
+                    steps[os.path.join(path, name)] = int(match.group(1))
+        checkpoint_paths.extend(sorted(steps, key=steps.get) if steps else [path])
+    return checkpoint_paths
 
-def get_eval_group(min_word: int, inputs: paddle.Tensor, tokenizer: Any) -> np.ndarray:
-    """將 input batch 內的 tensor 依照 min_word 進行分類。
-    UIE input 格式為 [CLS] PROMPT [SEP] CONTENT [SEP] ，因此可以依照 PROMPT 位置進行分類。分類的標準為可區分 entity type 的最小字數。
+
+def log_metrics_table(results: List[Dict[str, float]]) -> None:
+    """將每個 checkpoint 的指標與驗證速度整理成一張表輸出。"""
+    width = max(len("checkpoint"), *(len(result["checkpoint"]) for result in results))
+    logger.info(
+        f"{'checkpoint':<{width}} | precision | recall  | f1      | runtime (s) | samples/s | tokens/s"
+    )
+    for result in results:
+        logger.info(
+            f"{result['checkpoint']:<{width}} | {result['precision']:<9.5f} | {result['recall']:<7.5f} | "
+            f"{result['f1']:<7.5f} | {result['eval_runtime']:<11.2f} | {result['eval_samples_per_second']:<9.2f} | "
+            f"{result['eval_tokens_per_second']:.1f}"
+        )
+
+
+def read_document_results(data_path: str) -> Iterator[Tuple[str, Set[Tuple[int, int]]]]:
+    """逐行讀取資料的 prompt 與 result_list 的 (start, end)，作為文件層級驗證的答案。"""
+    with open(data_path, "r", encoding="utf-8") as f:
+        for line in f:
+            json_line = json.loads(line)
+            yield json_line["prompt"], {(result["start"], result["end"]) for result in json_line["result_list"]}
+
+
+@paddle.no_grad()
+def evaluate_loop_by_document(model, data_loader, dev_file: str, entity_type: Optional[List[str]] = None):
+    """文件層級的驗證：將每個 chunk 預測的 span 還原到原文位置、去除重複後，與原始資料的 result_list 比較。
+
+    Note:
+        data_loader 需依序產生 read_data_by_chunk(is_keep_offset=True) 的 chunk（不可打亂或依長度排序），
+        讀到下一份文件的 chunk 時即結算前面的文件，記憶體用量與資料量無關。
+        span 以 get_batch_spans 對整個 batch 一次解出，只保留 content 內的 span（與 Taskflow 相同，以 offset_mapping 轉回字的位置）。
 
     Args:
-        min_word (int): 可區分不同 entity type 的字數。
-        inputs (paddle.Tensor): 模型的 input_ids (Only UIE fromat)。
-        tokenizer (Any): UIE Tokenizer. 將 input_ids 轉為文字。
+        model (paddle.nn.Layer): UIE model.
+        data_loader (paddle.io.DataLoader): batch 需包含 doc_id、offset、offset_mapping（見 UIEDataCollator）。
+        dev_file (str): 資料路徑，讀取每行的 result_list 作為答案。
+        entity_type (Optional[List[str]], optional): 若提供，分別計算每個 entity type 的指標. Defaults to None.
 
     Returns:
-        np.ndarray: input batch 中，每筆觀測值的類別。
+        Tuple[float, float, float]: 全部資料的 precision、recall、F1。
     """
-    group = tokenizer.convert_ids_to_tokens(np.array(inputs[:, 1 : (min_word + 1)]).flatten())
-    group = [
-        "".join(group)[start:end]
-        for start, end in zip(
-            range(0, len(group), min_word),
-            range(min_word, len(group) + min_word, min_word),
-        )
-    ]
-    return np.array(group)
+    counts = np.zeros((len(entity_type) if entity_type else 0, 3), dtype="int64")
+    total_counts = np.zeros(3, dtype="int64")
+    documents = read_document_results(dev_file)
+    predictions, next_doc = {}, 0
 
+    def finish_documents(until: Optional[int] = None) -> None:
+        nonlocal next_doc
+        for prompt, labels in documents:
+            spans = predictions.pop(next_doc, set())
+            doc_counts = (len(spans & labels), len(spans), len(labels))
+            total_counts[:] += doc_counts
+            if entity_type:
+                counts[entity_type.index(prompt)] += doc_counts
+            next_doc += 1
+            if until is not None and next_doc >= until:
+                return
 
-@paddle.no_grad()
-def evaluate_loop_by_class(model, data_loader, entity_type, tokenizer):
-    metric = {entity: SpanEvaluator() for entity in entity_type + ["total"]}
-    min_word = get_min_word_in_entity_type(entity_type)
-    name_mapping = {entity[:min_word]: entity for entity in entity_type}
     model.eval()
-    for batch in tqdm(data_loader):
-        start_ids = paddle.cast(batch.pop("start_positions"), "float32")
-        end_ids = paddle.cast(batch.pop("end_positions"), "float32")
+    for batch in get_progress_bar(data_loader):
+        doc_ids, offsets = batch.pop("doc_id").numpy(), batch.pop("offset").numpy()
+        offset_mapping = batch.pop("offset_mapping").numpy()
+        for name in ("start_positions", "end_positions", "entity_id"):
+            batch.pop(name, None)
         start_prob, end_prob = model(**batch)
-        eval_group = get_eval_group(min_word, batch["input_ids"], tokenizer)
-        unique_group = pd.unique(eval_group)
-        for each_group in unique_group:
-            if name_mapping[each_group] not in entity_type:
-                raise DataError(
-                    f"Cannot map {name_mapping[each_group]} to {entity_type}, check if the entity type is modified or data is not preprocessed to UIE-input-format."
-                )
-            selected_group = eval_group == each_group
-            num_correct, num_infer, num_label = metric[name_mapping[each_group]].compute(
-                start_prob.numpy()[selected_group, :],
-                end_prob.numpy()[selected_group, :],
-                start_ids.numpy()[selected_group, :],
-                end_ids.numpy()[selected_group, :],
-            )
-            metric[name_mapping[each_group]].update(num_correct, num_infer, num_label)
-        num_correct, num_infer, num_label = metric["total"].compute(start_prob, end_prob, start_ids, end_ids)
-        metric["total"].update(num_correct, num_infer, num_label)
-    for entity in entity_type + ["total"]:
-        precision, recall, f1 = metric[entity].accumulate()
-        logger.info(f"-----------------{entity}-----------------")
-        logger.info("Evaluation Precision: %.5f | Recall: %.5f | F1: %.5f" % (precision, recall, f1))
+        rows, starts, ends = get_batch_spans(start_prob.numpy(), end_prob.numpy())
+        # Content tokens are in the second segment and map to at least one character ([SEP] and padding map to (0, 0)).
+        is_content = batch["token_type_ids"].numpy().astype(bool) & (offset_mapping[:, :, 1] > 0)
+        is_kept = is_content[rows, starts] & is_content[rows, ends]
+        rows, starts, ends = rows[is_kept], starts[is_kept], ends[is_kept]
+        doc_starts = (offset_mapping[rows, starts, 0] + offsets[rows]).tolist()
+        doc_ends = (offset_mapping[rows, ends, 1] + offsets[rows]).tolist()
+        for doc_id, start, end in zip(doc_ids[rows].tolist(), doc_starts, doc_ends):
+            predictions.setdefault(doc_id, set()).add((start, end))
+        if next_doc < doc_ids.min():
+            finish_documents(until=int(doc_ids.min()))
+    finish_documents()
     model.train()
 
+    for entity, entity_counts in zip((entity_type or []) + ["total"], list(counts) + [total_counts]):
+        metric = SpanEvaluator()
+        metric.update(*entity_counts)
+        precision, recall, f1 = metric.accumulate()
+        logger.info(f"-----------------{entity} (document level)-----------------")
+        logger.info("Evaluation Precision: %.5f | Recall: %.5f | F1: %.5f" % (precision, recall, f1))
+    return precision, recall, f1
+
 
 @paddle.no_grad()
 def evaluate_loop(model, data_loader):
@@ -102,7 +183,7 @@ def evaluate_loop(model, data_loader):
     metric = SpanEvaluator()
     model.eval()
     metric.reset()
-    for batch in tqdm(data_loader):
+    for batch in get_progress_bar(data_loader):
         start_ids = paddle.cast(batch.pop("start_positions"), "float32")
         end_ids = paddle.cast(batch.pop("end_positions"), "float32")
         start_prob, end_prob = model(**batch)
@@ -120,39 +201,152 @@ def evaluate(
     max_seq_len: int = 512,
     batch_size: int = 16,
     is_eval_by_class: bool = False,
-):
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    dataset_cache_dir: str = None,
+    is_streaming: bool = False,
+    is_batched_tokenization: bool = False,
+    is_dynamic_padding: bool = False,
+    is_group_by_length: bool = False,
+    is_eval_by_document: bool = False,
+    eval_checkpoints: Optional[List[str]] = None,
+    is_prefilter_candidates: bool = False,
+) -> List[Dict[str, float]]:
+    """驗證模型；eval_checkpoints 有值時只建立一次 DataLoader，依序載入並驗證每個 checkpoint。
+
+    Note:
+        tokenizer 一律由 model_name_or_path 載入，所有 checkpoint 需使用相同的 tokenizer。
+        前一個模型釋放後才載入下一個；多個 checkpoint 共用同一份 tokenize 的結果，
+        只有 is_streaming=True 時每個 checkpoint 都會重新讀取並 tokenize 資料（truncation 的統計只記錄最後一次）。
+        is_prefilter_candidates=True 時，不符合 entity_candidate_patterns 的 chunk 不會送進模型；
+        chunk 層級的指標只包含保留的 chunk，被略過的標註比例另外記錄為 recall 損失的估計（文件層級的指標已包含此損失）。
+
+    Returns:
+        List[Dict[str, float]]: 每個模型的 precision、recall、F1、eval_runtime、eval_samples_per_second 與 eval_tokens_per_second。
+    """
     if not os.path.exists(dev_file):
         raise ValueError(f"Data not found in {dev_file}. Please input the correct path of data.")
+    if (is_streaming or is_eval_by_document) and (dataset_cache_dir or is_group_by_length):
+        raise ValueError(
+            "is_streaming and is_eval_by_document cannot be combined with dataset_cache_dir or is_group_by_length."
+        )
 
     paddle.set_device(device)
+    candidate_filter = CandidateFilter(entity_candidate_patterns) if is_prefilter_candidates else None
 
     tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
-    model = UIE.from_pretrained(model_name_or_path)
+    checkpoints = get_checkpoint_paths(eval_checkpoints) if eval_checkpoints else [model_name_or_path]
 
-    test_ds = load_dataset(
-        read_data_by_chunk,
-        data_path=dev_file,
+    read_kwargs = dict(
         max_seq_len=max_seq_len,
-        lazy=False,
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        tokenizer=tokenizer if is_chunk_by_token else None,
+        entity_types=entity_type if is_eval_by_class else None,
+        is_keep_offset=is_eval_by_document,
+        candidate_filter=candidate_filter,
     )
-
+    # Without the cache or streaming, a batched map tokenizes every chunk up front and keeps the features in memory.
+    is_batched = bool(dataset_cache_dir or is_streaming or is_batched_tokenization)
     convert_function = partial(
-        convert_to_uie_format,
+        convert_to_uie_format_batch if is_batched else convert_to_uie_format,
         tokenizer=tokenizer,
         max_seq_len=max_seq_len,
+        pad_to_max_seq_len=not is_dynamic_padding,
     )
 
-    test_ds = test_ds.map(convert_function)
-
-    data_collator = DataCollatorWithPadding(tokenizer)
-    test_data_loader = create_data_loader(test_ds, mode="test", batch_size=batch_size, trans_fn=data_collator)
-    logger.info("Start Evaluation Loop...")
-    if is_eval_by_class:
-        evaluate_loop_by_class(model, test_data_loader, entity_type, tokenizer)
+    if dataset_cache_dir:
+        test_ds = load_tokenized_dataset(
+            dataset_cache_dir,
+            dev_file,
+            read_fun=partial(read_data_by_chunk, data_path=dev_file, **read_kwargs),
+            convert_fun=convert_function,
+            max_seq_len=max_seq_len,
+            identity=get_dataset_identity(
+                tokenizer,
+                convert_to_uie_format,
+                chunk_overlap=chunk_overlap,
+                is_chunk_by_sentence=is_chunk_by_sentence,
+                is_chunk_by_token=is_chunk_by_token,
+                pad_to_max_seq_len=not is_dynamic_padding,
+                entity_types=entity_type if is_eval_by_class else None,
+                candidate_patterns=entity_candidate_patterns if is_prefilter_candidates else None,
+            ),
+            is_batched=True,
+            read_statistics_fun=candidate_filter.statistics if candidate_filter else None,
+        )
+        truncation_statistics = test_ds.meta["statistics"]
+        if candidate_filter:
+            # A cache hit never calls read_fun, and the conversion pass may stop before the end of the data,
+            # so always use the counts saved with the cache.
+            candidate_filter.load_statistics(test_ds.meta.get("read_statistics", {}))
+    elif is_streaming:
+        truncation_statistics = {}
+        test_ds = StreamingDataset(
+            read_fun=partial(read_data_by_chunk, data_path=dev_file, **read_kwargs),
+            convert_fun=partial(convert_function, statistics=truncation_statistics),
+            is_batched=True,
+        )
     else:
-        precision, recall, f1 = evaluate_loop(model, test_data_loader)
-        logger.info("-----------------------------")
-        logger.info("Evaluation Precision: %.5f | Recall: %.5f | F1: %.5f" % (precision, recall, f1))
+        test_ds = load_dataset(read_data_by_chunk, data_path=dev_file, lazy=False, **read_kwargs)
+        truncation_statistics = {}
+        # Lazy tokenization only for a single pass, a sweep or length grouping would tokenize every chunk again.
+        test_ds = test_ds.map(
+            partial(convert_function, statistics=truncation_statistics),
+            lazy=len(checkpoints) == 1 and not is_group_by_length,
+            batched=is_batched,
+        )
+
+    data_collator = UIEDataCollator(tokenizer.pad_token_id)
+    test_data_loader = create_data_loader(
+        test_ds, mode="test", batch_size=batch_size, collate_fn=data_collator, is_group_by_length=is_group_by_length
+    )
+    results = []
+    for checkpoint in checkpoints:
+        if is_streaming:
+            # Every checkpoint tokenizes the data again, count a single pass.
+            truncation_statistics.clear()
+        model = UIE.from_pretrained(checkpoint)
+        logger.info(f"Start Evaluation Loop of {checkpoint}...")
+        num_examples, num_tokens, start_time = data_collator.num_examples, data_collator.num_real_tokens, time.perf_counter()
+        if is_eval_by_document:
+            precision, recall, f1 = evaluate_loop_by_document(
+                model, test_data_loader, dev_file, entity_type if is_eval_by_class else None
+            )
+        elif is_eval_by_class:
+            precision, recall, f1 = evaluate_loop_by_class(model, test_data_loader, entity_type)
+        else:
+            precision, recall, f1 = evaluate_loop(model, test_data_loader)
+            logger.info("-----------------------------")
+            logger.info("Evaluation Precision: %.5f | Recall: %.5f | F1: %.5f" % (precision, recall, f1))
+        runtime = time.perf_counter() - start_time
+        results.append(
+            dict(
+                checkpoint=checkpoint,
+                precision=precision,
+                recall=recall,
+                f1=f1,
+                eval_runtime=runtime,
+                eval_samples_per_second=(data_collator.num_examples - num_examples) / runtime,
+                eval_tokens_per_second=(data_collator.num_real_tokens - num_tokens) / runtime,
+            )
+        )
+        # Release the model before loading the next checkpoint.
+        del model
+        gc.collect()
+        if paddle.is_compiled_with_cuda():
+            paddle.device.cuda.empty_cache()
+    if eval_checkpoints:
+        log_metrics_table(results)
+    log_truncation_statistics(truncation_statistics, name=dev_file)
+    if candidate_filter is not None:
+        log_candidate_filter_statistics(candidate_filter, name=dev_file)
+    logger.info(
+        f"Tokens processed: {data_collator.num_padded_tokens} "
+        f"(padding efficiency: {data_collator.padding_efficiency:.2%})."
+    )
+    return results
 
 
 if __name__ == "__main__":
@@ -166,4 +360,15 @@ if __name__ == "__main__":
         device=args.device,
         is_eval_by_class=args.is_eval_by_class,
         max_seq_len=args.max_seq_len,
+        chunk_overlap=args.chunk_overlap,
+        is_chunk_by_sentence=args.is_chunk_by_sentence,
+        is_chunk_by_token=args.is_chunk_by_token,
+        dataset_cache_dir=args.dataset_cache_dir,
+        is_streaming=args.is_streaming,
+        is_batched_tokenization=args.is_batched_tokenization,
+        is_dynamic_padding=args.is_dynamic_padding,
+        is_group_by_length=args.is_group_by_length,
+        is_eval_by_document=args.is_eval_by_document,
+        eval_checkpoints=args.eval_checkpoints,
+        is_prefilter_candidates=args.is_prefilter_candidates,
     )
@@ -2,20 +2,35 @@ from config.base_config import (
     logger,
     entity_type,
     regularized_token,
+    entity_candidate_patterns,
     InferenceDataArguments,
     InferenceStrategyArguments,
     InferenceTaskflowArguments,
 )
-from typing import List, Callable
+from utils.cache_utils import InferenceCache, get_model_identity
+from utils.corpus_utils import CorpusReader
+from utils.infer_utils import (
+    CrossDocumentPredictor,
+    ResumableResultWriter,
+    TextRegularizer,
+    get_data_checksum,
+    write_inference_results_as_table,
+    write_inference_results_by_line,
+)
+from typing import Dict, List, Callable, Iterable, Iterator, Optional, Tuple, Union
 from paddlenlp import Taskflow
 from paddlenlp.trainer import PdArgumentParser
 import os
 import json
+import multiprocessing
+from functools import wraps
 from tqdm import tqdm
-import re
 
 
 class Processer:
+    # Names accepted by select_strategy, each maps to the method _<name>_postprocess.
+    SELECT_STRATEGIES = ("all", "max", "threshold")
+
     def __init__(
         self,
         select_strategy: str = "all",
@@ -23,12 +38,16 @@ class Processer:
         select_key: List[str] = ["text", "start", "end", "probability"],
         is_regularize_data: bool = False,
     ) -> None:
-        self.select_strategy_fun = eval("self._" + select_strategy + "_postprocess")
+        if select_strategy not in self.SELECT_STRATEGIES:
+            raise ValueError(f"Unknown select_strategy: {select_strategy}. Choose from {list(self.SELECT_STRATEGIES)}.")
+        self.select_strategy_fun = getattr(self, f"_{select_strategy}_postprocess")
         self.threshold = threshold if threshold else 0.5
         self.select_key = select_key if select_key else ["text", "start", "end", "probability"]
         self.is_regularize_data = is_regularize_data
+        self.regularizer = TextRegularizer(regularized_token)
 
     def _key_filter(strategy_fun):
+        @wraps(strategy_fun)  # keeps bound strategies picklable for worker processes
         def select_key(self, each_entity_results):
             each_entity_results = strategy_fun(self, each_entity_results)
             for i, each_entity_result in enumerate(each_entity_results):
@@ -40,6 +59,13 @@ class Processer:
     def preprocess(self, text):
         return self._do_preprocess(text) if self.is_regularize_data else text
 
+    def remap_offsets(self, text, result):
+        """
+        Map start/end of `uie(self.preprocess(text))` back to the original text.
+        Keep it consistent with _do_preprocess if you override that method.
+        """
+        return self.regularizer.remap_result(text, result) if self.is_regularize_data else result
+
     def postprocess(self, results):
         new_result = []
         for result in results:
@@ -54,9 +80,7 @@ class Processer:
         Override this method if you want to inject some custom behavior
         """
 
-        for re_term in regularized_token:
-            text = re.sub(re_term, "", text)
-        return text
+        return self.regularizer.regularize(text)
 
     @_key_filter
     def _max_postprocess(self, each_entity_results):
@@ -73,7 +97,7 @@ class Processer:
     @_key_filter
     def _CustomizeYourName_postprocess(self, each_entity_results):
         """
-        1. Set --select_strategy CustomizeYourName
+        1. Add "CustomizeYourName" to SELECT_STRATEGIES and set --select_strategy CustomizeYourName
            Any select strategy can be implemented here.
 
         2. each_entity_results (example): [{'text': '22,154元', 'start': 1487, 'end': 1494, 'probability': 0.46060848236083984}, {'text': '2,954元', 'start': 3564, 'end': 3570, 'probability': 0.8074951171875}]
@@ -81,6 +105,370 @@ class Processer:
         pass
 
 
+def create_taskflow(
+    schema: List[str],
+    device_id: int = 0,
+    precision: str = "fp32",
+    batch_size: int = 1,
+    model: str = "uie-base",
+    task_path: str = None,
+    num_threads: int = None,
+    max_seq_len: int = 512,
+) -> Taskflow:
+    if task_path:
+        if not os.path.exists(task_path):
+            raise ValueError(f"{task_path} is not a directory.")
+        taskflow_kwargs = {"task_path": task_path}
+    else:
+        taskflow_kwargs = {"model": model}
+
+    if num_threads:
+        taskflow_kwargs["num_threads"] = num_threads
+
+    return Taskflow(
+        "information_extraction",
+        schema=schema,
+        precision=precision,
+        batch_size=batch_size,
+        device_id=device_id,
+        max_seq_len=max_seq_len,
+        **taskflow_kwargs,
+    )
+
+
+def predict_by_stream(
+    uie: Taskflow,
+    texts: Iterable[str],
+    schema: List[str],
+    batch_size: int = 1,
+    is_batch_across_docs: bool = False,
+    predictor_kwargs: Optional[dict] = None,
+    statistics: Optional[dict] = None,
+) -> Iterator[list]:
+    if not is_batch_across_docs:
+        yield from (uie(text) for text in texts)
+        return
+
+    predictor = CrossDocumentPredictor(uie, schema=schema, batch_size=batch_size, **(predictor_kwargs or {}))
+    yield from predictor.predict(texts)
+    if statistics is not None:
+        add_statistics(
+            statistics,
+            num_docs=predictor.num_docs,
+            num_chunks=predictor.num_chunks,
+            num_fixed_chunks=predictor.num_fixed_chunks,
+            num_truncated_chunks=predictor.num_truncated_chunks,
+            num_skipped_chunks=predictor.num_skipped_chunks,
+            num_real_tokens=predictor.num_real_tokens,
+            num_padded_tokens=predictor.num_padded_tokens,
+        )
+
+
+def add_statistics(statistics: dict, **values: int) -> None:
+    for key, value in values.items():
+        statistics[key] = statistics.get(key, 0) + value
+
+
+def log_inference_statistics(statistics: dict) -> None:
+    if statistics.get("num_padded_tokens"):
+        logger.info(
+            f"Padding efficiency: {statistics['num_real_tokens']} real tokens / {statistics['num_padded_tokens']} "
+            f"padded tokens = {statistics['num_real_tokens'] / statistics['num_padded_tokens']:.4f}."
+        )
+    if statistics.get("num_docs"):
+        logger.info(
+            f"Chunks per document (over all prompts): {statistics['num_chunks'] / statistics['num_docs']:.2f} "
+            f"(fixed-length chunking: {statistics['num_fixed_chunks'] / statistics['num_docs']:.2f})."
+        )
+    if statistics.get("num_skipped_chunks"):
+        num_chunks = statistics["num_chunks"] + statistics["num_skipped_chunks"]
+        logger.info(
+            f"Candidate prefilter skipped {statistics['num_skipped_chunks']} of {num_chunks} chunks "
+            f"({statistics['num_skipped_chunks'] / num_chunks:.2%})."
+        )
+    if statistics.get("num_truncated_chunks"):
+        logger.warning(
+            f"{statistics['num_truncated_chunks']} of {statistics['num_chunks']} chunks were truncated to max_seq_len, "
+            "the truncated text has no predictions. Use --is_chunk_by_token to chunk by the token budget."
+        )
+
+
+def predict_with_cache(
+    cache: InferenceCache,
+    texts: Iterable[str],
+    taskflow_kwargs: dict,
+    is_batch_across_docs: bool = False,
+    uie: Optional[Taskflow] = None,
+    predictor_kwargs: Optional[dict] = None,
+    statistics: Optional[dict] = None,
+    taskflow_state: Optional[dict] = None,
+) -> Iterator[list]:
+    """先查 cache，只有 cache miss 的文件才交給模型。若沒有傳入 uie，Taskflow 會在第一次 cache miss 時才建立。
+
+    Note:
+        傳入 taskflow_state 時，Taskflow 從 taskflow_state["uie"] 取得，第一次建立後也存回去，
+        讓多次呼叫（例如同一個 worker process 的每個 task）共用同一個 Taskflow。
+    """
+    state = {"uie": uie} if taskflow_state is None else taskflow_state
+
+    def predict_fun(miss_texts: List[str]) -> Iterator[list]:
+        if state.get("uie") is None:
+            state["uie"] = create_taskflow(**taskflow_kwargs)
+        return predict_by_stream(
+            state["uie"],
+            miss_texts,
+            schema=taskflow_kwargs["schema"],
+            batch_size=taskflow_kwargs["batch_size"],
+            is_batch_across_docs=is_batch_across_docs,
+            predictor_kwargs=predictor_kwargs,
+            statistics=statistics,
+        )
+
+    return cache.predict(texts, predict_fun)
+
+
+def get_default_num_threads(num_workers: int) -> int:
+    """將可用的 CPU 核心平均分給每個 worker，作為每個 worker 的 intra-op thread 數量。"""
+    num_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, num_cpus // max(1, num_workers))
+
+
+def identity(text: str) -> str:
+    # Default preprocess_fun. Unlike a lambda it can be pickled to worker processes (--num_workers).
+    return text
+
+
+_worker_state = {}
+
+
+def _init_inference_worker(
+    reader: Optional[CorpusReader],
+    taskflow_kwargs: dict,
+    preprocess_fun: Callable,
+    is_batch_across_docs: bool,
+    predictor_kwargs: dict,
+    cache: Optional[InferenceCache],
+) -> None:
+    _worker_state["reader"] = reader
+    _worker_state["taskflow_kwargs"] = taskflow_kwargs
+    _worker_state["preprocess_fun"] = preprocess_fun
+    _worker_state["is_batch_across_docs"] = is_batch_across_docs
+    _worker_state["predictor_kwargs"] = predictor_kwargs
+    _worker_state["cache"] = cache
+    _worker_state["uie"] = None if cache else create_taskflow(**taskflow_kwargs)
+
+
+def _inference_worker(task: Tuple[int, int, Optional[List[str]]]) -> Tuple[List[list], dict]:
+    start, end, texts = task
+    if texts is None:
+        texts = _worker_state["reader"].iter_range(start, end)
+    texts = (_worker_state["preprocess_fun"](text) for text in texts)
+
+    statistics = {}
+    if _worker_state["cache"]:
+        results = predict_with_cache(
+            _worker_state["cache"],
+            texts,
+            taskflow_kwargs=_worker_state["taskflow_kwargs"],
+            is_batch_across_docs=_worker_state["is_batch_across_docs"],
+            predictor_kwargs=_worker_state["predictor_kwargs"],
+            statistics=statistics,
+            taskflow_state=_worker_state,
+        )
+    else:
+        results = predict_by_stream(
+            _worker_state["uie"],
+            texts,
+            schema=_worker_state["taskflow_kwargs"]["schema"],
+            batch_size=_worker_state["taskflow_kwargs"]["batch_size"],
+            is_batch_across_docs=_worker_state["is_batch_across_docs"],
+            predictor_kwargs=_worker_state["predictor_kwargs"],
+            statistics=statistics,
+        )
+    return list(results), statistics
+
+
+def predict_by_workers(
+    text_list: Union[List[str], CorpusReader],
+    taskflow_kwargs: dict,
+    num_workers: int,
+    preprocess_fun: Callable = identity,
+    is_batch_across_docs: bool = False,
+    predictor_kwargs: Optional[dict] = None,
+    cache: Optional[InferenceCache] = None,
+    statistics: Optional[dict] = None,
+    docs_per_task: int = 32,
+) -> Iterator[list]:
+    """以 num_workers 個 process 平行推論，每個 process 各自建立 Taskflow，結果依照文件順序產生。
+
+    Note:
+        文件每 docs_per_task 篇為一個 task，依序分派給閒置的 worker（長短不一的判決書也能平均分配）。
+        讀取 CorpusReader 時只傳送文件 id 範圍（index 只在建立 worker 時傳送一次），worker 直接從 mmap 讀取文本。
+        preprocess_fun 必須能被 pickle（例如 Processer.preprocess），不可為 lambda。
+
+    Args:
+        text_list (Union[List[str], CorpusReader]): 文件。
+        taskflow_kwargs (dict): create_taskflow 的參數，num_threads 為每個 worker 的 intra-op thread 數量。
+        num_workers (int): worker 數量。
+        preprocess_fun (Callable, optional): 前處理. Defaults to identity.
+        is_batch_across_docs (bool, optional): worker 內是否使用跨文件批次推論. Defaults to False.
+        predictor_kwargs (Optional[dict], optional): worker 內 CrossDocumentPredictor 的其他參數（bucket_size、chunk_overlap、is_chunk_by_sentence、is_chunk_by_token、candidate_patterns）. Defaults to None.
+        cache (Optional[InferenceCache], optional): 推論結果的 cache，所有 worker 共用. Defaults to None.
+        statistics (Optional[dict], optional): 累加所有 worker 的 padding 與 chunk 統計. Defaults to None.
+        docs_per_task (int, optional): 每個 task 的文件數量. Defaults to 32.
+
+    Yields:
+        Iterator[list]: 與 `uie(text)` 相同格式的結果，順序與輸入相同。
+    """
+    is_reader = isinstance(text_list, CorpusReader)
+    tasks = (
+        (start, start + docs_per_task, None if is_reader else text_list[start : start + docs_per_task])
+        for start in range(0, len(text_list), docs_per_task)
+    )
+    # Paddle is not fork-safe, every worker starts a fresh interpreter.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        num_workers,
+        initializer=_init_inference_worker,
+        initargs=(
+            text_list if is_reader else None,
+            taskflow_kwargs,
+            preprocess_fun,
+            is_batch_across_docs,
+            predictor_kwargs,
+            cache,
+        ),
+    ) as pool:
+        for results, worker_statistics in pool.imap(_inference_worker, tasks):
+            if statistics is not None and worker_statistics:
+                add_statistics(statistics, **worker_statistics)
+            yield from results
+
+
+def create_inference_cache(
+    cache_dir: str,
+    schema: List[str],
+    precision: str = "fp32",
+    model: str = "uie-base",
+    task_path: str = None,
+    cache_max_size_mb: float = 1024,
+    max_seq_len: int = 512,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    candidate_patterns: Optional[Dict[str, List[str]]] = None,
+) -> Optional[InferenceCache]:
+    if not cache_dir:
+        return None
+    model_identity = get_model_identity(model=model, task_path=task_path)
+    if max_seq_len != 512 or chunk_overlap:
+        # Chunking changes the results, keep the default setting compatible with existing cache entries.
+        model_identity += f"|max_seq_len={max_seq_len}|chunk_overlap={chunk_overlap}"
+    if is_chunk_by_sentence:
+        model_identity += "|is_chunk_by_sentence=True"
+    if is_chunk_by_token:
+        model_identity += "|is_chunk_by_token=True"
+    if candidate_patterns:
+        model_identity += f"|candidate_patterns={json.dumps(candidate_patterns, ensure_ascii=False, sort_keys=True)}"
+    return InferenceCache(
+        cache_dir,
+        schema=schema,
+        model_identity=model_identity,
+        precision=precision,
+        max_size_mb=cache_max_size_mb,
+    )
+
+
+def log_cache_statistics(cache: Optional[InferenceCache], start_statistics: Optional[dict]) -> None:
+    if cache is None:
+        return
+    statistics = cache.statistics()
+    num_hits = statistics["hits"] - start_statistics["hits"]
+    num_misses = statistics["misses"] - start_statistics["misses"]
+    logger.info(
+        f"Inference cache: {num_hits} hits, {num_misses} misses "
+        f"(hit rate: {num_hits / max(1, num_hits + num_misses):.4f}), "
+        f"{statistics['entries']} entries, {statistics['size_bytes'] / 1024 / 1024:.2f} MB in {cache.cache_path}."
+    )
+
+
+def inference_by_stream(
+    data_file: str,
+    schema: List[str],
+    device_id: int = 0,
+    text_list: List[str] = None,
+    precision: str = "fp32",
+    batch_size: int = 1,
+    model: str = "uie-base",
+    task_path: str = None,
+    postprocess_fun: Callable = lambda x: x,
+    preprocess_fun: Callable = identity,
+    is_batch_across_docs: bool = False,
+    num_workers: int = 1,
+    num_threads: int = None,
+    cache_dir: str = None,
+    cache_max_size_mb: float = 1024,
+    bucket_size: int = 0,
+    max_seq_len: int = 512,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    candidate_patterns: Optional[Dict[str, List[str]]] = None,
+    offset_remap_fun: Optional[Callable[[str, list], list]] = None,
+    skip_docs: int = 0,
+) -> Iterator[Tuple[str, list]]:
+    """逐篇產生推論結果，不會將所有文件與結果同時放在記憶體中。
+
+    Args:
+        offset_remap_fun (Callable[[str, list], list], optional): 以 (原始文本, 推論結果) 將 start/end 還原成原始文本的位置，
+            例如 Processer.remap_offsets. Defaults to None.
+        skip_docs (int, optional): 略過前 skip_docs 篇文件（已完成的文件，見 ResumableResultWriter）. Defaults to 0.
+
+    Yields:
+        Iterator[Tuple[str, list]]: (原始文本, 經過 postprocess_fun 後的推論結果)，順序與輸入相同。
+    """
+    if not os.path.exists(data_file) and not text_list:
+        raise ValueError(f"Data not found in {data_file}. Please input the correct path of data.")
+
+    if not text_list:
+        text_list = CorpusReader(data_file)
+
+    if skip_docs:
+        logger.info(f"Skip {skip_docs} finished documents.")
+        if isinstance(text_list, CorpusReader):
+            text_list = text_list.subset(skip_docs, len(text_list))
+        else:
+            text_list = text_list[skip_docs:]
+
+    results = _predict_and_log(
+        text_list,
+        schema=schema,
+        device_id=device_id,
+        precision=precision,
+        batch_size=batch_size,
+        model=model,
+        task_path=task_path,
+        preprocess_fun=preprocess_fun,
+        is_batch_across_docs=is_batch_across_docs,
+        num_workers=num_workers,
+        num_threads=num_threads,
+        cache_dir=cache_dir,
+        cache_max_size_mb=cache_max_size_mb,
+        bucket_size=bucket_size,
+        max_seq_len=max_seq_len,
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        is_chunk_by_token=is_chunk_by_token,
+        candidate_patterns=candidate_patterns,
+    )
+    # Two independent passes over the input: one for the model, one for the output content.
+    # results comes first so that it is exhausted and logs its statistics.
+    for result, content in zip(results, iter(text_list)):
+        if offset_remap_fun:
+            result = offset_remap_fun(content, result)
+        yield content, postprocess_fun([result])[0]
+
+
 def inference(
     data_file: str,
     schema: List[str],
@@ -91,38 +479,184 @@ def inference(
     model: str = "uie-base",
     task_path: str = None,
     postprocess_fun: Callable = lambda x: x,
-    preprocess_fun: Callable = lambda x: x,
+    preprocess_fun: Callable = identity,
+    is_batch_across_docs: bool = False,
+    num_workers: int = 1,
+    num_threads: int = None,
+    cache_dir: str = None,
+    cache_max_size_mb: float = 1024,
+    bucket_size: int = 0,
+    max_seq_len: int = 512,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    candidate_patterns: Optional[Dict[str, List[str]]] = None,
+    offset_remap_fun: Optional[Callable[[str, list], list]] = None,
 ):
     if not os.path.exists(data_file) and not text_list:
         raise ValueError(f"Data not found in {data_file}. Please input the correct path of data.")
 
-    if task_path:
-        if not os.path.exists(task_path):
-            raise ValueError(f"{task_path} is not a directory.")
+    if not text_list:
+        text_list = CorpusReader(data_file)
 
-        uie = Taskflow(
-            "information_extraction",
-            schema=schema,
-            task_path=task_path,
-            precision=precision,
-            batch_size=batch_size,
-            device_id=device_id,
-        )
-    else:
-        uie = Taskflow(
-            "information_extraction",
-            schema=schema,
-            model=model,
-            precision=precision,
-            batch_size=batch_size,
-            device_id=device_id,
-        )
+    results = _predict_and_log(
+        text_list,
+        schema=schema,
+        device_id=device_id,
+        precision=precision,
+        batch_size=batch_size,
+        model=model,
+        task_path=task_path,
+        preprocess_fun=preprocess_fun,
+        is_batch_across_docs=is_batch_across_docs,
+        num_workers=num_workers,
+        num_threads=num_threads,
+        cache_dir=cache_dir,
+        cache_max_size_mb=cache_max_size_mb,
+        bucket_size=bucket_size,
+        max_seq_len=max_seq_len,
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        is_chunk_by_token=is_chunk_by_token,
+        candidate_patterns=candidate_patterns,
+    )
+    results = tqdm(results, total=len(text_list))
+    if offset_remap_fun:
+        # Remap each document as soon as it is predicted, while its deletions recorded by preprocess_fun are cached.
+        results = [offset_remap_fun(text, result) for result, text in zip(results, text_list)]
+    return postprocess_fun(list(results))
 
-    if not text_list:
-        with open(data_file, "r", encoding="utf8") as f:
-            text_list = [line.strip() for line in f]
 
-    return postprocess_fun([uie(preprocess_fun(text)) for text in tqdm(text_list)])
+def _predict_and_log(
+    text_list: Union[List[str], CorpusReader],
+    schema: List[str],
+    device_id: int,
+    precision: str,
+    batch_size: int,
+    model: str,
+    task_path: str,
+    preprocess_fun: Callable,
+    is_batch_across_docs: bool,
+    num_workers: int,
+    num_threads: Optional[int],
+    cache_dir: Optional[str],
+    cache_max_size_mb: float,
+    bucket_size: int,
+    max_seq_len: int,
+    chunk_overlap: int,
+    is_chunk_by_sentence: bool,
+    is_chunk_by_token: bool,
+    candidate_patterns: Optional[Dict[str, List[str]]],
+) -> Iterator[list]:
+    """inference 與 inference_by_stream 共用：建立 cache 後逐篇產生推論結果，全部產生後記錄 cache 與推論的統計。"""
+    cache = create_inference_cache(
+        cache_dir,
+        schema,
+        precision,
+        model,
+        task_path,
+        cache_max_size_mb,
+        max_seq_len,
+        chunk_overlap,
+        is_chunk_by_sentence,
+        is_chunk_by_token,
+        candidate_patterns,
+    )
+    start_statistics = cache.statistics() if cache else None
+    statistics = {}
+    yield from _predict(
+        text_list,
+        schema=schema,
+        device_id=device_id,
+        precision=precision,
+        batch_size=batch_size,
+        model=model,
+        task_path=task_path,
+        max_seq_len=max_seq_len,
+        preprocess_fun=preprocess_fun,
+        is_batch_across_docs=is_batch_across_docs,
+        num_workers=num_workers,
+        num_threads=num_threads,
+        cache=cache,
+        predictor_kwargs=dict(
+            bucket_size=bucket_size,
+            chunk_overlap=chunk_overlap,
+            is_chunk_by_sentence=is_chunk_by_sentence,
+            is_chunk_by_token=is_chunk_by_token,
+            candidate_patterns=candidate_patterns,
+        ),
+        statistics=statistics,
+    )
+    log_cache_statistics(cache, start_statistics)
+    log_inference_statistics(statistics)
+
+
+def _predict(
+    text_list: Union[List[str], CorpusReader],
+    schema: List[str],
+    device_id: int,
+    precision: str,
+    batch_size: int,
+    model: str,
+    task_path: str,
+    max_seq_len: int,
+    preprocess_fun: Callable,
+    is_batch_across_docs: bool,
+    num_workers: int,
+    num_threads: Optional[int],
+    cache: Optional[InferenceCache],
+    predictor_kwargs: dict,
+    statistics: dict,
+) -> Iterator[list]:
+    taskflow_kwargs = dict(
+        schema=schema,
+        device_id=device_id,
+        precision=precision,
+        batch_size=batch_size,
+        model=model,
+        task_path=task_path,
+        num_threads=num_threads,
+        max_seq_len=max_seq_len,
+    )
+    for key, value in predictor_kwargs.items():
+        if value and not is_batch_across_docs:
+            logger.warning(f"{key} is only applied when is_batch_across_docs=True.")
+
+    if num_workers > 1:
+        if device_id != -1:
+            logger.warning(f"num_workers={num_workers} is designed for CPU inference, but got device_id={device_id}.")
+        taskflow_kwargs["num_threads"] = num_threads if num_threads else get_default_num_threads(num_workers)
+        logger.info(f"Inference with {num_workers} workers, {taskflow_kwargs['num_threads']} threads per worker.")
+        return predict_by_workers(
+            text_list,
+            taskflow_kwargs=taskflow_kwargs,
+            num_workers=num_workers,
+            preprocess_fun=preprocess_fun,
+            is_batch_across_docs=is_batch_across_docs,
+            predictor_kwargs=predictor_kwargs,
+            cache=cache,
+            statistics=statistics,
+        )
+
+    texts = (preprocess_fun(text) for text in text_list)
+    if cache:
+        return predict_with_cache(
+            cache,
+            texts,
+            taskflow_kwargs=taskflow_kwargs,
+            is_batch_across_docs=is_batch_across_docs,
+            predictor_kwargs=predictor_kwargs,
+            statistics=statistics,
+        )
+    return predict_by_stream(
+        create_taskflow(**taskflow_kwargs),
+        texts,
+        schema=schema,
+        batch_size=batch_size,
+        is_batch_across_docs=is_batch_across_docs,
+        predictor_kwargs=predictor_kwargs,
+        statistics=statistics,
+    )
 
 
 if __name__ == "__main__":
@@ -138,7 +672,7 @@ if __name__ == "__main__":
 
     logger.info("Start Inference...")
 
-    inference_result = inference(
+    inference_kwargs = dict(
         data_file=data_args.data_file,
         device_id=taskflow_args.device_id,
         schema=entity_type,
@@ -149,30 +683,85 @@ if __name__ == "__main__":
         task_path=taskflow_args.task_path,
         postprocess_fun=uie_processer.postprocess,
         preprocess_fun=uie_processer.preprocess,
+        offset_remap_fun=uie_processer.remap_offsets,
+        is_batch_across_docs=taskflow_args.is_batch_across_docs,
+        num_workers=taskflow_args.num_workers,
+        num_threads=taskflow_args.num_threads,
+        cache_dir=taskflow_args.cache_dir,
+        cache_max_size_mb=taskflow_args.cache_max_size_mb,
+        bucket_size=taskflow_args.bucket_size,
+        max_seq_len=taskflow_args.max_seq_len,
+        chunk_overlap=taskflow_args.chunk_overlap,
+        is_chunk_by_sentence=taskflow_args.is_chunk_by_sentence,
+        is_chunk_by_token=taskflow_args.is_chunk_by_token,
+        candidate_patterns=entity_candidate_patterns if taskflow_args.is_prefilter_candidates else None,
     )
 
-    logger.info("========== Inference Results ==========")
-    for i, text_inference_result in enumerate(inference_result):
-        logger.info(f"========== Content {i} Results ==========")
-        logger.info(text_inference_result)
-    logger.info("End Inference...")
-
-    if data_args.save_dir:
-        out_result = []
-        if not os.path.exists(data_args.save_dir):
-            logger.warning(f"{data_args.save_dir} is not found. Auto-create the dir.")
-            os.makedirs(data_args.save_dir)
-
-        with open(data_args.data_file, "r", encoding="utf8") as f:
-            text_list = [line.strip() for line in f]
-
-        with open(os.path.join(data_args.save_dir, data_args.save_name), "w", encoding="utf8") as f:
-            for content, result in zip(text_list, inference_result):
-                out_result.append(
-                    {
-                        "Content": content,
-                        "InferenceResults": result,
-                    }
-                )
-            jsonString = json.dumps(out_result, ensure_ascii=False)
-            f.write(jsonString)
+    if data_args.save_dir and not os.path.exists(data_args.save_dir):
+        logger.warning(f"{data_args.save_dir} is not found. Auto-create the dir.")
+        os.makedirs(data_args.save_dir)
+
+    if data_args.tabular_layout and not data_args.save_dir:
+        logger.warning("tabular_layout is ignored because save_dir is not set.")
+
+    if data_args.tabular_layout and data_args.save_dir:
+        if data_args.is_resume:
+            logger.warning("is_resume is ignored because tabular_layout is set.")
+        save_path = os.path.join(data_args.save_dir, data_args.save_name)
+        num_docs = write_inference_results_as_table(
+            tqdm(inference_by_stream(**inference_kwargs)),
+            save_path,
+            schema=entity_type,
+            layout=data_args.tabular_layout,
+            flush_steps=data_args.flush_steps,
+        )
+        logger.info(f"Write {num_docs} inference results into {save_path}.")
+        logger.info("End Inference...")
+    elif data_args.is_stream_output:
+        if data_args.is_resume and not data_args.save_dir:
+            logger.warning("is_resume is ignored because save_dir is not set.")
+        writer = None
+        if data_args.is_resume and data_args.save_dir:
+            writer = ResumableResultWriter(
+                os.path.join(data_args.save_dir, data_args.save_name),
+                get_data_checksum(data_args.data_file, data_args.text_list),
+                flush_steps=data_args.flush_steps,
+            )
+            inference_kwargs["skip_docs"] = writer.num_finished_docs
+
+        results = tqdm(inference_by_stream(**inference_kwargs), initial=inference_kwargs.get("skip_docs", 0))
+        if data_args.save_dir:
+            save_path = os.path.join(data_args.save_dir, data_args.save_name)
+            if writer:
+                num_docs = writer.write(results)
+            else:
+                num_docs = write_inference_results_by_line(results, save_path, flush_steps=data_args.flush_steps)
+            logger.info(f"Write {num_docs} inference results into {save_path}.")
+        else:
+            for i, (_, text_inference_result) in enumerate(results):
+                logger.info(f"========== Content {i} Results ==========")
+                logger.info(text_inference_result)
+        logger.info("End Inference...")
+    else:
+        inference_result = inference(**inference_kwargs)
+
+        logger.info("========== Inference Results ==========")
+        for i, text_inference_result in enumerate(inference_result):
+            logger.info(f"========== Content {i} Results ==========")
+            logger.info(text_inference_result)
+        logger.info("End Inference...")
+
+        if data_args.save_dir:
+            out_result = []
+            text_list = data_args.text_list if data_args.text_list else CorpusReader(data_args.data_file)
+
+            with open(os.path.join(data_args.save_dir, data_args.save_name), "w", encoding="utf8") as f:
+                for content, result in zip(text_list, inference_result):
+                    out_result.append(
+                        {
+                            "Content": content,
+                            "InferenceResults": result,
+                        }
+                    )
+                jsonString = json.dumps(out_result, ensure_ascii=False)
+                f.write(jsonString)
@@ -0,0 +1,157 @@
+from config.base_config import (
+    logger,
+    entity_type,
+    entity_candidate_patterns,
+    InferenceDataArguments,
+    InferenceServerArguments,
+    InferenceStrategyArguments,
+    InferenceTaskflowArguments,
+)
+from run_infer import Processer, create_inference_cache, create_taskflow, predict_by_stream, predict_with_cache
+from utils.server_utils import MicroBatcher, create_inference_server
+from paddlenlp.trainer import PdArgumentParser
+from typing import Callable, Dict, List, Optional
+
+
+def create_predict_fun(
+    schema: List[str],
+    device_id: int = 0,
+    precision: str = "fp32",
+    batch_size: int = 16,
+    model: str = "uie-base",
+    task_path: str = None,
+    num_threads: int = None,
+    cache_dir: str = None,
+    cache_max_size_mb: float = 1024,
+    bucket_size: int = 0,
+    max_seq_len: int = 512,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    candidate_patterns: Optional[Dict[str, List[str]]] = None,
+) -> Callable[[List[str]], List[list]]:
+    """載入模型（常駐），回傳對多篇文件做跨文件批次推論的函式。"""
+    taskflow_kwargs = dict(
+        schema=schema,
+        device_id=device_id,
+        precision=precision,
+        batch_size=batch_size,
+        model=model,
+        task_path=task_path,
+        num_threads=num_threads,
+        max_seq_len=max_seq_len,
+    )
+    predictor_kwargs = dict(
+        bucket_size=bucket_size,
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        is_chunk_by_token=is_chunk_by_token,
+        candidate_patterns=candidate_patterns,
+    )
+    uie = create_taskflow(**taskflow_kwargs)
+    cache = create_inference_cache(
+        cache_dir,
+        schema,
+        precision,
+        model,
+        task_path,
+        cache_max_size_mb,
+        max_seq_len,
+        chunk_overlap,
+        is_chunk_by_sentence,
+        is_chunk_by_token,
+        candidate_patterns,
+    )
+
+    def predict_fun(texts: List[str]) -> List[list]:
+        if cache:
+            return list(
+                predict_with_cache(
+                    cache, texts, taskflow_kwargs, is_batch_across_docs=True, uie=uie, predictor_kwargs=predictor_kwargs
+                )
+            )
+        return list(
+            predict_by_stream(
+                uie,
+                texts,
+                schema=schema,
+                batch_size=batch_size,
+                is_batch_across_docs=True,
+                predictor_kwargs=predictor_kwargs,
+            )
+        )
+
+    return predict_fun
+
+
+def create_postprocess_fun_factory(strategy_args: InferenceStrategyArguments) -> Callable[[dict], Callable]:
+    """依照 request 的 select_strategy / threshold / select_key 建立 Processer，未指定時使用啟動服務時的設定。
+
+    Note:
+        request 的值來自 HTTP client，不合法時 raise ValueError / TypeError（服務回傳 400）。
+    """
+
+    def postprocess_fun_factory(request: dict) -> Callable:
+        threshold = request.get("threshold", strategy_args.select_strategy_threshold)
+        if threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, float))):
+            raise TypeError("threshold should be a float.")
+        select_key = request.get("select_key", strategy_args.select_key)
+        if select_key is not None and (
+            not isinstance(select_key, list) or not all(isinstance(key, str) for key in select_key)
+        ):
+            raise TypeError("select_key should be a list of strings.")
+        return Processer(
+            select_strategy=request.get("select_strategy", strategy_args.select_strategy),
+            threshold=None if threshold is None else float(threshold),
+            select_key=select_key,
+        ).postprocess
+
+    return postprocess_fun_factory
+
+
+if __name__ == "__main__":
+    parser = PdArgumentParser(
+        (InferenceDataArguments, InferenceStrategyArguments, InferenceTaskflowArguments, InferenceServerArguments)
+    )
+    data_args, strategy_args, taskflow_args, server_args = parser.parse_args_into_dataclasses()
+
+    logger.info("Loading model...")
+    batcher = MicroBatcher(
+        create_predict_fun(
+            schema=entity_type,
+            device_id=taskflow_args.device_id,
+            precision=taskflow_args.precision,
+            batch_size=taskflow_args.batch_size,
+            model=taskflow_args.model,
+            task_path=taskflow_args.task_path,
+            num_threads=taskflow_args.num_threads,
+            cache_dir=taskflow_args.cache_dir,
+            cache_max_size_mb=taskflow_args.cache_max_size_mb,
+            bucket_size=taskflow_args.bucket_size,
+            max_seq_len=taskflow_args.max_seq_len,
+            chunk_overlap=taskflow_args.chunk_overlap,
+            is_chunk_by_sentence=taskflow_args.is_chunk_by_sentence,
+            is_chunk_by_token=taskflow_args.is_chunk_by_token,
+            candidate_patterns=entity_candidate_patterns if taskflow_args.is_prefilter_candidates else None,
+        ),
+        max_batch_docs=server_args.max_batch_docs,
+        max_wait_ms=server_args.max_wait_ms,
+        max_queue_size=server_args.max_queue_size,
+    )
+    processer = Processer(is_regularize_data=data_args.is_regularize_data)
+    server = create_inference_server(
+        server_args.host,
+        server_args.port,
+        batcher=batcher,
+        postprocess_fun_factory=create_postprocess_fun_factory(strategy_args),
+        preprocess_fun=processer.preprocess,
+        offset_remap_fun=processer.remap_offsets,
+    )
+
+    logger.info(f"Start inference service on http://{server_args.host}:{server_args.port} ...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stop inference service...")
+    finally:
+        server.server_close()
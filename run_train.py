@@ -1,14 +1,26 @@
 from config.base_config import logger, UIE_input_spec, TrainModelArguments, TrainDataArguments
-from utils.data_utils import read_data_by_chunk, convert_to_uie_format
-from utils.model_utils import uie_loss_func, compute_metrics
+from utils.data_utils import (
+    read_data_by_chunk,
+    convert_to_uie_format,
+    convert_to_uie_format_batch,
+    is_accepting_statistics,
+    log_truncation_statistics,
+    log_dataset_composition,
+    get_positive_mask,
+    UIEDataCollator,
+    StreamingDataset,
+)
+from utils.model_utils import uie_loss_func, compute_metrics as default_compute_metrics, UIETrainer
+from utils.cache_utils import get_dataset_identity, load_tokenized_dataset
 from paddlenlp.transformers import UIE, AutoTokenizer
-from paddlenlp.trainer import Trainer, get_last_checkpoint, TrainingArguments, PdArgumentParser
+from paddlenlp.trainer import get_last_checkpoint, TrainingArguments, PdArgumentParser
 from paddlenlp.trainer.trainer_callback import DefaultFlowCallback, EarlyStoppingCallback
 from paddlenlp.transformers import export_model
 from paddle import set_device, optimizer
 from typing import Optional, Any, Callable, Dict, Union, Tuple
 from functools import partial
 from paddlenlp.datasets import load_dataset
+import math
 import os
 
 
@@ -18,13 +30,24 @@ def finetune(
     dev_file: str = None,
     test_file: str = None,
     max_seq_len: int = 512,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    dataset_cache_dir: Optional[str] = None,
+    is_streaming: bool = False,
+    shuffle_buffer_size: int = 10000,
+    is_batched_tokenization: bool = False,
+    is_dynamic_padding: bool = False,
+    is_group_by_length: bool = False,
+    negative_ratio: Optional[float] = None,
+    is_accumulate_metrics: bool = False,
     model_name_or_path: str = "uie-base",
     export_model_dir: Optional[str] = None,
     convert_and_tokenize_function: Optional[
         Callable[[Dict[str, str], Any, int], Dict[str, Union[str, float]]]
     ] = convert_to_uie_format,
     criterion=uie_loss_func,
-    compute_metrics=compute_metrics,
+    compute_metrics=default_compute_metrics,
     optimizers: Optional[Tuple[optimizer.Optimizer, optimizer.lr.LRScheduler]] = (None, None),
     training_args: Optional[TrainingArguments] = None,
     trainer_callbacks=[DefaultFlowCallback],
@@ -54,6 +77,10 @@ def finetune(
         raise ValueError(
             "Cannot load best model at end when do_eval is False. Auto-adjust. Please adjust load_best_model_at_end or do_eval."
         )
+    if is_streaming and (dataset_cache_dir or is_group_by_length or negative_ratio is not None):
+        raise ValueError("is_streaming cannot be combined with dataset_cache_dir, is_group_by_length or negative_ratio.")
+    if is_accumulate_metrics and compute_metrics is not default_compute_metrics:
+        raise ValueError("is_accumulate_metrics replaces compute_metrics, a custom compute_metrics cannot be applied.")
 
     logger.info(
         f"Process rank: {training_args.local_rank}, device: {training_args.device}, world_size: {training_args.world_size}, "
@@ -63,38 +90,115 @@ def finetune(
     # Model & Data Setup
     # TODO 這邊如果不放dev_path會有問題
     set_device(training_args.device)
-    train_dataset, dev_dataset, test_dataset = (
-        load_dataset(
-            read_data_by_chunk,
-            data_path=data,
-            max_seq_len=max_seq_len,
-            lazy=False,
-        )
-        for data in (train_path, dev_path, test_path)
-    )
     tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+    read_kwargs = dict(
+        max_seq_len=max_seq_len,
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        tokenizer=tokenizer if is_chunk_by_token else None,
+    )
     model = UIE.from_pretrained(model_name_or_path)
+    # The default conversion tokenizes many chunks per tokenizer call where the chunks are converted block by block
+    # (cache, streaming) or when asked to; a batched map on the in-memory dataset keeps every feature in memory.
+    is_batched = convert_and_tokenize_function is convert_to_uie_format and bool(
+        dataset_cache_dir or is_streaming or is_batched_tokenization
+    )
     convert_function = partial(
-        convert_and_tokenize_function,
+        convert_to_uie_format_batch if is_batched else convert_and_tokenize_function,
         tokenizer=tokenizer,
         max_seq_len=max_seq_len,
     )
+    if convert_and_tokenize_function is convert_to_uie_format:
+        # Custom conversion functions may not take pad_to_max_seq_len.
+        convert_function = partial(convert_function, pad_to_max_seq_len=not is_dynamic_padding)
     # TODO solve none dev_dataset
-    train_dataset, dev_dataset, test_dataset = (
-        data.map(convert_function) for data in (train_dataset, dev_dataset, test_dataset)
-    )
+    truncation_statistics = {"train": {}, "dev": {}, "test": {}}
+    # Custom conversion functions may not take statistics, their truncation is not logged.
+    is_counting_truncation = is_accepting_statistics(convert_and_tokenize_function)
+
+    def get_convert_function(name: str) -> Callable:
+        if not is_counting_truncation:
+            return convert_function
+        return partial(convert_function, statistics=truncation_statistics[name])
+
+    if dataset_cache_dir:
+        identity = get_dataset_identity(
+            tokenizer,
+            convert_and_tokenize_function,
+            chunk_overlap=chunk_overlap,
+            is_chunk_by_sentence=is_chunk_by_sentence,
+            is_chunk_by_token=is_chunk_by_token,
+            pad_to_max_seq_len=not is_dynamic_padding,
+        )
+        train_dataset, dev_dataset, test_dataset = (
+            load_tokenized_dataset(
+                dataset_cache_dir,
+                data,
+                read_fun=partial(read_data_by_chunk, data_path=data, **read_kwargs),
+                convert_fun=convert_function,
+                max_seq_len=max_seq_len,
+                identity=identity,
+                is_batched=is_batched,
+            )
+            for data in (train_path, dev_path, test_path)
+        )
+        for name, dataset in zip(truncation_statistics, (train_dataset, dev_dataset, test_dataset)):
+            truncation_statistics[name] = dataset.meta["statistics"]
+    elif is_streaming:
+        train_dataset, dev_dataset, test_dataset = (
+            StreamingDataset(
+                read_fun=partial(read_data_by_chunk, data_path=data, **read_kwargs),
+                convert_fun=get_convert_function(name),
+                shuffle_buffer_size=shuffle_buffer_size if name == "train" else 0,
+                seed=training_args.seed,
+                is_batched=is_batched,
+            )
+            for name, data in zip(truncation_statistics, (train_path, dev_path, test_path))
+        )
+        if training_args.do_train and training_args.max_steps <= 0:
+            # The Trainer needs max_steps for an IterableDataset, count the chunks without keeping them.
+            num_chunks = sum(1 for _ in read_data_by_chunk(train_path, **read_kwargs))
+            global_batch_size = training_args.per_device_train_batch_size * training_args.dataset_world_size
+            num_batches = math.ceil(num_chunks / global_batch_size)
+            training_args.max_steps = math.ceil(
+                max(1, num_batches // training_args.gradient_accumulation_steps) * training_args.num_train_epochs
+            )
+            logger.info(f"Streaming {num_chunks} training chunks, set max_steps to {training_args.max_steps}.")
+    else:
+        train_dataset, dev_dataset, test_dataset = (
+            load_dataset(read_data_by_chunk, data_path=data, lazy=False, **read_kwargs)
+            for data in (train_path, dev_path, test_path)
+        )
+        train_dataset, dev_dataset, test_dataset = (
+            data.map(get_convert_function(name), batched=is_batched)
+            for name, data in zip(truncation_statistics, (train_dataset, dev_dataset, test_dataset))
+        )
+
+    # Taken from the cache or from result_list before tokenization, shared by the log and NegativeSamplingBatchSampler.
+    train_positive_mask = None
+    if training_args.do_train and not is_streaming:
+        train_positive_mask = get_positive_mask(train_dataset)
+        log_dataset_composition(train_positive_mask, name="train", negative_ratio=negative_ratio)
 
     # Trainer Setup
-    trainer = Trainer(
+    # UIEDataCollator only keeps its own fields, the Trainer's default collator is used unless batches need it.
+    is_uie_collator = is_dynamic_padding or is_group_by_length or negative_ratio is not None
+    data_collator = UIEDataCollator(tokenizer.pad_token_id) if is_uie_collator else None
+    trainer = UIETrainer(
         model=model,
         criterion=criterion,
         args=training_args,
+        data_collator=data_collator,
         train_dataset=train_dataset if training_args.do_train else None,
         eval_dataset=dev_dataset if training_args.do_eval else None,
         tokenizer=tokenizer,
         compute_metrics=compute_metrics,
         optimizers=optimizers,
         callbacks=trainer_callbacks,
+        is_group_by_length=is_group_by_length,
+        negative_ratio=negative_ratio,
+        is_accumulate_metrics=is_accumulate_metrics,
+        train_positive_mask=train_positive_mask,
     )
     trainer.optimizers = (
         optimizer.AdamW(learning_rate=training_args.learning_rate, parameters=model.parameters())
@@ -146,6 +250,13 @@ def finetune(
             export_model_dir = os.path.join(training_args.output_dir, "export")
         export_model(model=trainer.model, input_spec=UIE_input_spec, path=export_model_dir)
         trainer.tokenizer.save_pretrained(export_model_dir)
+    for name, statistics in truncation_statistics.items():
+        log_truncation_statistics(statistics, name=name)
+    if data_collator:
+        logger.info(
+            f"Tokens processed: {data_collator.num_padded_tokens} "
+            f"(padding efficiency: {data_collator.padding_efficiency:.2%})."
+        )
     logger.info("Finish training.")
 
 
@@ -162,6 +273,17 @@ if __name__ == "__main__":
         dev_file=data_args.dev_file,
         test_file=data_args.test_file,
         max_seq_len=model_args.max_seq_len,
+        chunk_overlap=model_args.chunk_overlap,
+        is_chunk_by_sentence=model_args.is_chunk_by_sentence,
+        is_chunk_by_token=model_args.is_chunk_by_token,
+        dataset_cache_dir=data_args.dataset_cache_dir,
+        is_streaming=data_args.is_streaming,
+        shuffle_buffer_size=data_args.shuffle_buffer_size,
+        is_batched_tokenization=data_args.is_batched_tokenization,
+        is_dynamic_padding=model_args.is_dynamic_padding,
+        is_group_by_length=data_args.is_group_by_length,
+        negative_ratio=data_args.negative_ratio,
+        is_accumulate_metrics=data_args.is_accumulate_metrics,
         model_name_or_path=model_args.model_name_or_path,
         export_model_dir=data_args.export_model_dir,
         training_args=training_args,
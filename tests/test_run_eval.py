@@ -0,0 +1,186 @@
+from run_eval import evaluate, evaluate_loop_by_document, get_progress_bar
+from utils.data_utils import (
+    read_data_by_chunk,
+    convert_to_uie_format_batch,
+    create_data_loader,
+    StreamingDataset,
+    UIEDataCollator,
+)
+from paddlenlp.datasets import MapDataset
+import json
+import numpy as np
+import paddle
+import pytest
+
+
+@pytest.fixture
+def document_data_loader(tmp_path):
+    from paddlenlp.transformers import ErnieTokenizer
+
+    vocab = ["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額原告請求新臺幣萬元及醫療費用0123456789,") + ["##0", "##00"]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n", encoding="utf8")
+    tokenizer = ErnieTokenizer(str(vocab_file))
+    data_path = tmp_path / "dev.txt"
+    documents = [
+        {
+            "content": "原告請求新臺幣10萬元及醫療費用3,000元",
+            "result_list": [{"text": "10萬元", "start": 7, "end": 11}, {"text": "3,000元", "start": 16, "end": 22}],
+            "prompt": "金額",
+        },
+        {"content": "原告請求", "result_list": [], "prompt": "金額"},
+        {"content": "醫療費用1,000元", "result_list": [{"text": "1,000元", "start": 4, "end": 10}], "prompt": "金額"},
+    ]
+    data_path.write_text("".join(json.dumps(each, ensure_ascii=False) + "\n" for each in documents), encoding="utf8")
+    chunks = list(read_data_by_chunk(str(data_path), max_seq_len=16, chunk_overlap=4, is_keep_offset=True))
+    features = convert_to_uie_format_batch(chunks, tokenizer, max_seq_len=16, pad_to_max_seq_len=False)
+    collator = UIEDataCollator(tokenizer.pad_token_id)
+    return str(data_path), create_data_loader(MapDataset(features), mode="test", batch_size=2, collate_fn=collator)
+
+
+class ReplayModel:
+    """Returns the given start/end probabilities batch by batch."""
+
+    def __init__(self, outputs):
+        self.outputs = iter(outputs)
+
+    def eval(self):
+        pass
+
+    def train(self):
+        pass
+
+    def __call__(self, **inputs):
+        return next(self.outputs)
+
+
+def test_evaluate_loop_by_document_deduplicate_overlapping_chunks(document_data_loader):
+    # given
+    data_path, data_loader = document_data_loader
+    labels = [(batch["start_positions"], batch["end_positions"]) for batch in data_loader]
+    num_chunk_spans = sum(int(start.sum()) for start, _ in labels)
+
+    # when
+    perfect = evaluate_loop_by_document(ReplayModel(labels), data_loader, data_path)
+    missed = evaluate_loop_by_document(
+        ReplayModel((start * 0, end * 0) for start, end in labels), data_loader, data_path
+    )
+
+    # then
+    assert num_chunk_spans > 3
+    assert perfect == (1.0, 1.0, 1.0)
+    assert missed == (0.0, 0.0, 0.0)
+
+
+def test_evaluate_loop_by_document_map_spans_to_document_offsets(document_data_loader):
+    # given
+    data_path, data_loader = document_data_loader
+    outputs = []
+    for batch in data_loader:
+        start, end = np.zeros(batch["input_ids"].shape, "float32"), np.zeros(batch["input_ids"].shape, "float32")
+        offset_mapping, token_type_ids = batch["offset_mapping"].numpy(), batch["token_type_ids"].numpy()
+        for row, (doc_id, offset) in enumerate(zip(batch["doc_id"].numpy(), batch["offset"].numpy())):
+            # Predict "3,000元" (16, 22) of the first document, and nothing else.
+            for token, (char_start, char_end) in enumerate(offset_mapping[row]):
+                if doc_id == 0 and token_type_ids[row, token] == 1 and char_end > 0:
+                    start[row, token] = float(char_start + offset == 16)
+                    end[row, token] = float(char_end + offset == 22)
+        outputs.append((paddle.to_tensor(start), paddle.to_tensor(end)))
+
+    # when
+    precision, recall, f1 = evaluate_loop_by_document(ReplayModel(outputs), data_loader, data_path)
+
+    # then
+    assert (precision, recall) == (1.0, 1 / 3)
+
+
+def test_evaluate_sweep_checkpoints_in_step_order(tiny_uie_task_path, tmp_path):
+    # given
+    import shutil
+
+    output_dir = tmp_path / "output"
+    for name in ("checkpoint-10", "checkpoint-2", "runs"):
+        shutil.copytree(tiny_uie_task_path, output_dir / name)
+
+    # when
+    results = evaluate(
+        "./tests/data/example_model_input_data.txt",
+        device="cpu",
+        model_name_or_path=tiny_uie_task_path,
+        batch_size=4,
+        is_dynamic_padding=True,
+        eval_checkpoints=[str(output_dir), tiny_uie_task_path],
+    )
+
+    # then
+    assert [result["checkpoint"] for result in results] == [
+        str(output_dir / "checkpoint-2"),
+        str(output_dir / "checkpoint-10"),
+        tiny_uie_task_path,
+    ]
+    assert len({(result["precision"], result["recall"], result["f1"]) for result in results}) == 1
+    assert all(result["eval_samples_per_second"] > 0 and result["eval_tokens_per_second"] > 0 for result in results)
+
+
+def test_evaluate_with_batched_tokenization_same_as_lazy(tiny_uie_task_path):
+    # given
+    evaluate_kwargs = dict(device="cpu", model_name_or_path=tiny_uie_task_path, batch_size=4, max_seq_len=64)
+
+    # when
+    lazy_results = evaluate("./tests/data/example_model_input_data.txt", **evaluate_kwargs)
+    batched_results = evaluate(
+        "./tests/data/example_model_input_data.txt", is_batched_tokenization=True, **evaluate_kwargs
+    )
+
+    # then
+    assert [(result["precision"], result["recall"], result["f1"]) for result in lazy_results] == [
+        (result["precision"], result["recall"], result["f1"]) for result in batched_results
+    ]
+
+
+def test_evaluate_sweep_checkpoints_tokenize_once(tiny_uie_task_path, monkeypatch):
+    # given
+    import run_eval
+
+    num_converted, logged_statistics = [], []
+    convert_to_uie_format = run_eval.convert_to_uie_format
+
+    def counted_convert_to_uie_format(*args, **kwargs):
+        num_converted.append(1)
+        return convert_to_uie_format(*args, **kwargs)
+
+    monkeypatch.setattr(run_eval, "convert_to_uie_format", counted_convert_to_uie_format)
+    monkeypatch.setattr(
+        run_eval, "log_truncation_statistics", lambda statistics, name: logged_statistics.append(statistics)
+    )
+    num_chunks = len(list(read_data_by_chunk("./tests/data/example_model_input_data.txt", max_seq_len=64)))
+
+    # when
+    evaluate(
+        "./tests/data/example_model_input_data.txt",
+        device="cpu",
+        model_name_or_path=tiny_uie_task_path,
+        batch_size=4,
+        max_seq_len=64,
+        eval_checkpoints=[tiny_uie_task_path] * 3,
+    )
+
+    # then
+    assert len(num_converted) == num_chunks
+    assert logged_statistics[0]["num_chunks"] == num_chunks
+
+
+def test_get_progress_bar_total_unless_iterable_dataset():
+    # given
+    data_loader = create_data_loader(MapDataset(list(range(10))), mode="test", batch_size=4)
+    streaming_data_loader = create_data_loader(
+        StreamingDataset(read_fun=lambda: iter(range(10)), convert_fun=lambda data: data), mode="test", batch_size=4
+    )
+
+    # when
+    progress_bar = get_progress_bar(data_loader)
+    streaming_progress_bar = get_progress_bar(streaming_data_loader)
+
+    # then
+    assert progress_bar.total == 3 and len(list(progress_bar)) == 3
+    assert streaming_progress_bar.total is None and len(list(streaming_progress_bar)) == 3
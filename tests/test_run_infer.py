@@ -0,0 +1,479 @@
+from run_infer import Processer, inference, inference_by_stream
+import run_infer
+from utils.infer_utils import (
+    CrossDocumentPredictor,
+    ResumableResultWriter,
+    get_data_checksum,
+    merge_overlapping_spans,
+    write_inference_results_as_table,
+    write_inference_results_by_line,
+)
+from config.base_config import entity_type, regularized_token
+from paddlenlp import Taskflow
+import json
+import re
+import pandas as pd
+import pytest
+
+
+def test_cross_document_predictor_same_as_taskflow(tiny_uie_task_path):
+    # given
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f] + ["", "醫療費用1,680元"]
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        task_path=tiny_uie_task_path,
+        batch_size=3,
+        device_id=-1,
+        position_prob=0.9,
+    )
+
+    # when
+    expected = [uie(text) for text in text_list]
+    result = list(CrossDocumentPredictor(uie, schema=entity_type, batch_size=5).predict(iter(text_list)))
+
+    # then
+    assert result == expected
+
+
+def test_inference_batch_across_docs_keeps_postprocess_shape(tiny_uie_task_path):
+    # given
+    processer = Processer(select_strategy="max", select_key=["text", "probability"])
+
+    # when
+    result = inference(
+        data_file="./data/model_infer_data/example.txt",
+        schema=entity_type,
+        device_id=-1,
+        batch_size=4,
+        task_path=tiny_uie_task_path,
+        postprocess_fun=processer.postprocess,
+        is_batch_across_docs=True,
+    )
+
+    # then
+    assert len(result) == 4
+    for each_result in result:
+        assert isinstance(each_result, list) and len(each_result) == 1
+        for entity_results in each_result[0].values():
+            assert len(entity_results) == 1
+            assert set(entity_results[0].keys()) == {"text", "probability"}
+
+
+def test_inference_by_stream_write_one_line_per_document(tiny_uie_task_path, tmp_path):
+    # given
+    processer = Processer(select_strategy="all", select_key=["text", "probability"])
+    inference_kwargs = dict(
+        data_file="./data/model_infer_data/example.txt",
+        schema=entity_type,
+        device_id=-1,
+        task_path=tiny_uie_task_path,
+        postprocess_fun=processer.postprocess,
+    )
+    save_path = str(tmp_path / "inference_results.txt")
+
+    # when
+    num_docs = write_inference_results_by_line(inference_by_stream(**inference_kwargs), save_path, flush_steps=1)
+
+    # then
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        expected_contents = [line.strip() for line in f]
+    with open(save_path, "r", encoding="utf8") as f:
+        lines = [json.loads(line) for line in f]
+    assert num_docs == len(expected_contents)
+    assert [line["Content"] for line in lines] == expected_contents
+    assert [line["InferenceResults"] for line in lines] == inference(**inference_kwargs)
+
+
+def test_resumable_result_writer_resume_after_interruption(tiny_uie_task_path, tmp_path):
+    # given
+    processer = Processer(select_strategy="all", select_key=["text", "probability"])
+    data_file = "./data/model_infer_data/example.txt"
+    inference_kwargs = dict(
+        data_file=data_file,
+        schema=entity_type,
+        device_id=-1,
+        task_path=tiny_uie_task_path,
+        postprocess_fun=processer.postprocess,
+    )
+    expected_path = str(tmp_path / "expected.txt")
+    save_path = str(tmp_path / "inference_results.txt")
+    write_inference_results_by_line(inference_by_stream(**inference_kwargs), expected_path)
+
+    def interrupted_results():
+        for i, result in enumerate(inference_by_stream(**inference_kwargs)):
+            if i == 2:
+                raise KeyboardInterrupt
+            yield result
+
+    with pytest.raises(KeyboardInterrupt):
+        ResumableResultWriter(save_path, get_data_checksum(data_file), flush_steps=1).write(interrupted_results())
+    with open(save_path, "a", encoding="utf8") as f:
+        f.write('{"Content": "half written')
+
+    # when
+    writer = ResumableResultWriter(save_path, get_data_checksum(data_file), flush_steps=1)
+    num_finished_docs = writer.num_finished_docs
+    num_docs = writer.write(inference_by_stream(skip_docs=num_finished_docs, **inference_kwargs))
+
+    # then
+    with open(expected_path, "r", encoding="utf8") as f:
+        expected = f.read()
+    with open(save_path, "r", encoding="utf8") as f:
+        assert f.read() == expected
+    assert num_finished_docs == 2
+    assert num_docs == len(expected.splitlines())
+
+
+def test_inference_with_workers_same_as_single_process(tiny_uie_task_path):
+    # given
+    processer = Processer(select_strategy="all", select_key=["text", "probability"], is_regularize_data=True)
+    inference_kwargs = dict(
+        data_file="./data/model_infer_data/example.txt",
+        schema=entity_type,
+        device_id=-1,
+        batch_size=2,
+        task_path=tiny_uie_task_path,
+        postprocess_fun=processer.postprocess,
+        preprocess_fun=processer.preprocess,
+    )
+
+    # when
+    result = inference(num_workers=2, num_threads=1, **inference_kwargs)
+
+    # then
+    assert result == inference(**inference_kwargs)
+
+
+def test_inference_with_cache_same_as_without_cache(tiny_uie_task_path, tmp_path):
+    # given
+    cache_dir = str(tmp_path / "cache")
+    inference_kwargs = dict(
+        data_file="./data/model_infer_data/example.txt",
+        schema=entity_type,
+        device_id=-1,
+        task_path=tiny_uie_task_path,
+    )
+    expected = inference(**inference_kwargs)
+
+    # when
+    first_result = inference(cache_dir=cache_dir, **inference_kwargs)
+    second_result = inference(cache_dir=cache_dir, **inference_kwargs)
+
+    # then
+    assert first_result == expected
+    assert second_result == expected
+
+
+def test_inference_worker_with_cache_create_taskflow_once(tiny_uie_task_path, tmp_path, monkeypatch):
+    # given
+    taskflow_kwargs = dict(schema=entity_type, device_id=-1, batch_size=1, task_path=tiny_uie_task_path)
+    num_created = []
+
+    def create_taskflow(**kwargs):
+        num_created.append(1)
+        return Taskflow("information_extraction", **kwargs)
+
+    monkeypatch.setattr(run_infer, "create_taskflow", create_taskflow)
+    monkeypatch.setattr(run_infer, "_worker_state", {})
+    cache = run_infer.create_inference_cache(str(tmp_path / "cache"), entity_type, "fp32", "uie-base", tiny_uie_task_path)
+    run_infer._init_inference_worker(None, taskflow_kwargs, run_infer.identity, False, {}, cache)
+
+    # when
+    first_results, _ = run_infer._inference_worker((0, 1, ["醫療費用1,680元"]))
+    second_results, _ = run_infer._inference_worker((1, 2, ["薪資收入3萬元"]))
+
+    # then
+    assert len(num_created) == 1
+    assert len(first_results) == len(second_results) == 1
+
+
+def test_cross_document_predictor_with_bucket_size_pad_less(tiny_uie_task_path):
+    # given
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f] + ["醫療費用1,680元", "薪資收入"]
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        task_path=tiny_uie_task_path,
+        device_id=-1,
+        position_prob=0.9,
+    )
+    predictor = CrossDocumentPredictor(uie, schema=entity_type, batch_size=4)
+    bucketed_predictors = [
+        CrossDocumentPredictor(uie, schema=entity_type, batch_size=4, bucket_size=bucket_size) for bucket_size in (1, 10)
+    ]
+
+    # when
+    _ = list(predictor.predict(text_list))
+    expected, result = (list(each_predictor.predict(text_list)) for each_predictor in bucketed_predictors)
+
+    # then
+    assert bucketed_predictors[1].bucket_size == 12
+    assert predictor.padding_efficiency < min(each.padding_efficiency for each in bucketed_predictors)
+    assert len(result) == len(expected)
+    for each_result, each_expected in zip(result, expected):
+        assert each_result[0].keys() == each_expected[0].keys()
+        for entity in each_expected[0]:
+            assert len(each_result[0][entity]) == len(each_expected[0][entity])
+            for span, expected_span in zip(each_result[0][entity], each_expected[0][entity]):
+                assert {**span, "probability": None} == {**expected_span, "probability": None}
+                assert abs(span["probability"] - expected_span["probability"]) < 1e-4
+
+
+def test_processer_remap_offsets_to_original_text():
+    # given
+    text = "原告 請求\n精神慰撫金\u3000100,000元\\n整"
+    processer = Processer(is_regularize_data=True)
+    expected_regularized_text = text
+    for re_term in regularized_token:
+        expected_regularized_text = re.sub(re_term, "", expected_regularized_text)
+
+    regularized_text = processer.preprocess(text)
+    spans = ["100,000元", "請求精神", "整"]
+    result = [
+        {
+            "精神慰撫金額": [
+                {
+                    "text": span,
+                    "start": regularized_text.index(span),
+                    "end": regularized_text.index(span) + len(span),
+                    "probability": 0.9,
+                }
+                for span in spans
+            ]
+        }
+    ]
+
+    # when
+    remapped_result = processer.remap_offsets(text, result)
+
+    # then
+    assert regularized_text == expected_regularized_text
+    assert [text[span["start"] : span["end"]] for span in remapped_result[0]["精神慰撫金額"]] == [
+        "100,000元",
+        "請求\n精神",
+        "整",
+    ]
+    assert result[0]["精神慰撫金額"][0]["start"] == regularized_text.index("100,000元")
+
+
+def test_processer_remap_offsets_reuse_deletions_from_preprocess(monkeypatch):
+    # given
+    import pickle
+
+    text = "原告 請求\n精神慰撫金\u3000100,000元\\n整"
+    processer = Processer(is_regularize_data=True)
+    regularized_text = processer.preprocess(text)
+    span = "100,000元"
+    result = [{"金額": [{"text": span, "start": regularized_text.index(span), "end": regularized_text.index(span) + len(span)}]}]
+    unpickled_processer = pickle.loads(pickle.dumps(processer))
+    scanned_result = unpickled_processer.remap_offsets(text, result)
+
+    # when
+    monkeypatch.setattr(processer.regularizer, "pattern", None)
+    remapped_result = processer.remap_offsets(text, result)
+
+    # then
+    assert remapped_result == scanned_result
+    assert text[remapped_result[0]["金額"][0]["start"] : remapped_result[0]["金額"][0]["end"]] == span
+
+
+@pytest.mark.parametrize("layout", ["doc", "span"])
+def test_write_inference_results_as_table(layout, tmp_path):
+    # given
+    results = [
+        (
+            "content 0",
+            [
+                {
+                    "精神慰撫金額": [
+                        {"text": "10萬元", "start": 3, "end": 7, "probability": 0.4},
+                        {"text": "5,000元", "start": 9, "end": 15, "probability": 0.9},
+                    ]
+                }
+            ],
+        ),
+        ("content 1", [{}]),
+        ("content 2", [{"醫療費用": [{"text": "300元", "start": 0, "end": 4, "probability": 0.8}]}]),
+    ]
+    save_path = str(tmp_path / "inference_results.csv")
+
+    # when
+    num_docs = write_inference_results_as_table(
+        iter(results), save_path, schema=entity_type, layout=layout, flush_steps=2
+    )
+
+    # then
+    table = pd.concat(pd.read_csv(save_path, chunksize=2, encoding="utf_8_sig", dtype={"text": str}))
+    assert num_docs == 3
+    if layout == "doc":
+        assert table.columns.tolist() == ["doc_id"] + entity_type
+        assert table["doc_id"].tolist() == [0, 1, 2]
+        assert table["精神慰撫金額"].fillna("").tolist() == ["5,000元", "", ""]
+        assert table["醫療費用"].fillna("").tolist() == ["", "", "300元"]
+    else:
+        assert table.columns.tolist() == ["doc_id", "entity", "text", "start", "end", "probability"]
+        assert table["doc_id"].tolist() == [0, 0, 2]
+        assert table["text"].tolist() == ["10萬元", "5,000元", "300元"]
+        assert table["start"].tolist() == [3, 9, 0]
+        assert table["probability"].tolist() == [0.4, 0.9, 0.8]
+
+
+def test_merge_overlapping_spans_keep_max_probability_across_chunks():
+    # given
+    chunk_spans = [
+        [
+            {"text": "10萬", "start": 10, "end": 13, "probability": 0.6},
+            {"text": "原告", "start": 0, "end": 2, "probability": 0.7},
+        ],
+        [
+            {"text": "10萬元", "start": 10, "end": 14, "probability": 0.9},
+            {"text": "萬元", "start": 12, "end": 14, "probability": 0.5},
+        ],
+        [{"text": "10萬元", "start": 10, "end": 14, "probability": 0.8}],
+    ]
+
+    # when
+    spans = merge_overlapping_spans(chunk_spans)
+
+    # then
+    assert spans == [
+        {"text": "原告", "start": 0, "end": 2, "probability": 0.7},
+        {"text": "10萬元", "start": 10, "end": 14, "probability": 0.9},
+        {"text": "萬元", "start": 12, "end": 14, "probability": 0.5},
+    ]
+
+
+def test_cross_document_predictor_with_chunk_overlap_return_document_offsets(tiny_uie_task_path):
+    # given
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f] + ["醫療費用1,680元"]
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        task_path=tiny_uie_task_path,
+        device_id=-1,
+        max_seq_len=128,
+        position_prob=0.9,
+    )
+
+    # when
+    predictor = CrossDocumentPredictor(uie, schema=entity_type, batch_size=8, chunk_overlap=32)
+    results = list(predictor.predict(iter(text_list)))
+
+    # then
+    assert predictor.num_chunks > len(CrossDocumentPredictor(uie, schema=entity_type).split(text_list[0], "醫療費用"))
+    assert len(results) == len(text_list)
+    assert results[-1] == uie(text_list[-1])
+    for text, result in zip(text_list, results):
+        for spans in result[0].values():
+            spans = [span for span in spans if "start" in span]
+            assert all(text[span["start"] : span["end"]] == span["text"] for span in spans)
+            assert spans == sorted(spans, key=lambda span: (span["start"], span["end"]))
+
+
+def test_cross_document_predictor_by_sentence_cut_at_clause_end(tiny_uie_task_path):
+    # given
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f]
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        task_path=tiny_uie_task_path,
+        device_id=-1,
+        max_seq_len=128,
+        position_prob=0.9,
+    )
+
+    # when
+    predictor = CrossDocumentPredictor(uie, schema=entity_type, batch_size=8, is_chunk_by_sentence=True)
+    chunks = predictor.split(text_list[0], "醫療費用")
+    results = list(predictor.predict(iter(text_list)))
+
+    # then
+    assert "".join(chunk for _, chunk in chunks) == text_list[0]
+    assert all(len(chunk) <= 128 - len("醫療費用") - 3 for _, chunk in chunks)
+    assert all(chunk[-1] in "。；，！？：\n" for _, chunk in chunks[:-1])
+    assert predictor.num_chunks >= predictor.num_fixed_chunks
+    assert len(results) == len(text_list)
+    for text, result in zip(text_list, results):
+        for spans in result[0].values():
+            assert all(text[span["start"] : span["end"]] == span["text"] for span in spans if "start" in span)
+
+
+def test_cross_document_predictor_by_token_fill_token_budget(tiny_uie_task_path):
+    # given
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f]
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        task_path=tiny_uie_task_path,
+        device_id=-1,
+        max_seq_len=128,
+        position_prob=0.9,
+    )
+
+    # when
+    predictor = CrossDocumentPredictor(uie, schema=entity_type, batch_size=8, is_chunk_by_token=True)
+    chunks = predictor.split(text_list[0], "醫療費用")
+    results = list(predictor.predict(iter(text_list)))
+
+    # then
+    assert "".join(chunk for _, chunk in chunks) == text_list[0]
+    assert all(len(predictor.tokenizer.tokenize(chunk)) <= 128 - 4 - 3 for _, chunk in chunks)
+    assert len(chunks) < len(CrossDocumentPredictor(uie, schema=entity_type).split(text_list[0], "醫療費用"))
+    assert predictor.num_truncated_chunks == 0
+    assert len(results) == len(text_list)
+    for text, result in zip(text_list, results):
+        for spans in result[0].values():
+            assert all(text[span["start"] : span["end"]] == span["text"] for span in spans if "start" in span)
+
+
+def test_cross_document_predictor_with_candidate_patterns_skip_chunks_without_match(tiny_uie_task_path):
+    # given
+    with open("./data/model_infer_data/example.txt", "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f] + ["原告請求醫療費用", "醫療費用1,680元"]
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        task_path=tiny_uie_task_path,
+        device_id=-1,
+        max_seq_len=128,
+        position_prob=0.9,
+    )
+    candidate_patterns = {entity: [r"\d"] for entity in entity_type}
+
+    # when
+    predictor = CrossDocumentPredictor(uie, schema=entity_type, batch_size=8)
+    filtered_predictor = CrossDocumentPredictor(
+        uie, schema=entity_type, batch_size=8, candidate_patterns=candidate_patterns
+    )
+    expected = list(predictor.predict(iter(text_list)))
+    results = list(filtered_predictor.predict(iter(text_list)))
+
+    # then
+    assert filtered_predictor.num_skipped_chunks > 0
+    assert filtered_predictor.num_chunks + filtered_predictor.num_skipped_chunks == predictor.num_chunks
+    for text, result, expected_result in zip(text_list, results, expected):
+        for entity in entity_type:
+            skipped = [
+                (offset, offset + len(chunk))
+                for offset, chunk in predictor.split(text, entity)
+                if not re.search(r"\d", chunk)
+            ]
+            kept_spans = [
+                span
+                for span in expected_result[0].get(entity, [])
+                if "start" in span and not any(start <= span["start"] < end for start, end in skipped)
+            ]
+            # Batches are composed differently, so probabilities may differ by float rounding.
+            spans = [span for span in result[0].get(entity, []) if "start" in span]
+            assert [dict(span, probability=None) for span in spans] == [
+                dict(span, probability=None) for span in kept_spans
+            ]
+            assert [span["probability"] for span in spans] == pytest.approx(
+                [span["probability"] for span in kept_spans]
+            )
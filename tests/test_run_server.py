@@ -0,0 +1,55 @@
+from run_server import create_postprocess_fun_factory, create_predict_fun
+from config.base_config import InferenceStrategyArguments, entity_type
+import pytest
+
+
+@pytest.mark.parametrize(
+    "request_body, error_type",
+    [
+        ({"select_strategy": "__class__.__init__"}, ValueError),
+        ({"select_strategy": "CustomizeYourName"}, ValueError),
+        ({"threshold": "0.5"}, TypeError),
+        ({"threshold": True}, TypeError),
+        ({"select_key": "text"}, TypeError),
+        ({"select_key": ["text", 1]}, TypeError),
+    ],
+)
+def test_postprocess_fun_factory_when_invalid_request_then_raise_error(request_body, error_type):
+    # given
+    postprocess_fun_factory = create_postprocess_fun_factory(InferenceStrategyArguments())
+
+    # when / then
+    with pytest.raises(error_type):
+        postprocess_fun_factory(request_body)
+
+
+def test_postprocess_fun_factory_use_request_strategy():
+    # given
+    postprocess_fun_factory = create_postprocess_fun_factory(InferenceStrategyArguments())
+    results = [[{"醫療費用": [{"text": "100元", "start": 0, "end": 4, "probability": 0.4}]}]]
+
+    # when
+    postprocess_fun = postprocess_fun_factory({"select_strategy": "threshold", "threshold": 1, "select_key": ["text"]})
+
+    # then
+    assert postprocess_fun(results) == [[{"醫療費用": []}]]
+
+
+@pytest.mark.parametrize("is_cache", [False, True])
+def test_create_predict_fun_with_candidate_patterns_skip_chunks_without_match(tiny_uie_task_path, tmp_path, is_cache):
+    # given
+    predict_fun = create_predict_fun(
+        schema=entity_type,
+        device_id=-1,
+        task_path=tiny_uie_task_path,
+        cache_dir=str(tmp_path) if is_cache else None,
+        max_seq_len=128,
+        candidate_patterns={entity: [r"\d"] for entity in entity_type},
+    )
+
+    # when
+    results = predict_fun(["原告請求醫療費用", "醫療費用1,680元"])
+
+    # then
+    assert results[0] == [{}]
+    assert any(results[1][0].get(entity) for entity in entity_type)
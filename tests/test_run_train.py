@@ -0,0 +1,73 @@
+from run_train import finetune
+from utils.data_utils import convert_to_uie_format
+from paddlenlp.trainer import TrainingArguments
+import shutil
+import pytest
+
+
+def convert_without_new_arguments(data, tokenizer, max_seq_len):
+    # The signature of custom conversion functions before statistics / pad_to_max_seq_len were added.
+    return convert_to_uie_format(data, tokenizer, max_seq_len=max_seq_len)
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    for name in ("train.txt", "dev.txt", "test.txt"):
+        shutil.copy("./tests/data/example_model_input_data.txt", tmp_path / name)
+    return str(tmp_path)
+
+
+def test_finetune_with_custom_convert_function(tiny_uie_task_path, dataset_path, tmp_path):
+    # given
+    training_args = TrainingArguments(
+        output_dir=str(tmp_path / "output"),
+        do_train=True,
+        do_eval=True,
+        max_steps=1,
+        per_device_train_batch_size=4,
+        per_device_eval_batch_size=4,
+        device="cpu",
+        report_to=[],
+    )
+
+    # when
+    finetune(
+        dataset_path=dataset_path,
+        train_file="train.txt",
+        dev_file="dev.txt",
+        test_file="test.txt",
+        max_seq_len=64,
+        model_name_or_path=tiny_uie_task_path,
+        convert_and_tokenize_function=convert_without_new_arguments,
+        training_args=training_args,
+    )
+
+    # then
+    assert (tmp_path / "output" / "model_state.pdparams").exists()
+
+
+def test_finetune_with_negative_sampling(tiny_uie_task_path, dataset_path, tmp_path):
+    # given
+    training_args = TrainingArguments(
+        output_dir=str(tmp_path / "output"),
+        do_train=True,
+        max_steps=1,
+        per_device_train_batch_size=4,
+        device="cpu",
+        report_to=[],
+    )
+
+    # when
+    finetune(
+        dataset_path=dataset_path,
+        train_file="train.txt",
+        dev_file="dev.txt",
+        test_file="test.txt",
+        max_seq_len=64,
+        negative_ratio=1.0,
+        model_name_or_path=tiny_uie_task_path,
+        training_args=training_args,
+    )
+
+    # then
+    assert (tmp_path / "output" / "model_state.pdparams").exists()
@@ -0,0 +1,255 @@
+from utils.cache_utils import InferenceCache
+import pytest
+
+
+@pytest.fixture
+def example_cache_kwargs(tmp_path):
+    return dict(cache_dir=str(tmp_path), schema=["醫療費用"], model_identity="uie-base")
+
+
+def test_inference_cache_predict_only_misses(example_cache_kwargs):
+    # given
+    cache = InferenceCache(**example_cache_kwargs)
+    predicted_texts = []
+
+    def predict_fun(texts):
+        predicted_texts.extend(texts)
+        return [[{"醫療費用": [{"text": text, "probability": 0.9}]}] for text in texts]
+
+    # when
+    first_result = list(cache.predict(["a", "b", "c"], predict_fun, block_size=2))
+    second_result = list(cache.predict(["c", "d", "a"], predict_fun, block_size=2))
+
+    # then
+    assert predicted_texts == ["a", "b", "c", "d"]
+    assert [result[0]["醫療費用"][0]["text"] for result in first_result + second_result] == list("abccda")
+    statistics = cache.statistics()
+    assert (statistics["hits"], statistics["misses"], statistics["entries"]) == (2, 4, 4)
+
+
+def test_inference_cache_key_depends_on_model_identity(example_cache_kwargs):
+    # given
+    cache = InferenceCache(**example_cache_kwargs)
+    cache.put_many(["a"], [[{}]])
+
+    # when
+    other_cache = InferenceCache(**{**example_cache_kwargs, "model_identity": "uie-tiny"})
+
+    # then
+    assert cache.get_many(["a"]) == [[{}]]
+    assert other_cache.get_many(["a"]) == [None]
+
+
+def test_inference_cache_evict_least_recently_used(example_cache_kwargs):
+    # given
+    cache = InferenceCache(max_size_mb=300 / 1024 / 1024, **example_cache_kwargs)
+    cache.put_many(["a", "b"], [["x" * 100], ["y" * 100]])
+    cache.get_many(["a"])
+
+    # when
+    cache.put_many(["c"], [["z" * 100]])
+
+    # then
+    assert cache.get_many(["a", "b", "c"]) == [["x" * 100], None, ["z" * 100]]
+
+
+def test_load_tokenized_dataset_reuse_memory_mapped_cache(tmp_path):
+    # given
+    from functools import partial
+    import json
+    import pickle
+    from paddlenlp.transformers import ErnieTokenizer
+    from utils.cache_utils import load_tokenized_dataset
+    from utils.data_utils import convert_to_uie_format, read_data_by_chunk
+
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額原告請求新臺幣萬元")), "utf8")
+    tokenizer = ErnieTokenizer(str(vocab_file))
+    data_path = tmp_path / "train.txt"
+    data_path.write_text(
+        json.dumps(
+            {"content": "原告請求新臺幣10萬元", "result_list": [{"text": "10萬元", "start": 7, "end": 11}], "prompt": "金額"},
+            ensure_ascii=False,
+        )
+        + "\n",
+        encoding="utf8",
+    )
+    num_converted = []
+
+    def convert_fun(data, statistics=None):
+        num_converted.append(1)
+        return convert_to_uie_format(data, tokenizer, max_seq_len=12, statistics=statistics)
+
+    kwargs = dict(
+        cache_dir=str(tmp_path / "cache"),
+        data_path=str(data_path),
+        read_fun=partial(read_data_by_chunk, data_path=str(data_path), max_seq_len=12),
+        convert_fun=convert_fun,
+        max_seq_len=12,
+        identity={"tokenizer": "tiny"},
+    )
+
+    # when
+    dataset = load_tokenized_dataset(**kwargs)
+    reloaded = load_tokenized_dataset(**kwargs)
+    other = load_tokenized_dataset(**{**kwargs, "identity": {"tokenizer": "other"}})
+
+    # then
+    expected = convert_to_uie_format(next(read_data_by_chunk(str(data_path), max_seq_len=12)), tokenizer, max_seq_len=12)
+    assert len(dataset) == len(reloaded) == 2
+    assert reloaded[0] == expected
+    assert reloaded.cache_path == dataset.cache_path != other.cache_path
+    assert len(num_converted) == 4
+    assert reloaded.meta["statistics"]["num_chunks"] == 2
+    assert len(pickle.dumps(reloaded)) < 1024
+
+
+def test_load_tokenized_dataset_keep_unpadded_lengths(tmp_path):
+    # given
+    from functools import partial
+    import json
+    from paddlenlp.transformers import ErnieTokenizer
+    from utils.cache_utils import load_tokenized_dataset
+    from utils.data_utils import convert_to_uie_format, read_data_by_chunk, get_feature_lengths, get_positive_mask
+
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額原告請求新臺幣萬元")), "utf8")
+    tokenizer = ErnieTokenizer(str(vocab_file))
+    data_path = tmp_path / "train.txt"
+    data_path.write_text(
+        json.dumps(
+            {"content": "原告請求新臺幣10萬元", "result_list": [{"text": "10萬元", "start": 7, "end": 11}], "prompt": "金額"},
+            ensure_ascii=False,
+        )
+        + "\n",
+        encoding="utf8",
+    )
+    convert_fun = partial(convert_to_uie_format, tokenizer=tokenizer, max_seq_len=12, pad_to_max_seq_len=False)
+
+    # when
+    dataset = load_tokenized_dataset(
+        str(tmp_path / "cache"),
+        str(data_path),
+        read_fun=partial(read_data_by_chunk, data_path=str(data_path), max_seq_len=12),
+        convert_fun=convert_fun,
+        max_seq_len=12,
+        identity={"tokenizer": "tiny"},
+    )
+
+    # then
+    expected = [convert_fun(data) for data in read_data_by_chunk(str(data_path), max_seq_len=12)]
+    assert [dataset[index] for index in range(len(dataset))] == expected
+    assert get_feature_lengths(dataset) == [len(features["input_ids"]) for features in expected]
+    assert min(get_feature_lengths(dataset)) < 12
+    assert get_positive_mask(dataset) == [any(features["start_positions"]) for features in expected] == [False, True]
+
+
+def test_load_tokenized_dataset_restore_read_statistics_from_cache(tmp_path):
+    # given
+    from functools import partial
+    import json
+    from paddlenlp.transformers import ErnieTokenizer
+    from utils.cache_utils import load_tokenized_dataset
+    from utils.data_utils import CandidateFilter, convert_to_uie_format, read_data_by_chunk
+
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額原告請求新臺幣萬元")), "utf8")
+    tokenizer = ErnieTokenizer(str(vocab_file))
+    data_path = tmp_path / "dev.txt"
+    data_path.write_text(
+        "\n".join(
+            json.dumps({"content": content, "result_list": result_list, "prompt": "金額"}, ensure_ascii=False)
+            for content, result_list in [
+                ("原告請求新臺幣10萬元", [{"text": "10萬元", "start": 7, "end": 11}]),
+                ("原告請求新臺幣萬元", [{"text": "萬元", "start": 7, "end": 9}]),
+            ]
+        )
+        + "\n",
+        encoding="utf8",
+    )
+
+    def load(candidate_filter):
+        return load_tokenized_dataset(
+            str(tmp_path / "cache"),
+            str(data_path),
+            read_fun=partial(
+                read_data_by_chunk, data_path=str(data_path), max_seq_len=32, candidate_filter=candidate_filter
+            ),
+            convert_fun=partial(convert_to_uie_format, tokenizer=tokenizer, max_seq_len=32),
+            max_seq_len=32,
+            identity={"tokenizer": "tiny"},
+            read_statistics_fun=candidate_filter.statistics,
+        )
+
+    # when
+    first_filter, second_filter = CandidateFilter({"金額": [r"\d"]}), CandidateFilter({"金額": [r"\d"]})
+    dataset = load(first_filter)
+    reloaded = load(second_filter)
+    second_filter.load_statistics(reloaded.meta["read_statistics"])
+
+    # then
+    assert len(dataset) == len(reloaded) == 1
+    assert dataset.meta["read_statistics"] == reloaded.meta["read_statistics"] == second_filter.statistics()
+    assert (second_filter.num_chunks, second_filter.num_skipped_chunks, second_filter.num_skipped_labels) == (2, 1, 1)
+
+
+def test_load_tokenized_dataset_with_convert_fun_without_statistics(tmp_path):
+    # given
+    from functools import partial
+    import json
+    from paddlenlp.transformers import ErnieTokenizer
+    from utils.cache_utils import load_tokenized_dataset
+    from utils.data_utils import convert_to_uie_format, read_data_by_chunk
+
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額原告請求新臺幣萬元")), "utf8")
+    tokenizer = ErnieTokenizer(str(vocab_file))
+    data_path = tmp_path / "train.txt"
+    data_path.write_text(
+        json.dumps(
+            {"content": "原告請求新臺幣10萬元", "result_list": [{"text": "10萬元", "start": 7, "end": 11}], "prompt": "金額"},
+            ensure_ascii=False,
+        )
+        + "\n",
+        encoding="utf8",
+    )
+
+    def convert_fun(data, tokenizer, max_seq_len):
+        return convert_to_uie_format(data, tokenizer, max_seq_len=max_seq_len)
+
+    # when
+    dataset = load_tokenized_dataset(
+        str(tmp_path / "cache"),
+        str(data_path),
+        read_fun=partial(read_data_by_chunk, data_path=str(data_path), max_seq_len=12),
+        convert_fun=partial(convert_fun, tokenizer=tokenizer, max_seq_len=12),
+        max_seq_len=12,
+        identity={"tokenizer": "tiny"},
+    )
+
+    # then
+    expected = [convert_fun(data, tokenizer, 12) for data in read_data_by_chunk(str(data_path), max_seq_len=12)]
+    assert [dataset[index] for index in range(len(dataset))] == expected
+    assert dataset.meta["statistics"] == {}
+
+
+def test_get_dataset_identity_same_for_training_and_evaluation(tmp_path):
+    # given
+    from paddlenlp.transformers import ErnieTokenizer
+    from utils.cache_utils import get_dataset_identity
+    from utils.data_utils import convert_to_uie_format
+
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額")), "utf8")
+    tokenizer = ErnieTokenizer(str(vocab_file))
+
+    # when
+    train_identity = get_dataset_identity(tokenizer, convert_to_uie_format, chunk_overlap=8)
+    eval_identity = get_dataset_identity(
+        tokenizer, convert_to_uie_format, chunk_overlap=8, entity_types=None, candidate_patterns=None
+    )
+    eval_by_class_identity = get_dataset_identity(tokenizer, convert_to_uie_format, chunk_overlap=8, entity_types=["金額"])
+
+    # then
+    assert train_identity == eval_identity
+    assert eval_by_class_identity != train_identity
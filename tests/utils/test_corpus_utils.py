@@ -0,0 +1,65 @@
+from utils.corpus_utils import CorpusReader
+import os
+import pytest
+
+
+def test_corpus_reader_when_path_not_found_then_raise_error():
+    # given
+    example_error_path = "./not/a/real/path"
+
+    # when
+    with pytest.raises(ValueError) as error:
+        _ = CorpusReader(example_error_path)
+
+    # then
+    expected_error = f"Data not found in {example_error_path}. Please input the correct path of data."
+    assert str(error.value) == expected_error
+
+
+def test_corpus_reader_same_as_read_lines(tmp_path):
+    # given
+    data_file = str(tmp_path / "corpus.txt")
+    with open(data_file, "w", encoding="utf8") as f:
+        f.write("第一篇 \n\n  第三篇醫療費用1,680元\r\n最後一篇沒有換行")
+    with open(data_file, "r", encoding="utf8") as f:
+        expected_text_list = [line.strip() for line in f]
+
+    # when
+    reader = CorpusReader(data_file)
+
+    # then
+    assert os.path.exists(data_file + ".idx.npy")
+    assert len(reader) == len(expected_text_list)
+    assert list(reader) == expected_text_list
+    assert [reader[doc_id] for doc_id in (2, 0, -1)] == [expected_text_list[i] for i in (2, 0, -1)]
+    assert [text for start, end in reader.split(3) for text in reader.iter_range(start, end)] == expected_text_list
+
+
+def test_corpus_reader_rebuild_index_when_file_modified(tmp_path):
+    # given
+    data_file = str(tmp_path / "corpus.txt")
+    with open(data_file, "w", encoding="utf8") as f:
+        f.write("a\nb\n")
+    assert list(CorpusReader(data_file)) == ["a", "b"]
+
+    # when
+    with open(data_file, "a", encoding="utf8") as f:
+        f.write("c\n")
+    reader = CorpusReader(data_file)
+
+    # then
+    assert list(reader) == ["a", "b", "c"]
+    assert reader.byte_range(1, 3) == (2, 6)
+
+
+def test_corpus_reader_empty_file(tmp_path):
+    # given
+    data_file = str(tmp_path / "corpus.txt")
+    open(data_file, "w").close()
+
+    # when
+    reader = CorpusReader(data_file)
+
+    # then
+    assert len(reader) == 0
+    assert list(reader) == []
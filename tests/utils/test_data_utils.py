@@ -1,4 +1,5 @@
 from utils.data_utils import *
+import json
 import pytest
 
 
@@ -54,3 +55,422 @@ def test_read_data_by_chunk_successful(example_model_input_content):
     # then
     expected_result_content = example_model_input_content[0][: (max_seq_len - len(prompt) - 3)]  # 3: [CLS] [SEP] [SEP]
     assert expected_result_content == result_content
+
+
+def test_read_data_by_chunk_when_result_cross_chunks_then_move_result_to_next_chunk(tmp_path):
+    # given
+    content = "原告請求精神慰撫金新臺幣10萬元及醫療費用3,000元"
+    result_list = [
+        {"text": "10萬元", "start": 12, "end": 16},
+        {"text": "3,000元", "start": 21, "end": 27},
+    ]
+    data_path = tmp_path / "example.txt"
+    data_path.write_text(
+        json.dumps({"content": content, "result_list": result_list, "prompt": "金額"}, ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
+    max_seq_len = 15 + len("金額") + 3  # 15 characters of content in each chunk
+
+    # when
+    chunks = list(read_data_by_chunk(data_path=str(data_path), max_seq_len=max_seq_len))
+
+    # then
+    assert [chunk["content"] for chunk in chunks] == ["原告請求精神慰撫金新臺幣", "10萬元及醫療費用3,000元"]
+    assert chunks[0]["result_list"] == []
+    assert chunks[1]["result_list"] == [
+        {"text": "10萬元", "start": 0, "end": 4},
+        {"text": "3,000元", "start": 9, "end": 15},
+    ]
+    assert result_list[0] == {"text": "10萬元", "start": 12, "end": 16}
+
+
+def test_get_sliding_windows_cover_content_with_overlap():
+    # given
+    content_len, max_content_len, chunk_overlap = 25, 10, 3
+
+    # when
+    windows = get_sliding_windows(content_len, max_content_len, chunk_overlap=chunk_overlap)
+
+    # then
+    assert windows == [(0, 10), (7, 17), (14, 24), (21, 25)]
+    assert get_sliding_windows(content_len, max_content_len) == [(0, 10), (10, 20), (20, 25)]
+    with pytest.raises(ValueError):
+        get_sliding_windows(content_len, max_content_len, chunk_overlap=max_content_len)
+
+
+def test_read_data_by_chunk_with_overlap_keep_result_across_boundary_whole(tmp_path):
+    # given
+    content = "原告請求精神慰撫金新臺幣10萬元及醫療費用3,000元"
+    result_list = [
+        {"text": "10萬元", "start": 12, "end": 16},
+        {"text": "3,000元", "start": 21, "end": 27},
+    ]
+    data_path = tmp_path / "example.txt"
+    data_path.write_text(
+        json.dumps({"content": content, "result_list": result_list, "prompt": "金額"}, ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
+    max_seq_len = 15 + len("金額") + 3  # 15 characters of content in each chunk
+
+    # when
+    chunks = list(read_data_by_chunk(data_path=str(data_path), max_seq_len=max_seq_len, chunk_overlap=7))
+
+    # then
+    assert [chunk["content"] for chunk in chunks] == [content[0:15], content[8:23], content[16:28]]
+    assert chunks[0]["result_list"] == []
+    assert chunks[1]["result_list"] == [{"text": "10萬元", "start": 4, "end": 8}]
+    assert chunks[2]["result_list"] == [{"text": "3,000元", "start": 5, "end": 11}]
+    assert result_list[0] == {"text": "10萬元", "start": 12, "end": 16}
+
+
+def test_get_sentence_windows_cut_at_clause_end_and_keep_spans_whole():
+    # given
+    content = "原告請求精神慰撫金，新臺幣10萬元。被告應賠償醫療費用新臺幣3,000元"
+    span = (content.index("3,000元"), len(content))
+
+    # when
+    windows = get_sentence_windows(content, max_content_len=14)
+    windows_with_span = get_sentence_windows(content, max_content_len=14, spans=[span])
+
+    # then
+    assert windows == [(0, 10), (10, 18), (18, 32), (32, 36)]
+    assert windows_with_span == [(0, 10), (10, 18), (18, 30), (30, 36)]
+    assert get_sentence_windows(content, max_content_len=len(content)) == [(0, len(content))]
+
+
+def test_read_data_by_chunk_by_sentence_keep_clauses_whole(tmp_path):
+    # given
+    content = "原告請求精神慰撫金，新臺幣10萬元。被告應賠償醫療費用新臺幣3,000元"
+    result_list = [
+        {"text": "10萬元", "start": 13, "end": 17},
+        {"text": "3,000元", "start": 30, "end": 36},
+    ]
+    data_path = tmp_path / "example.txt"
+    data_path.write_text(
+        json.dumps({"content": content, "result_list": result_list, "prompt": "金額"}, ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
+    max_seq_len = 14 + len("金額") + 3  # 14 characters of content in each chunk
+
+    # when
+    chunks = list(read_data_by_chunk(data_path=str(data_path), max_seq_len=max_seq_len, is_chunk_by_sentence=True))
+
+    # then
+    assert [chunk["content"] for chunk in chunks] == ["原告請求精神慰撫金，", "新臺幣10萬元。", "被告應賠償醫療費用新臺幣", "3,000元"]
+    assert chunks[1]["result_list"] == [{"text": "10萬元", "start": 3, "end": 7}]
+    assert chunks[3]["result_list"] == [{"text": "3,000元", "start": 0, "end": 6}]
+    with pytest.raises(ValueError):
+        list(read_data_by_chunk(data_path=str(data_path), chunk_overlap=2, is_chunk_by_sentence=True))
+
+
+@pytest.fixture
+def char_tokenizer(tmp_path):
+    from paddlenlp.transformers import ErnieTokenizer
+
+    vocab = ["[PAD]", "[CLS]", "[SEP]", "[MASK]", "[UNK]"] + list("金額原告請求新臺幣萬元及醫療費用0123456789,") + ["##0", "##00"]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n", encoding="utf8")
+    return ErnieTokenizer(str(vocab_file))
+
+
+def test_get_token_windows_fill_token_budget_and_keep_spans_whole(char_tokenizer):
+    # given
+    content = "原告請求新臺幣10萬元及醫療費用3,000元"  # 22 characters, 21 tokens ("10" and "000" are split into subwords)
+    span = (content.index("3,000元"), len(content))
+
+    # when
+    windows = get_token_windows(content, char_tokenizer, max_content_tokens=6)
+    windows_with_span = get_token_windows(content, char_tokenizer, max_content_tokens=6, spans=[span])
+
+    # then
+    assert windows == [(0, 6), (6, 12), (12, 18), (18, 22)]
+    assert windows_with_span == [(0, 6), (6, 12), (12, 16), (16, 22)]
+    assert get_token_windows(content, char_tokenizer, max_content_tokens=21) == [(0, len(content))]
+
+
+def test_convert_to_uie_format_count_truncation_and_drop_truncated_results(char_tokenizer):
+    # given
+    content = "原告請求新臺幣10萬元及醫療費用3,000元"
+    data = {
+        "content": content,
+        "result_list": [{"text": "10萬元", "start": 7, "end": 11}, {"text": "3,000元", "start": 16, "end": 22}],
+        "prompt": "金額",
+    }
+    statistics = {}
+
+    # when
+    truncated = convert_to_uie_format(dict(data), char_tokenizer, max_seq_len=16, statistics=statistics)
+    convert_to_uie_format(dict(data), char_tokenizer, max_seq_len=32, statistics=statistics)
+
+    # then
+    assert statistics == {"num_chunks": 2, "num_truncated_chunks": 1, "num_dropped_results": 1}
+    assert sum(truncated["start_positions"]) == 1.0
+    assert truncated["end_positions"][-1] == 0.0
+
+
+def test_read_data_by_chunk_by_token_never_truncate(char_tokenizer, tmp_path):
+    # given
+    content = "原告請求新臺幣10萬元及醫療費用3,000元"
+    result_list = [{"text": "3,000元", "start": 16, "end": 22}]
+    data_path = tmp_path / "example.txt"
+    data_path.write_text(
+        json.dumps({"content": content, "result_list": result_list, "prompt": "金額"}, ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
+    max_seq_len = 6 + len("金額") + 3  # 6 tokens of content in each chunk
+    statistics = {}
+
+    # when
+    chunks = list(read_data_by_chunk(data_path=str(data_path), max_seq_len=max_seq_len, tokenizer=char_tokenizer))
+    for chunk in chunks:
+        convert_to_uie_format(chunk, char_tokenizer, max_seq_len=max_seq_len, statistics=statistics)
+
+    # then
+    assert [chunk["content"] for chunk in chunks] == ["原告請求新臺", "幣10萬元及", "醫療費用", "3,000元"]
+    assert chunks[3]["result_list"] == [{"text": "3,000元", "start": 0, "end": 6}]
+    assert statistics["num_truncated_chunks"] == 0
+    with pytest.raises(ValueError):
+        list(read_data_by_chunk(data_path=str(data_path), chunk_overlap=2, tokenizer=char_tokenizer))
+
+
+def test_convert_to_uie_format_batch_same_as_per_sample(char_tokenizer, tmp_path):
+    # given
+    content = "原告請求新臺幣10萬元及醫療費用3,000元"
+    data_path = tmp_path / "example.txt"
+    data_path.write_text(
+        json.dumps(
+            {"content": content, "result_list": [{"text": "3,000元", "start": 16, "end": 22}], "prompt": "金額"},
+            ensure_ascii=False,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    batch_data = list(read_data_by_chunk(data_path=str(data_path), max_seq_len=12))
+    batch_statistics, sample_statistics = {}, {}
+
+    # when
+    features = convert_to_uie_format_batch(
+        [dict(data) for data in batch_data], char_tokenizer, max_seq_len=12, statistics=batch_statistics, batch_size=2
+    )
+    expected = [
+        convert_to_uie_format(dict(data), char_tokenizer, max_seq_len=12, statistics=sample_statistics)
+        for data in batch_data
+    ]
+
+    # then
+    assert len(batch_data) > 2
+    assert features == expected
+    assert batch_statistics == sample_statistics
+
+
+def test_convert_to_uie_format_batch_fallback_when_tokenizer_error(char_tokenizer):
+    # given
+    class FlakyTokenizer:
+        def __call__(self, text, text_pair, **kwargs):
+            if any(content == "壞" for content in text_pair):
+                raise ValueError("unknown character")
+            return char_tokenizer(text=text, text_pair=text_pair, **kwargs)
+
+    batch_data = [
+        {"content": "原告請求", "result_list": [], "prompt": "金額"},
+        {"content": "壞", "result_list": [{"text": "壞", "start": 0, "end": 1}], "prompt": "金額"},
+    ]
+
+    # when
+    features = convert_to_uie_format_batch([dict(data) for data in batch_data], FlakyTokenizer(), max_seq_len=12)
+
+    # then
+    assert features[0] == convert_to_uie_format(dict(batch_data[0]), char_tokenizer, max_seq_len=12)
+    fallback_data = {"content": "無文本", "result_list": [], "prompt": "金額"}
+    assert features[1] == convert_to_uie_format(fallback_data, char_tokenizer, max_seq_len=12)
+
+
+def test_uie_data_collator_pad_to_longest_in_batch(char_tokenizer):
+    # given
+    batch_data = [
+        {"content": "原告請求新臺幣10萬元", "result_list": [{"text": "10萬元", "start": 7, "end": 11}], "prompt": "金額"},
+        {"content": "原告", "result_list": [], "prompt": "金額"},
+    ]
+    padded = convert_to_uie_format_batch([dict(data) for data in batch_data], char_tokenizer, max_seq_len=32)
+    unpadded = convert_to_uie_format_batch(
+        [dict(data) for data in batch_data], char_tokenizer, max_seq_len=32, pad_to_max_seq_len=False
+    )
+    collator = UIEDataCollator(char_tokenizer.pad_token_id)
+
+    # when
+    batch = collator(unpadded)
+
+    # then
+    max_len = len(unpadded[0]["input_ids"])
+    assert len(unpadded[1]["input_ids"]) < max_len < 32
+    for name in UIEDataCollator.FIELDS:
+        assert batch[name].shape == [2, max_len]
+        assert batch[name].numpy().tolist() == [feature[name][:max_len] for feature in padded]
+    assert collator.num_padded_tokens == 2 * max_len
+    assert collator.num_real_tokens == sum(len(feature["input_ids"]) for feature in unpadded)
+
+
+def test_length_grouped_batch_sampler_group_similar_lengths_and_cover_all_indices():
+    # given
+    lengths = [5, 40, 7, 38, 6, 39, 8, 37, 9]
+    sampler = LengthGroupedBatchSampler(lengths, batch_size=2, shuffle=True, mega_batch_size=5, seed=1)
+
+    # when
+    epochs = [list(sampler), list(sampler)]
+    eval_batches = list(LengthGroupedBatchSampler(lengths, batch_size=2, shuffle=False))
+
+    # then
+    for batches in epochs:
+        assert sorted(index for batch in batches for index in batch) == list(range(len(lengths)))
+        assert len(batches) == len(sampler)
+    assert epochs[0] != epochs[1]
+    assert eval_batches == [[1, 5], [3, 7], [8, 6], [2, 4], [0]]
+
+
+def test_char_to_token_table_same_as_align_to_offset_mapping(char_tokenizer):
+    # given
+    offset_mappings = [
+        char_tokenizer(
+            text=["金額"],
+            text_pair=[content],
+            truncation=True,
+            max_seq_len=max_seq_len,
+            pad_to_max_seq_len=True,
+            return_offsets_mapping=True,
+            return_dict=False,
+        )[0]["offset_mapping"]
+        for content in ("原告請求新臺幣10萬元", "10,000元", "", "原告" * 20)
+        for max_seq_len in (8, 32)
+    ]
+    offset_mappings += [[(0, 0), (0, 2), (2, 4), (0, 0), (0, 1), (0, 3), (3, 4), (0, 0)], [(0, 0), (0, 0)]]
+
+    for offset_mapping in offset_mappings:
+        # when
+        table, drift = get_char_to_token_table(offset_mapping)
+
+        # then
+        adjusted_offset_mapping, expected_drift = drift_offsets_mapping(offset_mapping)
+        assert drift == expected_drift
+        for index in range(-2, max(end for _, end in adjusted_offset_mapping) + 3):
+            assert lookup_char_to_token_table(index, table) == align_to_offset_mapping(index, adjusted_offset_mapping)
+
+
+def test_negative_sampling_batch_sampler_keep_positives_and_resample_negatives():
+    # given
+    is_positive = [index % 10 == 0 for index in range(100)]
+    sampler = NegativeSamplingBatchSampler(is_positive, batch_size=4, negative_ratio=2.0, seed=1)
+
+    # when
+    epochs = [[index for batch in sampler for index in batch] for _ in range(2)]
+
+    # then
+    for indices in epochs:
+        assert len(indices) == len(set(indices)) == 30
+        assert sum(is_positive[index] for index in indices) == 10
+        assert len(sampler) == 8
+    negatives = [{index for index in indices if not is_positive[index]} for indices in epochs]
+    assert negatives[0] != negatives[1]
+    assert len(list(NegativeSamplingBatchSampler(is_positive, batch_size=4, negative_ratio=100.0))) == 25
+
+
+
+def test_negative_sampling_batch_sampler_when_no_positives_then_raise_error():
+    # when
+    with pytest.raises(ValueError) as error:
+        NegativeSamplingBatchSampler([False] * 10, batch_size=4, negative_ratio=1.0)
+
+    # then
+    assert "negative_ratio" in str(error.value)
+
+
+def test_get_positive_mask_from_result_list_without_tokenization():
+    # given
+    from paddlenlp.datasets import MapDataset
+
+    def convert_fun(data):
+        raise AssertionError("get_positive_mask should not tokenize the chunks.")
+
+    chunks = [{"content": "100元", "result_list": [{"text": "100元", "start": 0, "end": 4}], "prompt": "金額"}]
+    chunks.append({"content": "原告", "result_list": [], "prompt": "金額"})
+    dataset = MapDataset(chunks).map(convert_fun)
+
+    # when
+    is_positive = get_positive_mask(dataset)
+
+    # then
+    assert is_positive == [True, False]
+
+def test_streaming_dataset_shuffle_by_buffer_per_epoch():
+    # given
+    chunks = [{"id": index} for index in range(50)]
+    dataset = StreamingDataset(
+        read_fun=lambda: iter(chunks), convert_fun=lambda data: data["id"], shuffle_buffer_size=8, seed=3
+    )
+    batched_dataset = StreamingDataset(
+        read_fun=lambda: iter(chunks),
+        convert_fun=lambda block: [data["id"] for data in block],
+        is_batched=True,
+        batch_size=7,
+    )
+
+    # when
+    epochs = [list(iter(dataset)), list(iter(dataset))]
+    dataset.set_epoch(0)
+    replayed = list(iter(dataset))
+
+    # then
+    for ids in epochs:
+        assert sorted(ids) == list(range(50))
+        # An id can move at most buffer_size - 1 positions earlier.
+        assert all(position >= index - 7 for position, index in enumerate(ids))
+    assert epochs[0] != epochs[1] != list(range(50))
+    assert replayed == epochs[0]
+    assert list(iter(batched_dataset)) == list(range(50))
+
+
+def test_read_data_by_chunk_carry_entity_id_to_batch(char_tokenizer, tmp_path):
+    # given
+    data_path = tmp_path / "example.txt"
+    data_path.write_text(
+        "".join(
+            json.dumps({"content": "原告請求新臺幣10萬元", "result_list": [], "prompt": prompt}, ensure_ascii=False) + "\n"
+            for prompt in ("金額", "原告")
+        ),
+        encoding="utf-8",
+    )
+
+    # when
+    chunks = list(read_data_by_chunk(str(data_path), max_seq_len=32, entity_types=["原告", "金額"]))
+    features = convert_to_uie_format_batch(chunks, char_tokenizer, max_seq_len=32)
+    batch = UIEDataCollator(char_tokenizer.pad_token_id)(features)
+
+    # then
+    assert [chunk["entity_id"] for chunk in chunks] == [feature["entity_id"] for feature in features] == [1, 0]
+    assert batch["entity_id"].numpy().tolist() == [1, 0]
+    with pytest.raises(DataError):
+        list(read_data_by_chunk(str(data_path), max_seq_len=32, entity_types=["原告"]))
+
+
+def test_read_data_by_chunk_with_candidate_filter_count_skipped_labels(tmp_path):
+    # given
+    data_path = tmp_path / "dev.txt"
+    documents = [
+        {
+            "content": "原告請求醫療費用。" * 4 + "醫療費用1,680元",
+            "result_list": [{"text": "1,680元", "start": 40, "end": 46}],
+            "prompt": "醫療費用",
+        },
+        {"content": "醫療費用五萬元", "result_list": [{"text": "五萬元", "start": 4, "end": 7}], "prompt": "醫療費用"},
+        {"content": "原告請求", "result_list": [], "prompt": "薪資收入"},
+    ]
+    data_path.write_text("".join(json.dumps(each, ensure_ascii=False) + "\n" for each in documents), encoding="utf8")
+    candidate_filter = CandidateFilter({"醫療費用": [r"\d"]})
+
+    # when
+    chunks = list(read_data_by_chunk(str(data_path), max_seq_len=27, candidate_filter=candidate_filter))
+
+    # then
+    assert [chunk["content"] for chunk in chunks] == ["1,680元", "原告請求"]
+    assert (candidate_filter.num_chunks, candidate_filter.num_skipped_chunks) == (5, 3)
+    assert (candidate_filter.num_labels, candidate_filter.num_skipped_labels) == (2, 1)
+    assert candidate_filter.recall_loss == 0.5
@@ -1 +1,85 @@
+from utils.model_utils import *
+import pytest
+import numpy as np
+from paddlenlp.metrics import SpanEvaluator
+from paddlenlp.utils.tools import get_span
 
+
+def test_get_span_counts_same_as_span_evaluator():
+    # given
+    rng = np.random.RandomState(0)
+    start_probs, end_probs = rng.rand(2, 6, 20) ** 4
+    gold_start_ids, gold_end_ids = (rng.rand(2, 6, 20) > 0.85).astype("float32")
+    gold_start_ids[0], gold_end_ids[0] = 0.0, 0.0
+
+    # when
+    counts = get_span_counts(start_probs, end_probs, gold_start_ids, gold_end_ids)
+
+    # then
+    metric = SpanEvaluator()
+    for index in range(len(counts)):
+        expected = metric.compute(
+            start_probs[index : index + 1],
+            end_probs[index : index + 1],
+            gold_start_ids[index : index + 1],
+            gold_end_ids[index : index + 1],
+        )
+        assert tuple(counts[index]) == expected
+    assert counts[:, 1].sum() > 0 and counts[:, 2].sum() > 0
+
+
+def test_get_batch_spans_same_as_get_span():
+    # given
+    rng = np.random.RandomState(0)
+    start_probs, end_probs = rng.rand(2, 8, 20) ** 4
+
+    # when
+    rows, starts, ends = get_batch_spans(start_probs, end_probs)
+
+    # then
+    for index in range(len(start_probs)):
+        start_ids = [(i, p) for i, p in enumerate(start_probs[index]) if p > 0.5]
+        end_ids = [(i, p) for i, p in enumerate(end_probs[index]) if p > 0.5]
+        expected = {(start[0], end[0]) for start, end in get_span(start_ids, end_ids, with_prob=True)}
+        assert set(zip(starts[rows == index].tolist(), ends[rows == index].tolist())) == expected
+    assert len(rows) > 0
+
+
+def test_uie_trainer_accumulate_metrics_same_as_compute_metrics(tiny_uie_task_path, tmp_path):
+    # given
+    from functools import partial
+    from paddlenlp.datasets import load_dataset
+    from paddlenlp.trainer import TrainingArguments
+    from paddlenlp.transformers import UIE, AutoTokenizer
+    from utils.data_utils import read_data_by_chunk, convert_to_uie_format_batch, UIEDataCollator
+
+    tokenizer = AutoTokenizer.from_pretrained(tiny_uie_task_path)
+    dataset = load_dataset(
+        read_data_by_chunk, data_path="./tests/data/example_model_input_data.txt", max_seq_len=128, lazy=False
+    ).map(
+        partial(convert_to_uie_format_batch, tokenizer=tokenizer, max_seq_len=128, pad_to_max_seq_len=False),
+        batched=True,
+    )
+    args = TrainingArguments(output_dir=str(tmp_path), per_device_eval_batch_size=4, device="cpu")
+    trainers = [
+        UIETrainer(
+            model=UIE.from_pretrained(tiny_uie_task_path),
+            criterion=uie_loss_func,
+            args=args,
+            data_collator=UIEDataCollator(tokenizer.pad_token_id),
+            eval_dataset=dataset,
+            compute_metrics=compute_metrics,
+            is_accumulate_metrics=is_accumulate_metrics,
+        )
+        for is_accumulate_metrics in (False, True)
+    ]
+
+    # when
+    expected, metrics = (trainer.evaluate() for trainer in trainers)
+    output = trainers[1].predict(dataset)
+
+    # then
+    for key in ("eval_precision", "eval_recall", "eval_f1", "eval_loss"):
+        assert metrics[key] == pytest.approx(expected[key], abs=1e-6)
+    assert trainers[1].span_counts[1] > 0 and trainers[1].span_counts[2] > 0
+    assert output.predictions is None and "test_f1" in output.metrics
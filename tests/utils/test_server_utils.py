@@ -0,0 +1,126 @@
+from utils.server_utils import MicroBatcher, create_inference_server
+from utils.exceptions import ServiceBusyError
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+import json
+import threading
+import pytest
+
+
+def fake_predict_fun(texts):
+    return [[{"醫療費用": [{"text": text, "start": 0, "end": len(text), "probability": 0.9}]}] for text in texts]
+
+
+def test_micro_batcher_merge_concurrent_requests():
+    # given
+    batch_sizes = []
+    release = threading.Event()
+
+    def predict_fun(texts):
+        release.wait()
+        batch_sizes.append(len(texts))
+        return fake_predict_fun(texts)
+
+    batcher = MicroBatcher(predict_fun, max_batch_docs=8, max_wait_ms=200)
+
+    # when
+    first_future = batcher.submit(["a"])
+    futures = [batcher.submit([f"{i}", f"{i}{i}"]) for i in range(3)]
+    release.set()
+
+    # then
+    assert first_future.result(timeout=10)[0][0]["醫療費用"][0]["text"] == "a"
+    assert [[result[0]["醫療費用"][0]["text"] for result in future.result(timeout=10)] for future in futures] == [
+        ["0", "00"],
+        ["1", "11"],
+        ["2", "22"],
+    ]
+    assert sum(batch_sizes) == 7 and len(batch_sizes) < 4
+    statistics = batcher.statistics()
+    assert statistics["num_requests"] == 4 and statistics["latency_p99_ms"] >= statistics["latency_p50_ms"]
+
+
+def test_micro_batcher_when_queue_full_then_raise_error():
+    # given
+    release = threading.Event()
+    batcher = MicroBatcher(
+        lambda texts: release.wait() and fake_predict_fun(texts), max_batch_docs=1, max_wait_ms=0, max_queue_size=1
+    )
+    batcher.submit(["running"])
+    while batcher.requests.qsize():
+        pass
+    batcher.submit(["pending"])
+
+    # when
+    with pytest.raises(ServiceBusyError) as error:
+        batcher.submit(["rejected"])
+    release.set()
+
+    # then
+    assert str(error.value) == "Too many pending requests (max_queue_size=1)."
+    assert batcher.statistics()["num_rejected"] == 1
+
+
+def test_inference_server_predict_and_stats():
+    # given
+    batcher = MicroBatcher(fake_predict_fun)
+    server = create_inference_server(
+        "127.0.0.1",
+        0,
+        batcher=batcher,
+        postprocess_fun_factory=lambda request: lambda results: [
+            [{entity: [{key: span[key] for key in request["select_key"]} for span in spans]}]
+            for result in results
+            for entity, spans in result[0].items()
+        ],
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # when
+    request = Request(
+        url + "/predict",
+        data=json.dumps({"texts": ["1,680元"], "select_key": ["text"]}).encode("utf8"),
+        method="POST",
+    )
+    with urlopen(request) as response:
+        result = json.loads(response.read())
+    with urlopen(url + "/stats") as response:
+        statistics = json.loads(response.read())
+    with pytest.raises(HTTPError) as error:
+        urlopen(Request(url + "/predict", data=b'{"texts": "not a list"}', method="POST"))
+    server.shutdown()
+
+    # then
+    assert result == {"results": [[{"醫療費用": [{"text": "1,680元"}]}]]}
+    assert statistics["num_requests"] == 1 and statistics["queue_depth"] == 0
+    assert error.value.code == 400
+
+
+def test_inference_server_when_postprocess_fail_then_return_error():
+    # given
+    def postprocess_fun_factory(request):
+        def postprocess_fun(results):
+            if request.get("select_key"):
+                return [{key: result[0][key] for key in request["select_key"]} for result in results]
+            raise RuntimeError("postprocess crashed")
+
+        return postprocess_fun
+
+    server = create_inference_server(
+        "127.0.0.1", 0, batcher=MicroBatcher(fake_predict_fun), postprocess_fun_factory=postprocess_fun_factory
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+    # when
+    with pytest.raises(HTTPError) as key_error:
+        urlopen(Request(url, data=b'{"texts": ["100"], "select_key": ["unknown"]}', method="POST"))
+    with pytest.raises(HTTPError) as runtime_error:
+        urlopen(Request(url, data=b'{"texts": ["100"]}', method="POST"))
+    server.shutdown()
+
+    # then
+    assert key_error.value.code == 400
+    assert runtime_error.value.code == 500
+    assert "postprocess crashed" in json.loads(runtime_error.value.read())["error"]
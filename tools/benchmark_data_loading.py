@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.base_config import logger, entity_type
+from utils.data_utils import read_data_by_chunk
+from utils.exceptions import DataError, PreprocessingError
+
+
+def read_data_by_chunk_legacy(data_path: str, max_seq_len: int = 512) -> Iterator[Dict[str, str]]:
+    """舊版 read_data_by_chunk（result_list.pop(0) 與 content 重複切片），僅用於比較速度與輸出。"""
+    with open(data_path, "r", encoding="utf-8") as f:
+        for line in f:
+            json_line = json.loads(line)
+            content = json_line["content"].strip()
+            prompt = json_line["prompt"]
+            if max_seq_len <= len(prompt) + 3:
+                raise ValueError("The value of max_seq_len is too small. Please set a larger value.")
+            result_list = json_line["result_list"]
+            accumulate_token = 0
+            while len(content) > 0:
+                max_content_len = max_seq_len - len(prompt) - 3
+                current_content_result = []
+                while len(result_list) > 0:
+                    if (
+                        result_list[0]["start"] > result_list[0]["end"]
+                        or result_list[0]["end"] - result_list[0]["start"] > max_content_len
+                    ):
+                        raise DataError(
+                            f"Error in result list. Invalid start or end location (start: {result_list[0]['start']}, end: {result_list[0]['end']}). Please check the data in {data_path}."
+                        )
+                    if result_list[0]["start"] < max_content_len:
+                        if result_list[0]["end"] > max_content_len:
+                            max_content_len = result_list[0]["start"]
+                            result_list[0]["start"] -= max_content_len
+                            result_list[0]["end"] -= max_content_len
+                            break
+                        else:
+                            current_content_result.append(result_list.pop(0))
+                            if result_list:
+                                result_list[0]["start"] -= accumulate_token
+                                result_list[0]["end"] -= accumulate_token
+                    else:
+                        result_list[0]["start"] -= max_content_len
+                        result_list[0]["end"] -= max_content_len
+                        break
+                for each_result in current_content_result:
+                    adjust_data = content[:max_content_len][each_result["start"] : each_result["end"]]
+                    if adjust_data != each_result["text"]:
+                        raise PreprocessingError(
+                            f"adjust error. adjust_data: {adjust_data}, true_data: {each_result['text']}."
+                        )
+                yield {
+                    "content": content[:max_content_len],
+                    "result_list": current_content_result,
+                    "prompt": prompt,
+                }
+                content = content[max_content_len:]
+                accumulate_token += max_content_len
+
+
+def make_long_document(num_chars: int, num_results: int, prompt: str, seed: int = 11) -> dict:
+    """產生一篇長度 num_chars、含 num_results 個不重疊 result 的合成判決書（UIE 格式）。"""
+    random.seed(seed)
+    content = "".join(random.choice("原告被告請求賠償新臺幣元，。本院認為事實及理由") for _ in range(num_chars))
+    result_list = []
+    for start in sorted(random.sample(range(0, num_chars - 10, 10), num_results)):
+        end = start + random.randint(2, 9)
+        result_list.append({"text": content[start:end], "start": start, "end": end})
+    return {"content": content, "result_list": result_list, "prompt": prompt}
+
+
+def benchmark_read_data_by_chunk(data_path: str, max_seq_len: int = 512, repeat: int = 3) -> dict:
+    """比較舊版與目前 read_data_by_chunk 的讀取時間（各取 repeat 次中最快的一次），並確認兩者輸出相同。
+
+    Args:
+        data_path (str): UIE 格式的資料路徑。
+        max_seq_len (int, optional): 模型input最大長度. Defaults to 512.
+        repeat (int, optional): 重複次數. Defaults to 3.
+
+    Returns:
+        dict: 兩者的秒數、加速倍率、chunk 數量與輸出是否相同。
+    """
+
+    def best_time(read_fun):
+        times = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            chunks = list(read_fun(data_path, max_seq_len=max_seq_len))
+            times.append(time.perf_counter() - start_time)
+        return min(times), chunks
+
+    legacy_time, legacy_chunks = best_time(read_data_by_chunk_legacy)
+    index_time, chunks = best_time(read_data_by_chunk)
+    return {
+        "legacy_sec": legacy_time,
+        "index_sec": index_time,
+        "speedup": legacy_time / index_time,
+        "num_chunks": len(chunks),
+        "is_identical": json.dumps(chunks, ensure_ascii=False) == json.dumps(legacy_chunks, ensure_ascii=False),
+    }
+
+
+# python tools/benchmark_data_loading.py --num_chars 50000 --num_results 2000
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_path", type=str, default=None, help="UIE format data. Defaults to synthetic data.")
+    parser.add_argument("--max_seq_len", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--num_docs", type=int, default=20, help="Number of synthetic documents.")
+    parser.add_argument("--num_chars", type=int, default=50000, help="Length of each synthetic document.")
+    parser.add_argument("--num_results", type=int, default=2000, help="Number of results in each synthetic document.")
+    args = parser.parse_args()
+
+    data_path = args.data_path
+    if data_path is None:
+        data_path = os.path.join(tempfile.mkdtemp(), "benchmark_data.txt")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(args.num_docs):
+                prompt = entity_type[i % len(entity_type)]
+                document = make_long_document(args.num_chars, args.num_results, prompt, seed=i)
+                f.write(json.dumps(document, ensure_ascii=False) + "\n")
+        logger.info(f"Write {args.num_docs} synthetic documents ({args.num_chars} characters) into {data_path}.")
+    elif not os.path.exists(data_path):
+        raise ValueError(f"Path not found: {data_path}.")
+
+    result = benchmark_read_data_by_chunk(data_path, max_seq_len=args.max_seq_len, repeat=args.repeat)
+    logger.info(f"Legacy chunker: {result['legacy_sec']:.3f} sec.")
+    logger.info(f"Index-based chunker: {result['index_sec']:.3f} sec ({result['num_chunks']} chunks).")
+    logger.info(f"Speedup: {result['speedup']:.2f}x, identical output: {result['is_identical']}.")
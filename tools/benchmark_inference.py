@@ -0,0 +1,185 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.base_config import logger, entity_type, entity_candidate_patterns
+from utils.infer_utils import CrossDocumentPredictor
+from run_infer import inference, get_default_num_threads
+from paddlenlp import Taskflow
+
+
+def benchmark_cross_document_batching(
+    uie,
+    text_list,
+    batch_size: int,
+    bucket_size: int = 0,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    is_prefilter_candidates: bool = False,
+) -> dict:
+    """比較「一篇文件呼叫一次 Taskflow」與「跨文件批次推論」的 docs/sec。
+
+    Args:
+        uie (Taskflow): 已建立好的 Taskflow。
+        text_list (List[str]): 測試文件。
+        batch_size (int): 推論的 batch size。
+        bucket_size (int, optional): 跨文件批次推論時，依長度排序的 chunk 數量. Defaults to 0.
+        chunk_overlap (int, optional): 跨文件批次推論時，相鄰 chunk 重疊的字數. Defaults to 0.
+        is_chunk_by_sentence (bool, optional): 跨文件批次推論時，是否以完整的子句組成 chunk. Defaults to False.
+        is_chunk_by_token (bool, optional): 跨文件批次推論時，是否以 token 數量切分 chunk. Defaults to False.
+        is_prefilter_candidates (bool, optional): 跨文件批次推論時，是否略過不符合 entity_candidate_patterns 的 chunk. Defaults to False.
+
+    Returns:
+        dict: 兩種模式的 docs/sec 與加速倍率。
+    """
+    uie(text_list[0])  # warm up
+
+    start_time = time.perf_counter()
+    for text in text_list:
+        uie(text)
+    per_doc_time = time.perf_counter() - start_time
+
+    predictor = CrossDocumentPredictor(
+        uie,
+        schema=entity_type,
+        batch_size=batch_size,
+        bucket_size=bucket_size,
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        is_chunk_by_token=is_chunk_by_token,
+        candidate_patterns=entity_candidate_patterns if is_prefilter_candidates else None,
+    )
+    start_time = time.perf_counter()
+    for _ in predictor.predict(text_list):
+        pass
+    batched_time = time.perf_counter() - start_time
+
+    return {
+        "per_doc_docs_per_sec": len(text_list) / per_doc_time,
+        "batched_docs_per_sec": len(text_list) / batched_time,
+        "speedup": per_doc_time / batched_time,
+        "num_chunks": predictor.num_chunks,
+        "num_fixed_chunks": predictor.num_fixed_chunks,
+        "num_truncated_chunks": predictor.num_truncated_chunks,
+        "num_skipped_chunks": predictor.num_skipped_chunks,
+        "num_batches": predictor.num_batches,
+        "padding_efficiency": predictor.padding_efficiency,
+    }
+
+
+def benchmark_num_workers(data_file: str, max_num_workers: int, **inference_kwargs) -> list:
+    """量測 --num_workers 從 1 到 max_num_workers 的 docs/sec（scaling curve）。
+
+    Args:
+        data_file (str): 測試資料路徑。
+        max_num_workers (int): 最大 worker 數量。
+        inference_kwargs: 其他 run_infer.inference 的參數。
+
+    Returns:
+        list: 每個 worker 數量的 num_workers, num_threads, docs/sec, speedup 與 efficiency（speedup / num_workers）。
+    """
+    curve = []
+    for num_workers in range(1, max_num_workers + 1):
+        num_threads = get_default_num_threads(num_workers)
+        start_time = time.perf_counter()
+        result = inference(data_file=data_file, num_workers=num_workers, num_threads=num_threads, **inference_kwargs)
+        num_docs = len(result)
+        docs_per_sec = num_docs / (time.perf_counter() - start_time)
+        speedup = docs_per_sec / curve[0]["docs_per_sec"] if curve else 1.0
+        curve.append(
+            {
+                "num_workers": num_workers,
+                "num_threads": num_threads,
+                "docs_per_sec": docs_per_sec,
+                "speedup": speedup,
+                "efficiency": speedup / num_workers,
+            }
+        )
+    return curve
+
+
+# python tools/benchmark_inference.py --data_file ./data/model_infer_data/example.txt --task_path ./results/checkpoint/model_best
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_file", type=str, default="./data/model_infer_data/example.txt")
+    parser.add_argument("--task_path", type=str, default=None)
+    parser.add_argument("--model", type=str, default="uie-base")
+    parser.add_argument("--device_id", type=int, default=-1)
+    parser.add_argument("--precision", type=str, default="fp32")
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--bucket_size", type=int, default=0, help="Sort chunks by length in buckets of this size.")
+    parser.add_argument("--max_seq_len", type=int, default=512)
+    parser.add_argument("--chunk_overlap", type=int, default=0, help="Characters shared by adjacent chunks.")
+    parser.add_argument("--is_chunk_by_sentence", action="store_true", help="Pack whole clauses into each chunk.")
+    parser.add_argument("--is_chunk_by_token", action="store_true", help="Size chunks by tokens instead of characters.")
+    parser.add_argument(
+        "--is_prefilter_candidates", action="store_true", help="Skip chunks matching no entity_candidate_patterns."
+    )
+    parser.add_argument("--num_docs", type=int, default=None, help="Only use the first num_docs documents.")
+    parser.add_argument(
+        "--max_num_workers", type=int, default=1, help="Report the scaling curve of --num_workers from 1 to this value."
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_file):
+        raise ValueError(f"Path not found: {args.data_file}.")
+
+    with open(args.data_file, "r", encoding="utf8") as f:
+        text_list = [line.strip() for line in f][: args.num_docs]
+
+    taskflow_kwargs = {"task_path": args.task_path} if args.task_path else {"model": args.model}
+    uie = Taskflow(
+        "information_extraction",
+        schema=entity_type,
+        precision=args.precision,
+        batch_size=args.batch_size,
+        device_id=args.device_id,
+        max_seq_len=args.max_seq_len,
+        **taskflow_kwargs,
+    )
+
+    logger.info(f"Benchmark on {len(text_list)} documents, batch_size={args.batch_size}, device_id={args.device_id}.")
+    result = benchmark_cross_document_batching(
+        uie,
+        text_list,
+        batch_size=args.batch_size,
+        bucket_size=args.bucket_size,
+        chunk_overlap=args.chunk_overlap,
+        is_chunk_by_sentence=args.is_chunk_by_sentence,
+        is_chunk_by_token=args.is_chunk_by_token,
+        is_prefilter_candidates=args.is_prefilter_candidates,
+    )
+    logger.info(f"Per document: {result['per_doc_docs_per_sec']:.3f} docs/sec.")
+    logger.info(
+        f"Cross document batching: {result['batched_docs_per_sec']:.3f} docs/sec "
+        f"({result['num_chunks']} chunks in {result['num_batches']} batches, "
+        f"padding efficiency {result['padding_efficiency']:.4f})."
+    )
+    logger.info(
+        f"Chunks per document: {result['num_chunks'] / len(text_list):.2f} "
+        f"(fixed-length chunking: {result['num_fixed_chunks'] / len(text_list):.2f}), "
+        f"{result['num_truncated_chunks']} truncated chunks, {result['num_skipped_chunks']} chunks skipped by the prefilter."
+    )
+    logger.info(f"Speedup: {result['speedup']:.2f}x.")
+
+    if args.max_num_workers > 1:
+        logger.info(f"Scaling curve of num_workers on {args.data_file} (includes Taskflow loading of each worker).")
+        curve = benchmark_num_workers(
+            args.data_file,
+            args.max_num_workers,
+            schema=entity_type,
+            precision=args.precision,
+            batch_size=args.batch_size,
+            device_id=args.device_id,
+            max_seq_len=args.max_seq_len,
+            **taskflow_kwargs,
+        )
+        for point in curve:
+            logger.info(
+                f"num_workers={point['num_workers']}, num_threads={point['num_threads']}: "
+                f"{point['docs_per_sec']:.3f} docs/sec, speedup {point['speedup']:.2f}x, efficiency {point['efficiency']:.2f}."
+            )
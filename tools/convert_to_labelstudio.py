@@ -6,7 +6,7 @@ import logging
 import sys
 import colorlog
 from tqdm import tqdm
-from typing import List
+from typing import List, Iterator
 
 
 LOGGER_LEVEL = logging.INFO
@@ -71,6 +71,21 @@ def read_uie_inference_results(path: str) -> List[dict]:
     return uie_result_list
 
 
+def read_uie_inference_results_by_line(path: str) -> Iterator[dict]:
+    """Get the UIE results made by run_infer.py with --is_stream_output True (JSON Lines) one by one.
+
+    Args:
+        path (str): Path of UIE results.
+
+    Yields:
+        Iterator[dict]: UIE result of each content.
+    """
+    with open(path, "r", encoding="utf8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
 def flatten_uie_output(uie_result: dict, threshold: float = 0.5) -> List[dict]:
     """flatten hierarchical UIE result into list
 
@@ -163,6 +178,11 @@ if __name__ == "__main__":
     parser.add_argument("--save_path", type=str, default="./")
     parser.add_argument("--save_name", type=str, default="uie_result_for_labelstudio.json")
     parser.add_argument("--labelstudio_template_path", type=str, default="./labelstudio_template.json")
+    parser.add_argument(
+        "--is_stream_results",
+        action="store_true",
+        help="The UIE results are JSON Lines (run_infer.py --is_stream_output True).",
+    )
     args = parser.parse_args()
 
     if not os.path.exists(args.uie_results_path):
@@ -175,7 +195,10 @@ if __name__ == "__main__":
         print(f"Path not found: {args.save_path}. Auto-create the path...")
         os.mkdir(args.save_path)
 
-    uie_result_list = read_uie_inference_results(path=args.uie_results_path)
+    if args.is_stream_results:
+        uie_result_list = read_uie_inference_results_by_line(path=args.uie_results_path)
+    else:
+        uie_result_list = read_uie_inference_results(path=args.uie_results_path)
     label_studio_template = get_labelstudio_template(path=args.labelstudio_template_path)
     logger = create_logger(level=LOGGER_LEVEL)
     logger.info("Start converting...")
@@ -153,12 +153,48 @@ class ArabicNumbersFormatter(object):
         return regularized_money_list
 
 
+def regularize_money_by_chunk(
+    csv_results_path: str, save_path: str, entity_type: List[str] = ENTITY_TYPE, chunk_size: int = 10000
+) -> int:
+    """分批讀取 CSV 推論結果（例如 run_infer.py --tabular_layout doc 的輸出），將每個 entity 欄位的金額轉成阿拉伯數字後寫出。
+
+    Args:
+        csv_results_path (str): CSV 推論結果路徑，每個 entity type 一個欄位。
+        save_path (str): 輸出檔案路徑。
+        entity_type (List[str], optional): 需要轉換的欄位. Defaults to ENTITY_TYPE.
+        chunk_size (int, optional): 每次讀取的列數，記憶體用量只與此有關. Defaults to 10000.
+
+    Returns:
+        int: 轉換的列數。
+    """
+    formatter = ArabicNumbersFormatter()
+    num_rows = 0
+    csv_chunks = pd.read_csv(
+        csv_results_path, chunksize=chunk_size, dtype={each_entity: str for each_entity in entity_type}
+    )
+    for i, csv_results in enumerate(csv_chunks):
+        for each_entity in entity_type:
+            logger.info(f"==========Arabic Numbers Converting: {each_entity} (chunk {i})==========")
+            regularized_money_list = formatter.chinese_to_number(money_list=csv_results.loc[:, each_entity].tolist())
+            csv_results[each_entity] = regularized_money_list
+        csv_results.to_csv(
+            save_path,
+            mode="w" if i == 0 else "a",
+            header=i == 0,
+            index=False,
+            encoding="utf_8_sig" if i == 0 else "utf8",
+        )
+        num_rows += len(csv_results)
+    return num_rows
+
+
 # python regularize_money_from_csv_results.py --csv_results_path ./verdict8000_uie_inference_result.csv
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--csv_results_path", type=str)
     parser.add_argument("--save_path", type=str, default="./")
     parser.add_argument("--save_name", type=str, default="regularized_result.csv")
+    parser.add_argument("--chunk_size", type=int, default=10000, help="Number of rows read and converted at a time.")
     args = parser.parse_args()
 
     if not os.path.exists(args.csv_results_path):
@@ -168,17 +204,7 @@ if __name__ == "__main__":
         print(f"Path not found: {args.save_path}. Auto-create the path...")
         os.mkdir(args.save_path)
 
-    csv_results = pd.read_csv(args.csv_results_path)
-
-    formatter = ArabicNumbersFormatter()
-
     logger.info("Start Converting...")
-    for each_entity in ENTITY_TYPE:
-        logger.info(f"==========Arabic Numbers Converting: {each_entity}==========")
-        regularized_money_list = formatter.chinese_to_number(money_list=csv_results.loc[:, each_entity].tolist())
-        csv_results.loc[:, each_entity] = regularized_money_list
-    logger.info("Finish Converting...")
-
-    logger.info(f"Write the results into {os.path.join(args.save_path, args.save_name)}")
-    csv_results.to_csv(os.path.join(args.save_path, args.save_name), header=True, index=False, encoding="utf_8_sig")
-    logger.info(f"Finish.")
+    save_path = os.path.join(args.save_path, args.save_name)
+    num_rows = regularize_money_by_chunk(args.csv_results_path, save_path, chunk_size=args.chunk_size)
+    logger.info(f"Finish Converting {num_rows} rows. Write the results into {save_path}")
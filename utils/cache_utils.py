@@ -0,0 +1,379 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+from paddle.io import Dataset
+from paddlenlp.datasets import MapDataset
+from paddlenlp.utils.log import logger
+from .data_utils import UIEDataCollator, is_accepting_statistics
+from .infer_utils import get_data_checksum
+
+
+def get_model_identity(model: str = "uie-base", task_path: Optional[str] = None) -> str:
+    """模型的識別字串。task_path 會納入每個檔案的名稱、大小與修改時間，重新訓練後 cache 自動失效。"""
+    if not task_path:
+        return model
+    files = sorted(
+        (name, os.path.getsize(os.path.join(task_path, name)), os.path.getmtime(os.path.join(task_path, name)))
+        for name in os.listdir(task_path)
+        if os.path.isfile(os.path.join(task_path, name))
+    )
+    return json.dumps([os.path.realpath(task_path), files])
+
+
+class InferenceCache:
+    """以 (前處理後的文本, schema, 模型, precision) 的 hash 為 key，保存 Taskflow 的原始推論結果。
+
+    Note:
+        保存的是 Processer.postprocess 之前的結果，因此更改 select_strategy、threshold 或 select_key 都不需要重新推論。
+        資料存在 SQLite（`<cache_dir>/inference_cache.sqlite`），多個 worker process 可同時讀寫。
+        總大小超過 max_size_mb 時，會刪除最久沒被使用的結果，直到低於上限的 90%。
+
+    Args:
+        cache_dir (str): cache 目錄。
+        schema (List[str]): 所有 entity type。
+        model_identity (str): 模型的識別字串，通常來自 get_model_identity。
+        precision (str, optional): 推論精確度. Defaults to "fp32".
+        max_size_mb (float, optional): cache 大小上限（MB）. Defaults to 1024.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        schema: List[str],
+        model_identity: str,
+        precision: str = "fp32",
+        max_size_mb: float = 1024,
+    ) -> None:
+        if not os.path.exists(cache_dir):
+            logger.warning(f"{cache_dir} is not found. Auto-create the dir.")
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.cache_path = os.path.join(cache_dir, "inference_cache.sqlite")
+        self.namespace = hashlib.sha256(json.dumps([schema, model_identity, precision]).encode("utf8")).hexdigest()
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.num_hits = 0
+        self.num_misses = 0
+        self._connection = None
+        self._pid = None
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+            connection.execute("CREATE TABLE IF NOT EXISTS statistics (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def __getstate__(self) -> dict:
+        # sqlite connections cannot be shared across processes, every process reconnects.
+        state = self.__dict__.copy()
+        state.update(_connection=None, _pid=None)
+        return state
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256((self.namespace + text).encode("utf8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[list]]:
+        """取出多篇文件的推論結果，沒有 cache 的文件為 None。"""
+        keys = [self.key(text) for text in texts]
+        found = {}
+        with self._connect() as connection:
+            for start in range(0, len(keys), 500):
+                placeholders = ",".join("?" * len(keys[start : start + 500]))
+                found.update(
+                    connection.execute(
+                        f"SELECT key, value FROM results WHERE key IN ({placeholders})", keys[start : start + 500]
+                    ).fetchall()
+                )
+            if found:
+                connection.executemany(
+                    "UPDATE results SET last_access = ? WHERE key = ?", [(time.time(), key) for key in found]
+                )
+            num_hits = sum(key in found for key in keys)
+            self._add_statistics(connection, num_hits, len(keys) - num_hits)
+
+        self.num_hits += num_hits
+        self.num_misses += len(keys) - num_hits
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def put_many(self, texts: List[str], results: List[list]) -> None:
+        rows = []
+        for text, result in zip(texts, results):
+            value = json.dumps(result, ensure_ascii=False)
+            rows.append((self.key(text), value, len(value.encode("utf8")), time.time()))
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+            self._evict(connection)
+
+    def predict(self, texts: Iterable[str], predict_fun: Callable[[List[str]], Iterable[list]], block_size: int = 64):
+        """依序產生推論結果，只有沒 cache 的文件才交給 predict_fun。
+
+        Args:
+            texts (Iterable[str]): 前處理後的文件。
+            predict_fun (Callable[[List[str]], Iterable[list]]): 推論函式，回傳與輸入相同順序的 Taskflow 原始結果。
+            block_size (int, optional): 每次查詢與推論的文件數量. Defaults to 64.
+
+        Yields:
+            Iterator[list]: 與 `uie(text)` 相同格式的結果，順序與輸入相同。
+        """
+        block = []
+        for text in texts:
+            block.append(text)
+            if len(block) == block_size:
+                yield from self._predict_block(block, predict_fun)
+                block = []
+        if block:
+            yield from self._predict_block(block, predict_fun)
+
+    def statistics(self) -> Dict[str, int]:
+        """cache 累積的 hit/miss 次數、筆數與大小（所有 process）。"""
+        with self._connect() as connection:
+            statistics = dict(connection.execute("SELECT name, value FROM statistics").fetchall())
+            num_entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {
+            "hits": statistics.get("hits", 0),
+            "misses": statistics.get("misses", 0),
+            "entries": num_entries,
+            "size_bytes": size,
+        }
+
+    def _predict_block(self, texts: List[str], predict_fun: Callable[[List[str]], Iterable[list]]) -> Iterator[list]:
+        results = self.get_many(texts)
+        miss_indexes = [index for index, result in enumerate(results) if result is None]
+        if miss_indexes:
+            miss_texts = [texts[index] for index in miss_indexes]
+            miss_results = list(predict_fun(miss_texts))
+            self.put_many(miss_texts, miss_results)
+            for index, result in zip(miss_indexes, miss_results):
+                results[index] = result
+        return iter(results)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.cache_path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def _add_statistics(self, connection: sqlite3.Connection, num_hits: int, num_misses: int) -> None:
+        connection.executemany(
+            "INSERT INTO statistics VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [("hits", num_hits), ("misses", num_misses)],
+        )
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if size <= self.max_size:
+            return
+        num_evicted = 0
+        target_size = self.max_size * 0.9
+        for key, each_size in connection.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+            if size <= target_size:
+                break
+            connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            size -= each_size
+            num_evicted += 1
+        logger.debug(f"Evict {num_evicted} results from {self.cache_path}.")
+
+
+def get_tokenizer_identity(tokenizer: Any) -> str:
+    """tokenizer 的識別字串（類別、vocab 與是否轉小寫），不同 checkpoint 只要 tokenizer 相同就共用 cache。"""
+    vocab = sorted(tokenizer.get_vocab().items())
+    return hashlib.sha256(
+        json.dumps([type(tokenizer).__name__, getattr(tokenizer, "do_lower_case", None), vocab]).encode("utf8")
+    ).hexdigest()
+
+
+def get_dataset_identity(
+    tokenizer: Any,
+    convert_function: Callable,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    is_chunk_by_token: bool = False,
+    pad_to_max_seq_len: bool = True,
+    entity_types: Optional[List[str]] = None,
+    candidate_patterns: Optional[Dict[str, List[str]]] = None,
+) -> dict:
+    """load_tokenized_dataset 的 identity，run_train.py 與 run_eval.py 共用，設定相同時讀取同一份 cache。
+
+    Note:
+        entity_types（驗證時的 entity_id）與 candidate_patterns 只有設定時才加入，沒有設定時與訓練的 identity 相同。
+    """
+    identity = dict(
+        tokenizer=get_tokenizer_identity(tokenizer),
+        convert_function=getattr(convert_function, "__qualname__", repr(convert_function)),
+        chunk_overlap=chunk_overlap,
+        is_chunk_by_sentence=is_chunk_by_sentence,
+        is_chunk_by_token=is_chunk_by_token,
+        pad_to_max_seq_len=pad_to_max_seq_len,
+    )
+    if entity_types is not None:
+        identity["entity_types"] = entity_types
+    if candidate_patterns is not None:
+        identity["candidate_patterns"] = candidate_patterns
+    return identity
+
+
+class TokenizedDataset(Dataset):
+    """以 memory-mapped NumPy array 保存的 tokenization 結果（見 load_tokenized_dataset），每筆資料與 convert_to_uie_format 的輸出相同。
+
+    Note:
+        array 以唯讀的 mmap 開啟，不會整份讀進記憶體；pickle 到 DataLoader 的 worker process 時只傳送路徑，
+        worker 重新 mmap 同一份檔案，由作業系統的 page cache 共用，不會複製資料。
+        沒有 padding 的資料（pad_to_max_seq_len=False）在 array 中仍補 0 到 max_seq_len，讀取時依 lengths 切回原本的長度。
+        資料有 entity_id（見 read_data_by_chunk 的 entity_types）時另存為 entity_id.npy。
+
+    Args:
+        cache_path (str): load_tokenized_dataset 建立的目錄。
+    """
+
+    FIELDS = UIEDataCollator.FIELDS
+
+    def __init__(self, cache_path: str) -> None:
+        self.cache_path = cache_path
+        with open(os.path.join(cache_path, "meta.json"), "r", encoding="utf8") as f:
+            self.meta = json.load(f)
+        self._arrays = None
+        self._lengths = None
+        self._is_positive = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        state["_lengths"] = None
+        state["_is_positive"] = None
+        return state
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """每筆資料的 token 數（含 [CLS]、[SEP] 與 padding），給 LengthGroupedBatchSampler 使用。"""
+        if self._lengths is None:
+            self._lengths = np.load(os.path.join(self.cache_path, "lengths.npy"))
+        return self._lengths
+
+    @property
+    def is_positive(self) -> np.ndarray:
+        """每筆資料是否有 result，給 NegativeSamplingBatchSampler 使用。"""
+        if self._is_positive is None:
+            start_positions = np.load(os.path.join(self.cache_path, "start_positions.npy"), mmap_mode="r")
+            self._is_positive = start_positions.any(axis=1)
+        return self._is_positive
+
+    def __len__(self) -> int:
+        return self.meta["num_examples"]
+
+    def __getitem__(self, index: int) -> Dict[str, list]:
+        if self._arrays is None:
+            self._arrays = {
+                name: np.load(os.path.join(self.cache_path, f"{name}.npy"), mmap_mode="r") for name in self.FIELDS
+            }
+            entity_id_path = os.path.join(self.cache_path, "entity_id.npy")
+            if os.path.exists(entity_id_path):
+                self._arrays["entity_id"] = np.load(entity_id_path, mmap_mode="r")
+        length = self.lengths[index]
+        features = {name: array[index, :length].tolist() for name, array in self._arrays.items() if array.ndim == 2}
+        if "entity_id" in self._arrays:
+            features["entity_id"] = int(self._arrays["entity_id"][index])
+        return features
+
+    def map(self, fn: Callable, **kwargs) -> MapDataset:
+        """與 paddlenlp.datasets.MapDataset.map 相同（例如 create_data_loader 的 trans_fn）。"""
+        return MapDataset(self).map(fn, **kwargs)
+
+
+def load_tokenized_dataset(
+    cache_dir: str,
+    data_path: str,
+    read_fun: Callable[[], Iterable[dict]],
+    convert_fun: Callable[[dict], dict],
+    max_seq_len: int,
+    identity: dict,
+    is_batched: bool = False,
+    batch_size: int = 1024,
+    read_statistics_fun: Optional[Callable[[], dict]] = None,
+) -> TokenizedDataset:
+    """讀取 tokenization 的 cache，沒有 cache 時才執行 read_fun 與 convert_fun 並寫入 cache。
+
+    Note:
+        key 為 data_path 內容的 sha256 與 identity（tokenizer、max_seq_len、切 chunk 的設定等）的 hash，
+        cache 存在 `<cache_dir>/tokenized_datasets/<key>/`，每個欄位一個 .npy 檔（shape 為 [num_examples, max_seq_len]）。
+        convert_fun 有 statistics 參數時，其統計（例如 truncation 的次數）與 read_statistics_fun 的結果
+        （例如 CandidateFilter 略過的 chunk 數量）會一起保存在 meta.json（"statistics" 與 "read_statistics"），使用 cache 時仍可記錄。
+
+    Args:
+        cache_dir (str): cache 目錄。
+        data_path (str): 資料路徑。
+        read_fun (Callable[[], Iterable[dict]]): 回傳切好的 chunk（例如 read_data_by_chunk），會被呼叫兩次（計數與轉換）。
+        convert_fun (Callable[[dict], dict]): chunk 轉成模型 input（例如 convert_to_uie_format），輸出長度不可超過 max_seq_len。
+        max_seq_len (int): 模型 input 的長度。
+        identity (dict): 其他影響 tokenization 結果的設定，必須可以轉成 JSON。
+        is_batched (bool, optional): convert_fun 是否一次轉換多筆 chunk（例如 convert_to_uie_format_batch）. Defaults to False.
+        batch_size (int, optional): is_batched=True 時每次交給 convert_fun 的 chunk 數量. Defaults to 1024.
+        read_statistics_fun (Optional[Callable[[], dict]], optional): 在完整讀取一次 read_fun（計數）後呼叫，
+            回傳 read_fun 的統計（必須可以轉成 JSON）.
+            Defaults to None.
+
+    Returns:
+        TokenizedDataset: memory-mapped 的資料集。
+    """
+    key = hashlib.sha256(
+        json.dumps([get_data_checksum(data_path), max_seq_len, identity], sort_keys=True).encode("utf8")
+    ).hexdigest()
+    cache_path = os.path.join(cache_dir, "tokenized_datasets", key)
+    if os.path.exists(os.path.join(cache_path, "meta.json")):
+        logger.info(f"Load tokenized {data_path} from {cache_path}.")
+        return TokenizedDataset(cache_path)
+
+    logger.info(f"Tokenize {data_path} into {cache_path}.")
+    num_examples = sum(1 for _ in read_fun())
+    # The conversion pass stops after the last example, so collect read_fun's statistics after the full counting pass.
+    read_statistics = read_statistics_fun() if read_statistics_fun else None
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    arrays = {
+        name: np.lib.format.open_memmap(
+            os.path.join(tmp_path, f"{name}.npy"), mode="w+", dtype=dtype, shape=(num_examples, max_seq_len)
+        )
+        for name, dtype in TokenizedDataset.FIELDS.items()
+    }
+    lengths = np.zeros(num_examples, dtype="int64")
+    entity_ids = np.full(num_examples, -1, dtype="int64")
+    statistics = {}
+    convert_kwargs = {"statistics": statistics} if is_accepting_statistics(convert_fun) else {}
+    examples = iter(read_fun())
+    index = 0
+    while index < num_examples:
+        block = [next(examples) for _ in range(min(batch_size if is_batched else 1, num_examples - index))]
+        if is_batched:
+            block_features = convert_fun(block, **convert_kwargs)
+        else:
+            block_features = [convert_fun(example, **convert_kwargs) for example in block]
+        for features in block_features:
+            lengths[index] = len(features["input_ids"])
+            entity_ids[index] = features.get("entity_id", -1)
+            for name, array in arrays.items():
+                array[index, : lengths[index]] = features[name]
+            index += 1
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    np.save(os.path.join(tmp_path, "lengths.npy"), lengths)
+    if (entity_ids >= 0).any():
+        np.save(os.path.join(tmp_path, "entity_id.npy"), entity_ids)
+
+    meta = {"data_path": data_path, "num_examples": num_examples, "statistics": statistics}
+    if read_statistics is not None:
+        meta["read_statistics"] = read_statistics
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf8") as f:
+        json.dump(meta, f)
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Another process has built the same cache.
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return TokenizedDataset(cache_path)
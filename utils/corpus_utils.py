@@ -0,0 +1,149 @@
+import mmap
+import os
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+from paddlenlp.utils.log import logger
+
+
+class CorpusReader:
+    """以 mmap 讀取推論資料（一行一篇文件），並在資料旁建立 line-offset index（`<data_file>.idx.npy`）。
+
+    Note:
+        index 為 int64 array：[檔案大小, mtime_ns, offset_0, offset_1, ..., offset_n]，
+        offset_i 為第 i 篇文件的起始 byte，offset_n 為檔案結尾。檔案大小或 mtime 改變時會自動重建。
+        建好 index 後不需要再掃描檔案，即可 O(1) 取出任一篇文件，或將文件切成連續的 shard 給不同 worker。
+
+    Args:
+        data_file (str): 推論資料路徑。
+        index_file (str, optional): index 路徑. Defaults to `<data_file>.idx.npy`.
+        is_rebuild_index (bool, optional): 是否強制重建 index. Defaults to False.
+    """
+
+    def __init__(self, data_file: str, index_file: Optional[str] = None, is_rebuild_index: bool = False) -> None:
+        if not os.path.exists(data_file):
+            raise ValueError(f"Data not found in {data_file}. Please input the correct path of data.")
+
+        self.data_file = data_file
+        self.index_file = index_file if index_file else data_file + ".idx.npy"
+        self.offsets = None if is_rebuild_index else self._load_index()
+        if self.offsets is None:
+            self.offsets = self._build_index()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, doc_id: int) -> str:
+        if doc_id < 0:
+            doc_id += len(self)
+        if not 0 <= doc_id < len(self):
+            raise IndexError(f"Document id {doc_id} out of range (0 ~ {len(self) - 1}).")
+        with self._open() as data:
+            return self._decode(data, doc_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_range(0, len(self))
+
+    def iter_range(self, start: int, end: int) -> Iterator[str]:
+        """依序讀取 [start, end) 的文件。
+
+        Args:
+            start (int): 起始文件 id。
+            end (int): 結束文件 id（不包含）。
+
+        Yields:
+            Iterator[str]: 去除頭尾空白後的文件，與 `line.strip()` 相同。
+        """
+        end = min(end, len(self))
+        if start >= end:
+            return
+        with self._open() as data:
+            for doc_id in range(start, end):
+                yield self._decode(data, doc_id)
+
+    def split(self, num_shards: int) -> List[Tuple[int, int]]:
+        """將文件切成 num_shards 個連續且數量相近的 shard。
+
+        Args:
+            num_shards (int): shard 數量。
+
+        Returns:
+            List[Tuple[int, int]]: 每個 shard 的 (start, end) 文件 id，可直接交給 iter_range。
+        """
+        if num_shards <= 0:
+            raise ValueError(f"num_shards should be larger than 0, but got {num_shards}.")
+        bounds = np.linspace(0, len(self), num_shards + 1).astype("int64")
+        return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def subset(self, start: int, end: int) -> "CorpusReader":
+        """[start, end) 文件的 view（共用同一個檔案與 index，文件 id 從 0 開始）。"""
+        end = min(end, len(self))
+        reader = object.__new__(CorpusReader)
+        reader.data_file = self.data_file
+        reader.index_file = self.index_file
+        reader.offsets = self.offsets[start : max(start, end) + 1]
+        return reader
+
+    def byte_range(self, start: int, end: int) -> Tuple[int, int]:
+        """[start, end) 文件在檔案中的 byte 範圍。"""
+        return int(self.offsets[start]), int(self.offsets[min(end, len(self))])
+
+    def _open(self) -> mmap.mmap:
+        if os.path.getsize(self.data_file) == 0:
+            return _EmptyMap()
+        with open(self.data_file, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _decode(self, data: mmap.mmap, doc_id: int) -> str:
+        return data[self.offsets[doc_id] : self.offsets[doc_id + 1]].decode("utf8").strip()
+
+    def _file_signature(self) -> Tuple[int, int]:
+        stat = os.stat(self.data_file)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_index(self) -> Optional[np.ndarray]:
+        if not os.path.exists(self.index_file):
+            return None
+        try:
+            index = np.load(self.index_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot load index {self.index_file}: {e}. Rebuild the index.")
+            return None
+        if len(index) < 3 or tuple(index[:2]) != self._file_signature():
+            logger.info(f"{self.data_file} is modified. Rebuild the index.")
+            return None
+        return index[2:]
+
+    def _build_index(self) -> np.ndarray:
+        size, mtime_ns = self._file_signature()
+        offsets = [0]
+        with self._open() as data:
+            position = data.find(b"\n")
+            while position != -1:
+                offsets.append(position + 1)
+                position = data.find(b"\n", position + 1)
+        if offsets[-1] != size:
+            offsets.append(size)  # the last line has no "\n"
+        offsets = np.array(offsets, dtype="int64")
+
+        try:
+            with open(self.index_file, "wb") as f:
+                np.save(f, np.concatenate([np.array([size, mtime_ns], dtype="int64"), offsets]))
+        except OSError as e:
+            logger.warning(f"Cannot write index into {self.index_file}: {e}. Use the in-memory index.")
+        return offsets
+
+
+class _EmptyMap:
+    """mmap 無法映射空檔案，以此代替。"""
+
+    def __enter__(self) -> "_EmptyMap":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def __getitem__(self, key: slice) -> bytes:
+        return b""
+
+    def find(self, sub: bytes, start: int = 0) -> int:
+        return -1
@@ -1,12 +1,27 @@
+import inspect
 import json
 import os
-from typing import Optional, List, Any, Dict, Union, Tuple, Iterator
+import re
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+from typing import Optional, List, Any, Dict, Union, Tuple, Iterator, Iterable, Callable
+import numpy as np
+import paddle
 from paddlenlp.utils.log import logger
-from paddle.io import BatchSampler, DataLoader, DistributedBatchSampler
+from paddle.io import BatchSampler, DataLoader, DistributedBatchSampler, IterableDataset, get_worker_info
 from .exceptions import DataError, PreprocessingError
 
 
-def read_data_by_chunk(data_path: str, max_seq_len: int = 512) -> Iterator[Dict[str, str]]:
+def read_data_by_chunk(
+    data_path: str,
+    max_seq_len: int = 512,
+    chunk_overlap: int = 0,
+    is_chunk_by_sentence: bool = False,
+    tokenizer: Any = None,
+    entity_types: Optional[List[str]] = None,
+    is_keep_offset: bool = False,
+    candidate_filter: Optional["CandidateFilter"] = None,
+) -> Iterator[Dict[str, str]]:
     """
     Summary: 讀「透過 utils/split_labelstudio.py 分割的 .txt檔」，此 txt 檔格式和 UIE官方提供的doccano.py轉換後的格式一樣。
         Model Input Format: [CLS] Prompt [SEP] Content [SEP].
@@ -15,10 +30,19 @@ def read_data_by_chunk(data_path: str, max_seq_len: int = 512) -> Iterator[Dict[
     Args:
         data_path (str): 資料路徑（轉換後的training/eval/testing資料）。
         max_seq_len (int, optional): 模型input最大長度. Defaults to 512.
+        chunk_overlap (int, optional): 相鄰 chunk 重疊的字數（見 get_sliding_windows），0 表示不重疊. Defaults to 0.
+        is_chunk_by_sentence (bool, optional): 是否以完整的子句組成 chunk（見 get_sentence_windows）. Defaults to False.
+        tokenizer (Any, optional): 若提供，chunk 長度以 token 數量計算（見 get_token_windows），否則以字數計算. Defaults to None.
+        entity_types (Optional[List[str]], optional): 若提供，每個 chunk 加上 entity_id（prompt 在 entity_types 中的 index），
+            convert_to_uie_format 會保留此欄位，用於分類別驗證. Defaults to None.
+        is_keep_offset (bool, optional): 是否在每個 chunk 加上 doc_id（第幾行資料）與 offset（chunk 在 content 的起始位置），
+            convert_to_uie_format 會保留這些欄位與 offset_mapping，用於文件層級的驗證. Defaults to False.
+        candidate_filter (Optional[CandidateFilter], optional): 若提供，略過不可能包含 prompt 的 chunk（不會產生），
+            並記錄被略過的標註數量（每次讀取時重新計數，多次讀取同一份資料不會重複計算）. Defaults to None.
 
     Raises:
-        ValueError: max_seq_len太小或prompt太長。
-        DataError: 原始資料有問題（output of label studio），可能是entity太長或end的位置 < start的位置。
+        ValueError: max_seq_len太小或prompt太長，或同時設定多種切法（chunk_overlap、is_chunk_by_sentence、tokenizer）。
+        DataError: 原始資料有問題（output of label studio），可能是entity太長或end的位置 < start的位置，或 prompt 不在 entity_types 中。
 
     Yields:
         Iterator[Dict[str, str]]: 每個batch所吃的原始文本（Before tokenization）。
@@ -26,65 +50,318 @@ def read_data_by_chunk(data_path: str, max_seq_len: int = 512) -> Iterator[Dict[
 
     if not os.path.exists(data_path):
         raise ValueError(f"Path not found {data_path}.")
+    if chunk_overlap and is_chunk_by_sentence:
+        raise ValueError("chunk_overlap is not supported when is_chunk_by_sentence=True.")
+    if tokenizer is not None and (chunk_overlap or is_chunk_by_sentence):
+        raise ValueError("Token chunking does not support chunk_overlap or is_chunk_by_sentence.")
 
+    if candidate_filter is not None:
+        candidate_filter.reset()
+    num_docs, num_chunks, num_fixed_chunks = 0, 0, 0
     with open(data_path, "r", encoding="utf-8") as f:
         for line in f:
             json_line = json.loads(line)
             content = json_line["content"].strip()
             prompt = json_line["prompt"]
+            if entity_types is not None and prompt not in entity_types:
+                raise DataError(f"Cannot map prompt {prompt} to {entity_types}, check if the entity type is modified.")
 
             # 3 means '[CLS] [SEP] [SEP]' in [CLS] Prompt [SEP] Content [SEP]
             if max_seq_len <= len(prompt) + 3:
                 raise ValueError("The value of max_seq_len is too small. Please set a larger value.")
+
+            max_content_len = max_seq_len - len(prompt) - 3
             result_list = json_line["result_list"]
-            accumulate_token = 0
-
-            # start pop all subcontent (segment by max_seq_len)
-            while len(content) > 0:
-                max_content_len = max_seq_len - len(prompt) - 3
-                current_content_result = []
-
-                # pop result in subcontent
-                while len(result_list) > 0:
-                    if (
-                        result_list[0]["start"] > result_list[0]["end"]
-                        or result_list[0]["end"] - result_list[0]["start"] > max_content_len
-                    ):
-                        raise DataError(
-                            f"Error in result list. Invalid start or end location (start: {result_list[0]['start']}, end: {result_list[0]['end']}). Please check the data in {data_path}."
-                        )
-                    if result_list[0]["start"] < max_content_len:
-                        if result_list[0]["end"] > max_content_len:
-                            # Result-Cross case: using dynamic adjust max_content_len to escape the problem.
-                            logger.debug(f"Result-Cross. result: {result_list[0]}.")
-                            max_content_len = result_list[0]["start"]
-                            result_list[0]["start"] -= max_content_len
-                            result_list[0]["end"] -= max_content_len
-                            break
-                        else:
-                            current_content_result.append(result_list.pop(0))
-                            if result_list:
-                                result_list[0]["start"] -= accumulate_token
-                                result_list[0]["end"] -= accumulate_token
-                    else:
-                        result_list[0]["start"] -= max_content_len
-                        result_list[0]["end"] -= max_content_len
-                        break
-
-                for each_result in current_content_result:
-                    adjust_data = content[:max_content_len][each_result["start"] : each_result["end"]]
-                    true_data = each_result["text"]
-                    if adjust_data != true_data:
-                        raise PreprocessingError(f"adjust error. adjust_data: {adjust_data}, true_data: {true_data}.")
-
-                yield {
-                    "content": content[:max_content_len],
-                    "result_list": current_content_result,
+            if tokenizer is not None:
+                max_content_tokens = max_seq_len - len(tokenizer.tokenize(prompt)) - 3
+                spans = [(result["start"], result["end"]) for result in result_list]
+                windows = get_token_windows(content, tokenizer, max_content_tokens, spans=spans)
+                chunks = split_content_by_windows(content, result_list, windows, len(content), data_path=data_path)
+            elif is_chunk_by_sentence:
+                spans = [(result["start"], result["end"]) for result in result_list]
+                windows = get_sentence_windows(content, max_content_len, spans=spans)
+                chunks = split_content_by_windows(content, result_list, windows, max_content_len, data_path=data_path)
+            elif chunk_overlap:
+                windows = get_sliding_windows(len(content), max_content_len, chunk_overlap=chunk_overlap)
+                chunks = split_content_by_windows(content, result_list, windows, max_content_len, data_path=data_path)
+            else:
+                chunks = split_content_by_index(content, result_list, max_content_len, data_path=data_path)
+
+            for chunk_start, chunk_end, chunk_result_list in chunks:
+                num_chunks += 1
+                if candidate_filter is not None and not candidate_filter.is_candidate(
+                    prompt, content[chunk_start:chunk_end], num_labels=len(chunk_result_list)
+                ):
+                    continue
+                chunk = {
+                    "content": content[chunk_start:chunk_end],
+                    "result_list": chunk_result_list,
                     "prompt": prompt,
                 }
+                if entity_types is not None:
+                    chunk["entity_id"] = entity_types.index(prompt)
+                if is_keep_offset:
+                    chunk["doc_id"] = num_docs
+                    chunk["offset"] = chunk_start
+                yield chunk
+            num_docs += 1
+            num_fixed_chunks += -(-len(content) // max_content_len)
+
+    if (is_chunk_by_sentence or tokenizer is not None) and num_docs:
+        logger.info(
+            f"Chunking of {data_path}: {num_chunks / num_docs:.2f} chunks per document "
+            f"(fixed-length chunking: {num_fixed_chunks / num_docs:.2f})."
+        )
+
+
+def split_content_by_index(
+    content: str, result_list: List[Dict[str, Any]], max_content_len: int, data_path: str = ""
+) -> Iterator[Tuple[int, int, List[Dict[str, Any]]]]:
+    """依序將 content 切成長度最多 max_content_len 的 chunk，並分配每個 chunk 內的 result。
+
+    Note:
+        只以 index 走過 content 與 result_list 一次（O(len(content) + len(result_list))），不修改 result_list。
+        Result-Cross case: result 跨過 chunk 邊界時，chunk 提前在該 result 的 start 結束，result 放到下一個 chunk。
+        result_list 依序處理（應依 start 排序），每個 chunk 內的 start/end 為相對於 chunk 起點的位置。
+
+    Args:
+        content (str): 文本。
+        result_list (List[Dict[str, Any]]): 文本的 result，start/end 為相對於 content 的位置。
+        max_content_len (int): 每個 chunk 的最大長度。
+        data_path (str, optional): 錯誤訊息所顯示的資料路徑. Defaults to "".
+
+    Raises:
+        DataError: result 的 end 位置 < start 的位置，或 result 長度超過 max_content_len。
+        PreprocessingError: chunk 內的文字與 result 的 text 不同。
+
+    Yields:
+        Iterator[Tuple[int, int, List[Dict[str, Any]]]]: 每個 chunk 的 (start, end, result_list)。
+    """
+    chunk_start = 0
+    result_index = 0
+    while chunk_start < len(content):
+        chunk_end = chunk_start + max_content_len
+        current_content_result = []
+
+        while result_index < len(result_list):
+            result = result_list[result_index]
+            start, end = result["start"] - chunk_start, result["end"] - chunk_start
+            if start > end or end - start > max_content_len:
+                raise DataError(
+                    f"Error in result list. Invalid start or end location (start: {start}, end: {end}). Please check the data in {data_path}."
+                )
+            if start >= max_content_len:
+                break
+            if end > max_content_len:
+                # Result-Cross case: end the chunk before the result.
+                logger.debug(f"Result-Cross. result: {dict(result, start=start, end=end)}.")
+                chunk_end = chunk_start + start
+                break
+            current_content_result.append(dict(result, start=start, end=end))
+            result_index += 1
+
+        chunk_content = content[chunk_start:chunk_end]
+        for each_result in current_content_result:
+            adjust_data = chunk_content[each_result["start"] : each_result["end"]]
+            true_data = each_result["text"]
+            if adjust_data != true_data:
+                raise PreprocessingError(f"adjust error. adjust_data: {adjust_data}, true_data: {true_data}.")
+
+        yield chunk_start, min(chunk_end, len(content)), current_content_result
+        chunk_start = chunk_end
+
+
+def get_sliding_windows(content_len: int, max_content_len: int, chunk_overlap: int = 0) -> List[Tuple[int, int]]:
+    """將長度 content_len 的文本切成長度最多 max_content_len、相鄰重疊 chunk_overlap 字的 window。
+
+    Note:
+        訓練、驗證（read_data_by_chunk）與推論（CrossDocumentPredictor）共用此切法。
+        chunk_overlap=0 時與依 max_content_len 直接切段相同；最後一個 window 一定包含文本結尾。
+
+    Args:
+        content_len (int): 文本長度。
+        max_content_len (int): 每個 window 的最大長度。
+        chunk_overlap (int, optional): 相鄰 window 重疊的字數. Defaults to 0.
+
+    Raises:
+        ValueError: chunk_overlap 小於 0 或不小於 max_content_len。
+
+    Returns:
+        List[Tuple[int, int]]: 每個 window 的 (start, end)。
+    """
+    if not 0 <= chunk_overlap < max_content_len:
+        raise ValueError(
+            f"chunk_overlap should be in [0, {max_content_len}) (the content length of each chunk), but got {chunk_overlap}."
+        )
+    windows = []
+    start = 0
+    while start < content_len:
+        windows.append((start, min(start + max_content_len, content_len)))
+        if start + max_content_len >= content_len:
+            break
+        start += max_content_len - chunk_overlap
+    return windows
+
+
+SENTENCE_DELIMITERS = "。；，！？：\n"
+
+
+def get_sentence_windows(
+    content: str,
+    max_content_len: int,
+    spans: List[Tuple[int, int]] = (),
+    delimiters: str = SENTENCE_DELIMITERS,
+) -> List[Tuple[int, int]]:
+    """以子句（以 delimiters 結尾）為單位，由前往後盡量將完整的子句放進長度最多 max_content_len 的 window。
+
+    Note:
+        window 只在子句結尾切開；單一子句超過 max_content_len 時才直接在 max_content_len 處切開。
+        spans（例如 result 的 (start, end)）內的位置不會被切開：硬切的位置落在 span 內時，改在該 span 的 start 切開。
+
+    Args:
+        content (str): 文本。
+        max_content_len (int): 每個 window 的最大長度。
+        spans (List[Tuple[int, int]], optional): 不可切開的區間. Defaults to ().
+        delimiters (str, optional): 子句結尾的標點. Defaults to SENTENCE_DELIMITERS.
+
+    Returns:
+        List[Tuple[int, int]]: 每個 window 的 (start, end)，彼此不重疊且涵蓋整個 content。
+    """
+    spans = sorted(span for span in spans if span[1] - span[0] > 1)
+    span_starts = [start for start, _ in spans]
+
+    def inside_span(position: int) -> Optional[int]:
+        # returns the start of the span which strictly contains the position
+        index = bisect_left(span_starts, position) - 1
+        while index >= 0 and position - span_starts[index] < max_content_len:
+            if spans[index][1] > position:
+                return span_starts[index]
+            index -= 1
+        return None
+
+    pattern = re.compile(f"[{re.escape(delimiters)}]")
+    boundaries = [match.end() for match in pattern.finditer(content) if inside_span(match.end()) is None]
+
+    windows = []
+    start = 0
+    while start < len(content):
+        limit = start + max_content_len
+        if limit >= len(content):
+            windows.append((start, len(content)))
+            break
+        index = bisect_right(boundaries, limit) - 1
+        if index >= 0 and boundaries[index] > start:
+            end = boundaries[index]
+        else:
+            # a single clause longer than max_content_len
+            span_start = inside_span(limit)
+            end = span_start if span_start is not None and span_start > start else limit
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def get_token_windows(
+    content: str, tokenizer: Any, max_content_tokens: int, spans: List[Tuple[int, int]] = ()
+) -> List[Tuple[int, int]]:
+    """依照 tokenizer 的 offset mapping 切分 content，每個 window 盡量放滿 max_content_tokens 個 token。
+
+    Note:
+        字數與 token 數量不一定相同（例如數字、英文會合併成一個 token），以字數切分會浪費長度或被 truncation 截斷。
+        window 只在 word 的開頭切開（不會切開 "##" 開頭的 subword），且不會切開 spans（例如 result 的 (start, end)）；
+        找不到這樣的位置時才直接在第 max_content_tokens 個 token 處切開。
+
+    Args:
+        content (str): 文本。
+        tokenizer (Any): paddlenlp.transformers.AutoTokenizer。
+        max_content_tokens (int): 每個 window 的最大 token 數量。
+        spans (List[Tuple[int, int]], optional): 不可切開的區間. Defaults to ().
+
+    Returns:
+        List[Tuple[int, int]]: 每個 window 的 (start, end)，彼此不重疊且涵蓋整個 content。
+    """
+    if max_content_tokens <= 0:
+        raise ValueError("The value of max_seq_len is too small. Please set a larger value.")
+
+    tokens = tokenizer.tokenize(content)
+    offsets = tokenizer.get_offset_mapping(content)
+    is_protected = bytearray(len(content) + 1)
+    for span_start, span_end in spans:
+        for position in range(max(0, span_start + 1), min(span_end, len(content))):
+            is_protected[position] = 1
+
+    def is_cut(token_index: int) -> bool:
+        return not tokens[token_index].startswith("##") and not is_protected[offsets[token_index][0]]
+
+    windows = []
+    start, start_token = 0, 0
+    while start_token + max_content_tokens < len(tokens):
+        limit = start_token + max_content_tokens
+        end_token = next((index for index in range(limit, start_token, -1) if is_cut(index)), limit)
+        windows.append((start, offsets[end_token][0]))
+        start, start_token = offsets[end_token][0], end_token
+    windows.append((start, len(content)))
+    return windows
+
+
+def split_content_by_windows(
+    content: str,
+    result_list: List[Dict[str, Any]],
+    windows: List[Tuple[int, int]],
+    max_content_len: int,
+    data_path: str = "",
+) -> Iterator[Tuple[int, int, List[Dict[str, Any]]]]:
+    """依照給定的 window（見 get_sliding_windows、get_sentence_windows）切分 content，每個 window 包含完整落在其中的 result。
+
+    Note:
+        window 重疊時，result 可能同時出現在多個 window；沒有完整落在任何 window 的 result 會被略過（logger.debug）。
+        不修改 result_list。
+
+    Args:
+        content (str): 文本。
+        result_list (List[Dict[str, Any]]): 文本的 result，start/end 為相對於 content 的位置。
+        windows (List[Tuple[int, int]]): 每個 window 的 (start, end)，依 start 排序。
+        max_content_len (int): 每個 window 的最大長度。
+        data_path (str, optional): 錯誤訊息所顯示的資料路徑. Defaults to "".
+
+    Raises:
+        DataError: result 的 end 位置 < start 的位置，或 result 長度超過 max_content_len。
+        PreprocessingError: window 內的文字與 result 的 text 不同。
+
+    Yields:
+        Iterator[Tuple[int, int, List[Dict[str, Any]]]]: 每個 window 的 (start, end, result_list)。
+    """
+    for result in result_list:
+        if result["start"] > result["end"] or result["end"] - result["start"] > max_content_len:
+            raise DataError(
+                f"Error in result list. Invalid start or end location (start: {result['start']}, end: {result['end']}). Please check the data in {data_path}."
+            )
+    sorted_results = sorted(result_list, key=lambda result: result["start"])
+    starts = [result["start"] for result in sorted_results]
+    num_assigned = [0] * len(sorted_results)
+
+    for window_start, window_end in windows:
+        current_content_result = []
+        for index in range(bisect_left(starts, window_start), bisect_left(starts, window_end)):
+            result = sorted_results[index]
+            if result["end"] <= window_end:
+                current_content_result.append(
+                    dict(result, start=result["start"] - window_start, end=result["end"] - window_start)
+                )
+                num_assigned[index] += 1
 
-                content = content[max_content_len:]
-                accumulate_token += max_content_len
+        chunk_content = content[window_start:window_end]
+        for each_result in current_content_result:
+            adjust_data = chunk_content[each_result["start"] : each_result["end"]]
+            true_data = each_result["text"]
+            if adjust_data != true_data:
+                raise PreprocessingError(f"adjust error. adjust_data: {adjust_data}, true_data: {true_data}.")
+
+        yield window_start, window_end, current_content_result
+
+    for result, count in zip(sorted_results, num_assigned):
+        if count == 0:
+            logger.debug(f"Result-Cross. No window contains the whole result: {result}.")
 
 
 def drift_offsets_mapping(offset_mapping: Tuple[Tuple[int, int]]) -> Tuple[List[List[int]], int]:
@@ -135,11 +412,175 @@ def align_to_offset_mapping(origin_index: int, offset_mapping: List[List[int]])
     return final_index + 1
 
 
+def get_char_to_token_table(offset_mapping: List[Tuple[int, int]]) -> Tuple[np.ndarray, int]:
+    """建立 char index -> token index 的對照表，取代對每個 result 呼叫 drift_offsets_mapping 與 align_to_offset_mapping 的線性搜尋。
+
+    Note:
+        對照表以 drift_offsets_mapping 調整後的 index 為準（content 的第 i 個字為 table[i + drift]），
+        查詢的結果與 align_to_offset_mapping 相同：多個 token 包含同一個字時取第一個，沒有 token 包含的位置為
+        最後一個非特殊 token 的下一個 index（table 的最後一格，超出範圍的 index 也使用這一格）。
+
+    Args:
+        offset_mapping (List[Tuple[int, int]]): Tokenization output. Use argument 'return_offsets_mapping=True'.
+
+    Returns:
+        1. np.ndarray: 對照表，以 lookup_char_to_token_table 查詢。
+        2. int: Drift term, 與 drift_offsets_mapping 相同。
+    """
+    offsets = np.fromiter(chain.from_iterable(offset_mapping), dtype="int64", count=2 * len(offset_mapping)).reshape(-1, 2)
+    is_special = (offsets[:, 0] == 0) & (offsets[:, 1] == 0)
+    separators = np.flatnonzero(is_special[1:]) + 1
+    drift = 0
+    if len(separators):
+        drift = int(offsets[separators[0] - 1, 1]) + 1  # [SEP] token
+        offsets[separators[0] + 1 :][~is_special[separators[0] + 1 :]] += drift
+
+    is_aligned = (offsets[:, 0] != 0) & (offsets[:, 1] != 0)
+    final_index = int(np.flatnonzero(is_aligned)[-1]) if is_aligned.any() else 0
+    table = np.full(int(offsets[:, 1].max(initial=0)) + 1, final_index + 1, dtype="int64")
+
+    span_lengths = np.clip(offsets[:, 1] - offsets[:, 0], 0, None)
+    token_index = np.repeat(np.arange(len(offsets)), span_lengths)
+    char_index = np.repeat(offsets[:, 0] - np.cumsum(span_lengths) + span_lengths, span_lengths) + np.arange(
+        len(token_index)
+    )
+    # np.unique returns the first (lowest token) occurrence of each char, as the linear scan does.
+    char_index, first = np.unique(char_index, return_index=True)
+    table[char_index] = token_index[first]
+    return table, drift
+
+
+def lookup_char_to_token_table(origin_index: int, table: np.ndarray) -> int:
+    """以 get_char_to_token_table 的對照表查詢 align_to_offset_mapping(origin_index, adjusted_offset_mapping)。"""
+    if 0 <= origin_index < len(table):
+        return int(table[origin_index])
+    return int(table[-1])
+
+
+EMPTY_CONTENT = "無文本"
+
+
+def get_content_end(offset_mapping: List[Tuple[int, int]]) -> int:
+    """回傳 [CLS] Prompt [SEP] Content [SEP] 中最後一個 content token 的結束位置（相對於 content），小於 content 長度表示被 truncation 截斷。"""
+    content_end, is_content = 0, False
+    for index in range(1, len(offset_mapping)):
+        start, end = offset_mapping[index]
+        if start == 0 and end == 0:
+            if is_content:
+                break
+            is_content = True
+        elif is_content:
+            content_end = end
+    return content_end
+
+
+class CandidateFilter:
+    """以每個 entity type 的 regex 規則，在送進模型前略過不可能包含該 entity 的 chunk。
+
+    Note:
+        每個 entity type 的規則編譯成單一 regex（只編譯一次），chunk 中找不到任何符合的片段即略過；沒有規則的 entity type 不會略過任何 chunk。
+        num_chunks / num_skipped_chunks 為檢查與略過的 chunk 數量；驗證資料另外記錄 num_labels / num_skipped_labels，
+        被略過的 chunk 中的標註一定無法被預測，num_skipped_labels / num_labels 即為 recall 損失的估計。
+
+    Args:
+        patterns (Dict[str, List[str]]): entity type 對應的 regex 列表（見 config/base_config.py 的 entity_candidate_patterns）。
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]) -> None:
+        self.patterns = {
+            entity: re.compile("|".join(f"(?:{pattern})" for pattern in entity_patterns))
+            for entity, entity_patterns in patterns.items()
+            if entity_patterns
+        }
+        self.reset()
+
+    def reset(self) -> None:
+        self.num_chunks = 0
+        self.num_skipped_chunks = 0
+        self.num_labels = 0
+        self.num_skipped_labels = 0
+
+    def statistics(self) -> Dict[str, int]:
+        """目前的計數，可存入 tokenization 的 cache（見 load_tokenized_dataset 的 read_statistics_fun）。"""
+        return {
+            "num_chunks": self.num_chunks,
+            "num_skipped_chunks": self.num_skipped_chunks,
+            "num_labels": self.num_labels,
+            "num_skipped_labels": self.num_skipped_labels,
+        }
+
+    def load_statistics(self, statistics: Dict[str, int]) -> None:
+        """以 statistics() 保存的計數取代目前的計數（例如讀取 cache 時不會呼叫 read_fun）。"""
+        self.reset()
+        for name, value in statistics.items():
+            setattr(self, name, value)
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.num_skipped_chunks / max(1, self.num_chunks)
+
+    @property
+    def recall_loss(self) -> float:
+        """被略過的 chunk 中的標註比例，即略過 chunk 造成的 recall 損失。"""
+        return self.num_skipped_labels / max(1, self.num_labels)
+
+    def is_candidate(self, entity: str, text: str, num_labels: int = 0) -> bool:
+        """text 是否可能包含 entity（需送進模型），num_labels 為 text 中該 entity 的標註數量（驗證資料）。"""
+        pattern = self.patterns.get(entity)
+        is_candidate = pattern is None or pattern.search(text) is not None
+        self.num_chunks += 1
+        self.num_skipped_chunks += not is_candidate
+        self.num_labels += num_labels
+        self.num_skipped_labels += 0 if is_candidate else num_labels
+        return is_candidate
+
+
+def log_candidate_filter_statistics(candidate_filter: CandidateFilter, name: str = "") -> None:
+    """記錄 CandidateFilter 略過的 chunk 比例與 recall 損失的估計。"""
+    if not candidate_filter.num_chunks:
+        return
+    logger.info(
+        f"{name}: candidate prefilter skipped {candidate_filter.num_skipped_chunks} of {candidate_filter.num_chunks} "
+        f"chunks ({candidate_filter.skip_ratio:.2%})."
+    )
+    if candidate_filter.num_labels:
+        log = logger.warning if candidate_filter.num_skipped_labels else logger.info
+        log(
+            f"{name}: {candidate_filter.num_skipped_labels} of {candidate_filter.num_labels} labeled results are in skipped "
+            f"chunks, estimated recall loss: {candidate_filter.recall_loss:.2%}."
+        )
+
+
+def is_accepting_statistics(convert_fun: Callable) -> bool:
+    """convert_fun 是否接受 statistics 參數（例如 convert_to_uie_format），自定義的轉換方法可能沒有此參數。"""
+    try:
+        parameters = inspect.signature(convert_fun).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        parameter.name == "statistics" or parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in parameters
+    )
+
+
+def log_truncation_statistics(statistics: dict, name: str = "") -> None:
+    """記錄 truncation 的次數（見 convert_to_uie_format 的 statistics）。"""
+    if statistics.get("num_truncated_chunks"):
+        logger.warning(
+            f"{name}: {statistics['num_truncated_chunks']} of {statistics['num_chunks']} tokenized chunks were truncated "
+            f"to max_seq_len, {statistics.get('num_dropped_results', 0)} results were dropped. "
+            "Use --is_chunk_by_token to chunk by the token budget."
+        )
+    elif statistics.get("num_chunks"):
+        logger.info(f"{name}: none of {statistics['num_chunks']} tokenized chunks was truncated.")
+
+
 def convert_to_uie_format(
     data: Dict[str, str],
     tokenizer: Any,
     max_seq_len: int = 512,
     multilingual: Optional[bool] = False,
+    statistics: Optional[dict] = None,
+    pad_to_max_seq_len: bool = True,
 ) -> Dict[str, Union[str, float]]:
     """此方法功能如下：
         1. Tokenization.
@@ -160,6 +601,11 @@ def convert_to_uie_format(
         tokenizer (Any, optional): paddlenlp.transformers.AutoTokenizer
         max_seq_len (int, optional): 切片文本的最大長度，通常與 () 一致，truncation 預設為 True. Defaults to 512.
         multilingual (Optional[bool], optional): Whether the model is a multilingual model. Defaults to False.
+        statistics (Optional[dict], optional): 累加 num_chunks、num_truncated_chunks（被 truncation 截斷的 chunk）與
+            num_dropped_results（落在截斷部分而被捨棄的 result），見 log_truncation_statistics。
+            dataset.map 預設為 lazy，因此為每次 tokenization 的次數（例如每個 epoch 各計算一次），訓練開始前的統計並不完整；
+            --is_batched_tokenization 或 dataset_cache_dir 會在訓練前 tokenize 全部資料，統計為完整的一次. Defaults to None.
+        pad_to_max_seq_len (bool, optional): 是否 padding 到 max_seq_len，False 時由 UIEDataCollator 在組 batch 時才 padding. Defaults to True.
 
     Returns:
         Dict[str, Union[str, float]]: 模型真正的 input 格式。
@@ -167,13 +613,14 @@ def convert_to_uie_format(
     if not data:
         return None
 
+    content = data["content"]
     try:
         encoded_inputs = tokenizer(
             text=[data["prompt"]],
             text_pair=[data["content"]],
             truncation=True,
             max_seq_len=max_seq_len,
-            pad_to_max_seq_len=True,
+            pad_to_max_seq_len=pad_to_max_seq_len,
             return_attention_mask=True,
             return_token_type_ids=True,
             return_position_ids=True,
@@ -185,10 +632,10 @@ def convert_to_uie_format(
         logger.debug(f"Tokenizer Bug, content: {data['prompt']}")
         encoded_inputs = tokenizer(
             text=[data["prompt"]],
-            text_pair=["無文本"],
+            text_pair=[EMPTY_CONTENT],
             truncation=True,
             max_seq_len=max_seq_len,
-            pad_to_max_seq_len=True,
+            pad_to_max_seq_len=pad_to_max_seq_len,
             return_token_type_ids=True,
             return_attention_mask=True,
             return_position_ids=True,
@@ -196,20 +643,102 @@ def convert_to_uie_format(
             return_offsets_mapping=True,
         )[0]
         data["result_list"] = []
+        content = EMPTY_CONTENT
+
+    return _get_uie_features(data, encoded_inputs, content, statistics)
+
 
-    start_ids, end_ids = map(lambda x: x * max_seq_len, ([0.0], [0.0]))
+def convert_to_uie_format_batch(
+    batch_data: List[Dict[str, str]],
+    tokenizer: Any,
+    max_seq_len: int = 512,
+    multilingual: Optional[bool] = False,
+    statistics: Optional[dict] = None,
+    pad_to_max_seq_len: bool = True,
+    batch_size: int = 256,
+) -> List[Dict[str, Union[str, float]]]:
+    """convert_to_uie_format 的批次版本：每次將 batch_size 組 (prompt, content) 一起 tokenize，輸出與逐筆呼叫 convert_to_uie_format 相同。
 
-    # adjust offset_mapping
-    adjusted_offset_mapping, drift = drift_offsets_mapping(offset_mapping=encoded_inputs["offset_mapping"])
+    Note:
+        可直接用於 `dataset.map(fn, batched=True)`，但會一次 tokenize 全部資料並將 features 保留在記憶體中
+        （見 --is_batched_tokenization）；StreamingDataset 與 load_tokenized_dataset 則是逐個 block 轉換。某個 batch tokenize 失敗時，該 batch 改為逐筆呼叫 convert_to_uie_format，
+        因此出錯的資料一樣會以 "無文本" 取代，且 result_list 會被清空。
+
+    Args:
+        batch_data (List[Dict[str, str]]): 切片後的文本，格式與 convert_to_uie_format 的 data 相同。
+        tokenizer (Any): paddlenlp.transformers.AutoTokenizer
+        max_seq_len (int, optional): 切片文本的最大長度. Defaults to 512.
+        multilingual (Optional[bool], optional): Whether the model is a multilingual model. Defaults to False.
+        statistics (Optional[dict], optional): 見 convert_to_uie_format. Defaults to None.
+        pad_to_max_seq_len (bool, optional): 見 convert_to_uie_format. Defaults to True.
+        batch_size (int, optional): 每次 tokenize 的資料筆數. Defaults to 256.
+
+    Returns:
+        List[Dict[str, Union[str, float]]]: 模型真正的 input 格式，順序與輸入相同（空的資料為 None）。
+    """
+    features = []
+    for start in range(0, len(batch_data), batch_size):
+        batch = batch_data[start : start + batch_size]
+        samples = [data for data in batch if data]
+        try:
+            encoded_batch = tokenizer(
+                text=[data["prompt"] for data in samples],
+                text_pair=[data["content"] for data in samples],
+                truncation=True,
+                max_seq_len=max_seq_len,
+                pad_to_max_seq_len=pad_to_max_seq_len,
+                return_attention_mask=True,
+                return_token_type_ids=True,
+                return_position_ids=True,
+                return_dict=False,
+                return_offsets_mapping=True,
+            )
+        except Exception:
+            features.extend(
+                convert_to_uie_format(data, tokenizer, max_seq_len, multilingual, statistics, pad_to_max_seq_len)
+                for data in batch
+            )
+            continue
+
+        encoded_batch = iter(encoded_batch)
+        for data in batch:
+            if not data:
+                features.append(None)
+                continue
+            features.append(_get_uie_features(data, next(encoded_batch), data["content"], statistics))
+    return features
+
+
+def _get_uie_features(
+    data: Dict[str, str], encoded_inputs: Dict[str, list], content: str, statistics: Optional[dict]
+) -> Dict[str, Union[str, float]]:
+    # Align result_list to the tokenized positions, dropping results in the truncated part.
+    result_list = data["result_list"]
+    content_end = get_content_end(encoded_inputs["offset_mapping"])
+    is_truncated = content_end < len(content.rstrip())
+    if is_truncated:
+        # Results in the truncated part would be aligned to [SEP], drop them instead.
+        result_list = [item for item in result_list if item["end"] <= content_end]
+        logger.debug(f"Chunk truncated at {content_end}/{len(content)}: {content[:20]}...")
+    if statistics is not None:
+        statistics["num_chunks"] = statistics.get("num_chunks", 0) + 1
+        statistics["num_truncated_chunks"] = statistics.get("num_truncated_chunks", 0) + int(is_truncated)
+        statistics["num_dropped_results"] = (
+            statistics.get("num_dropped_results", 0) + len(data["result_list"]) - len(result_list)
+        )
+
+    start_ids, end_ids = map(lambda x: x * len(encoded_inputs["input_ids"]), ([0.0], [0.0]))
 
     # align original index to tokenized (offset_mapping) index
-    for item in data["result_list"]:
-        aligned_start_index = align_to_offset_mapping(item["start"] + drift, adjusted_offset_mapping)
-        aligned_end_index = align_to_offset_mapping(item["end"] - 1 + drift, adjusted_offset_mapping)
+    if result_list:
+        char_to_token, drift = get_char_to_token_table(encoded_inputs["offset_mapping"])
+    for item in result_list:
+        aligned_start_index = lookup_char_to_token_table(item["start"] + drift, char_to_token)
+        aligned_end_index = lookup_char_to_token_table(item["end"] - 1 + drift, char_to_token)
         start_ids[aligned_start_index] = 1.0
         end_ids[aligned_end_index] = 1.0
 
-    return {
+    features = {
         "input_ids": encoded_inputs["input_ids"],
         "token_type_ids": encoded_inputs["token_type_ids"],
         "position_ids": encoded_inputs["position_ids"],
@@ -217,9 +746,307 @@ def convert_to_uie_format(
         "start_positions": start_ids,
         "end_positions": end_ids,
     }
+    for name in UIEDataCollator.SCALAR_FIELDS:
+        if name in data:
+            features[name] = data[name]
+    if "offset" in data:
+        features["offset_mapping"] = [list(mapping) for mapping in encoded_inputs["offset_mapping"]]
+    return features
+
+
+class UIEDataCollator:
+    """將 convert_to_uie_format 的輸出組成 batch，所有欄位（包含 start_positions/end_positions）只 padding 到 batch 內最長的資料。
+
+    Note:
+        搭配 convert_to_uie_format(pad_to_max_seq_len=False) 與 LengthGroupedBatchSampler，短的 chunk 不需要計算到 max_seq_len；
+        已經 padding 到 max_seq_len 的資料也可以使用（結果與 DataCollatorWithPadding 相同）。
+        num_examples、num_real_tokens / num_padded_tokens 記錄組成 batch 的資料筆數與實際送進模型的 token 數量（DataLoader 的 num_workers > 0 時只記錄在 worker 內）。
+        資料有 entity_id、doc_id、offset（見 read_data_by_chunk）時，batch 也包含這些 shape 為 [batch_size] 的欄位；
+        有 offset_mapping 時，batch 的 offset_mapping 為 shape [batch_size, max_len, 2] 的 numpy array（不送進模型）。
+
+    Args:
+        pad_token_id (int, optional): input_ids 的 padding id（tokenizer.pad_token_id），其他欄位皆以 0 padding. Defaults to 0.
+    """
+
+    FIELDS = {
+        "input_ids": "int64",
+        "token_type_ids": "int64",
+        "position_ids": "int64",
+        "attention_mask": "int64",
+        "start_positions": "float32",
+        "end_positions": "float32",
+    }
+
+    SCALAR_FIELDS = ("entity_id", "doc_id", "offset")
+
+    def __init__(self, pad_token_id: int = 0) -> None:
+        self.pad_token_id = pad_token_id
+        self.num_examples = 0
+        self.num_real_tokens = 0
+        self.num_padded_tokens = 0
+
+    @property
+    def padding_efficiency(self) -> float:
+        """real tokens / padded tokens，越接近 1 表示浪費在 padding 的計算越少。"""
+        return self.num_real_tokens / max(1, self.num_padded_tokens)
+
+    def __call__(self, features: List[Dict[str, list]]) -> Dict[str, paddle.Tensor]:
+        max_len = max(len(feature["input_ids"]) for feature in features)
+        batch = {}
+        for name, dtype in self.FIELDS.items():
+            array = np.full((len(features), max_len), self.pad_token_id if name == "input_ids" else 0, dtype=dtype)
+            for index, feature in enumerate(features):
+                array[index, : len(feature[name])] = feature[name]
+            batch[name] = paddle.to_tensor(array)
+        for name in self.SCALAR_FIELDS:
+            if name in features[0]:
+                batch[name] = paddle.to_tensor([feature[name] for feature in features], dtype="int64")
+        if "offset_mapping" in features[0]:
+            batch["offset_mapping"] = np.zeros((len(features), max_len, 2), dtype="int64")
+            for index, feature in enumerate(features):
+                batch["offset_mapping"][index, : len(feature["offset_mapping"])] = feature["offset_mapping"]
+        self.num_examples += len(features)
+        self.num_real_tokens += int(batch["attention_mask"].sum())
+        self.num_padded_tokens += len(features) * max_len
+        return batch
+
+
+class LengthGroupedBatchSampler(BatchSampler):
+    """將長度相近的資料放在同一個 batch，搭配 UIEDataCollator 減少 padding。
+
+    Note:
+        shuffle=True 時，每個 epoch 先打亂資料，再將每 batch_size * mega_batch_size 筆依長度排序後切成 batch，最後打亂 batch 的順序，
+        保留訓練的隨機性；shuffle=False 時（驗證）直接依長度由長到短切成 batch。
+
+    Args:
+        lengths (List[int]): 每筆資料的長度（見 get_feature_lengths）。
+        batch_size (int): batch size。
+        shuffle (bool, optional): 是否打亂資料. Defaults to True.
+        drop_last (bool, optional): 是否丟掉不滿 batch_size 的 batch. Defaults to False.
+        mega_batch_size (int, optional): 一起依長度排序的 batch 數量. Defaults to 50.
+        seed (int, optional): 亂數種子. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        lengths: List[int],
+        batch_size: int,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        mega_batch_size: int = 50,
+        seed: int = 0,
+    ) -> None:
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.mega_batch_size = mega_batch_size
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self) -> Iterator[List[int]]:
+        if self.shuffle:
+            rng = np.random.RandomState(self.seed + self.epoch)
+            self.epoch += 1
+            indices = rng.permutation(self._sample_indices(rng))
+            group_size = self.batch_size * self.mega_batch_size
+            groups = [indices[start : start + group_size] for start in range(0, len(indices), group_size)]
+            indices = np.concatenate([group[np.argsort(-self.lengths[group], kind="stable")] for group in groups] or [[]])
+        else:
+            indices = np.argsort(-self.lengths, kind="stable")
+
+        batches = [indices[start : start + self.batch_size].tolist() for start in range(0, len(indices), self.batch_size)]
+        if self.drop_last and batches and len(batches[-1]) < self.batch_size:
+            batches.pop()
+        if self.shuffle:
+            rng.shuffle(batches)
+        yield from batches
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            return self._num_samples() // self.batch_size
+        return -(-self._num_samples() // self.batch_size)
+
+    def _sample_indices(self, rng: np.random.RandomState) -> np.ndarray:
+        """shuffle=True 時，每個 epoch 使用的資料 index。"""
+        return np.arange(len(self.lengths))
+
+    def _num_samples(self) -> int:
+        return len(self.lengths)
+
+
+class NegativeSamplingBatchSampler(LengthGroupedBatchSampler):
+    """訓練用的 batch sampler：每個 epoch 使用所有 positive chunk（有 result 的 chunk），negative chunk 只抽樣 negative_ratio 倍。
+
+    Note:
+        大部分的 chunk 沒有 result（每筆資料會展開成每個 entity type 一個 prompt，再切成多個 chunk），抽樣可大幅減少每個 epoch 的計算量。
+        每個 epoch 以 seed + epoch 重新抽樣 negative chunk，多個 epoch 下來仍會看過大部分的 negative chunk。
+        抽樣只決定每個 epoch 使用的 index，tokenization 的結果（或 cache）不需重算。
+
+    Args:
+        is_positive (List[bool]): 每筆資料是否有 result（見 get_positive_mask）。
+        batch_size (int): batch size。
+        negative_ratio (float, optional): 每個 epoch negative 與 positive chunk 數量的比例，negative chunk 不足時全部使用. Defaults to 1.0.
+        lengths (Optional[List[int]], optional): 若提供，同時將長度相近的資料放在同一個 batch（見 LengthGroupedBatchSampler）. Defaults to None.
+        drop_last (bool, optional): 是否丟掉不滿 batch_size 的 batch. Defaults to False.
+        mega_batch_size (int, optional): 見 LengthGroupedBatchSampler. Defaults to 50.
+        seed (int, optional): 亂數種子. Defaults to 0.
+
+    Raises:
+        ValueError: negative_ratio 小於 0，或沒有任何 positive chunk（抽樣後每個 epoch 都沒有資料）。
+    """
+
+    def __init__(
+        self,
+        is_positive: List[bool],
+        batch_size: int,
+        negative_ratio: float = 1.0,
+        lengths: Optional[List[int]] = None,
+        drop_last: bool = False,
+        mega_batch_size: int = 50,
+        seed: int = 0,
+    ) -> None:
+        if negative_ratio < 0:
+            raise ValueError(f"negative_ratio ({negative_ratio}) must be non-negative.")
+        is_positive = np.asarray(is_positive, dtype=bool)
+        if not is_positive.any():
+            raise ValueError("No chunk has results, negative sampling would yield empty epochs. Unset negative_ratio.")
+        # Equal lengths keep the shuffled order, i.e. no length grouping.
+        lengths = np.zeros(len(is_positive), dtype="int64") if lengths is None else lengths
+        super().__init__(
+            lengths, batch_size, shuffle=True, drop_last=drop_last, mega_batch_size=mega_batch_size, seed=seed
+        )
+        self.positive_indices = np.flatnonzero(is_positive)
+        self.negative_indices = np.flatnonzero(~is_positive)
+        self.num_negatives = min(len(self.negative_indices), int(round(negative_ratio * len(self.positive_indices))))
+
+    def _sample_indices(self, rng: np.random.RandomState) -> np.ndarray:
+        negative_indices = rng.choice(self.negative_indices, self.num_negatives, replace=False)
+        return np.concatenate([self.positive_indices, negative_indices])
+
+    def _num_samples(self) -> int:
+        return len(self.positive_indices) + self.num_negatives
+
+
+def get_feature_lengths(dataset: Any) -> List[int]:
+    """每筆資料的 token 數量（input_ids 的長度），優先使用資料集的 lengths（例如 TokenizedDataset）。"""
+    lengths = getattr(dataset, "lengths", None)
+    if lengths is None:
+        lengths = getattr(getattr(dataset, "data", None), "lengths", None)
+    if lengths is not None:
+        return list(lengths)
+    return [len(dataset[index]["input_ids"]) for index in range(len(dataset))]
+
+
+def get_positive_mask(dataset: Any) -> List[bool]:
+    """每筆資料是否有 result（start_positions 不全為 0）。
+
+    Note:
+        優先使用資料集的 is_positive（例如 TokenizedDataset）；其次使用 tokenization 前 chunk 的 result_list
+        （load_dataset 再 map 的 MapDataset，不需要 tokenize，但不會扣除被 truncation 截斷的 result），最後才逐筆 tokenize 檢查。
+    """
+    data = getattr(dataset, "data", None)
+    is_positive = getattr(dataset, "is_positive", None)
+    if is_positive is None:
+        is_positive = getattr(data, "is_positive", None)
+    if is_positive is not None:
+        return list(is_positive)
+    if isinstance(data, list) and len(data) == len(dataset) and all("result_list" in chunk for chunk in data):
+        return [bool(chunk["result_list"]) for chunk in data]
+    return [any(dataset[index]["start_positions"]) for index in range(len(dataset))]
+
+
+def log_dataset_composition(is_positive: List[bool], name: str = "", negative_ratio: Optional[float] = None) -> None:
+    """記錄有 result 的 chunk 比例，以及 negative_ratio 抽樣後每個 epoch 使用的 chunk 數量（見 NegativeSamplingBatchSampler）。"""
+    num_chunks, num_positives = len(is_positive), int(sum(is_positive))
+    logger.info(
+        f"{name}: {num_positives} of {num_chunks} chunks ({num_positives / max(1, num_chunks):.2%}) have results, "
+        f"{num_chunks - num_positives} chunks are negative."
+    )
+    if negative_ratio is not None:
+        num_negatives = min(num_chunks - num_positives, int(round(negative_ratio * num_positives)))
+        logger.info(
+            f"{name}: sample {num_negatives} negative chunks per epoch (negative_ratio={negative_ratio}), "
+            f"{num_positives + num_negatives} of {num_chunks} chunks per epoch."
+        )
+
+
+def shuffle_by_buffer(examples: Iterable[Any], buffer_size: int, rng: np.random.RandomState) -> Iterator[Any]:
+    """以固定大小的 buffer 打亂 iterator：buffer 滿了之後，每讀進一筆就隨機輸出 buffer 中的一筆，記憶體用量只與 buffer_size 有關。"""
+    buffer = []
+    for example in examples:
+        if len(buffer) < buffer_size:
+            buffer.append(example)
+            continue
+        index = rng.randint(buffer_size)
+        yield buffer[index]
+        buffer[index] = example
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+class StreamingDataset(IterableDataset):
+    """逐筆讀取、打亂與轉換 chunk 的 IterableDataset，不需要先將所有 chunk 讀進記憶體，用於資料量大於記憶體的訓練資料。
+
+    Note:
+        每次 iterate（每個 epoch）重新呼叫 read_fun，以 seed + epoch 的 shuffle buffer 打亂 chunk 後再 tokenize，
+        記憶體用量只與 shuffle_buffer_size 有關，與資料量無關。同一份 document 的 chunk 是連續讀出的，
+        shuffle_buffer_size 需大於每份 document 的 chunk 數量才能打散。
+        多卡訓練時 Trainer 以 IterableDatasetShard 依 batch 分配資料，各卡的 seed 相同，因此讀到的順序一致、不會重複；
+        DataLoader 的 num_workers > 0 時，每個 worker 只處理第 worker_id 個起每 num_workers 筆 chunk，
+        且 epoch 須由 set_epoch 設定（worker 內的 epoch 不會傳回主程式）。
+
+    Args:
+        read_fun (Callable[[], Iterable[dict]]): 回傳切好的 chunk（例如 read_data_by_chunk），每個 epoch 呼叫一次。
+        convert_fun (Callable[[dict], dict]): chunk 轉成模型 input（例如 convert_to_uie_format）。
+        shuffle_buffer_size (int, optional): shuffle buffer 的 chunk 數量，0 表示不打亂（驗證）. Defaults to 0.
+        seed (int, optional): 亂數種子. Defaults to 0.
+        is_batched (bool, optional): convert_fun 是否一次轉換多筆 chunk（例如 convert_to_uie_format_batch）. Defaults to False.
+        batch_size (int, optional): is_batched=True 時每次交給 convert_fun 的 chunk 數量. Defaults to 256.
+    """
+
+    def __init__(
+        self,
+        read_fun: Callable[[], Iterable[dict]],
+        convert_fun: Callable[[dict], dict],
+        shuffle_buffer_size: int = 0,
+        seed: int = 0,
+        is_batched: bool = False,
+        batch_size: int = 256,
+    ) -> None:
+        self.read_fun = read_fun
+        self.convert_fun = convert_fun
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.is_batched = is_batched
+        self.batch_size = batch_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[Dict[str, list]]:
+        epoch = self.epoch
+        self.epoch += 1
+        examples = iter(self.read_fun())
+        worker_info = get_worker_info()
+        if worker_info is not None:
+            examples = islice(examples, worker_info.id, None, worker_info.num_workers)
+        if self.shuffle_buffer_size > 0:
+            examples = shuffle_by_buffer(examples, self.shuffle_buffer_size, np.random.RandomState(self.seed + epoch))
+        if not self.is_batched:
+            yield from map(self.convert_fun, examples)
+            return
+        while True:
+            block = list(islice(examples, self.batch_size))
+            if not block:
+                return
+            yield from self.convert_fun(block)
 
 
-def create_data_loader(dataset, mode="train", batch_size=16, trans_fn=None, shuffle=False):
+def create_data_loader(
+    dataset, mode="train", batch_size=16, trans_fn=None, shuffle=False, collate_fn=None, is_group_by_length=False
+):
     """
     Create dataloader.
     Args:
@@ -227,16 +1054,22 @@ def create_data_loader(dataset, mode="train", batch_size=16, trans_fn=None, shuf
         mode(obj:`str`, optional, defaults to obj:`train`): If mode is 'train', it will shuffle the dataset randomly.
         batch_size(obj:`int`, optional, defaults to 1): The sample number of a mini-batch.
         trans_fn(obj:`callable`, optional, defaults to `None`): function to convert a data sample to input ids, etc.
+        collate_fn(obj:`callable`, optional, defaults to `None`): function to merge samples into a batch, e.g. UIEDataCollator.
+        is_group_by_length(obj:`bool`, optional, defaults to `False`): Whether to batch samples of similar length (LengthGroupedBatchSampler).
     Returns:
         dataloader(obj:`paddle.io.DataLoader`): The dataloader which generates batches.
     """
     if trans_fn:
         dataset = dataset.map(trans_fn)
+    if isinstance(dataset, IterableDataset):
+        return DataLoader(dataset, batch_size=batch_size, collate_fn=collate_fn, return_list=True)
 
     shuffle = True if mode == "train" else False
-    if mode == "train":
+    if is_group_by_length:
+        sampler = LengthGroupedBatchSampler(get_feature_lengths(dataset), batch_size=batch_size, shuffle=shuffle)
+    elif mode == "train":
         sampler = DistributedBatchSampler(dataset=dataset, batch_size=batch_size, shuffle=shuffle)
     else:
         sampler = BatchSampler(dataset=dataset, batch_size=batch_size, shuffle=shuffle)
-    dataloader = DataLoader(dataset, batch_sampler=sampler, return_list=True)
+    dataloader = DataLoader(dataset, batch_sampler=sampler, collate_fn=collate_fn, return_list=True)
     return dataloader
@@ -8,3 +8,7 @@ class DataError(Exception):
 
 class PreprocessingError(Exception):
     pass
+
+
+class ServiceBusyError(Exception):
+    pass
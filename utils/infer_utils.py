@@ -0,0 +1,559 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from paddlenlp.taskflow.utils import dbc2sbc, get_id_and_prob
+from paddlenlp.utils.log import logger
+from paddlenlp.utils.tools import get_bool_ids_greater_than, get_span
+from .data_utils import CandidateFilter, get_content_end, get_sentence_windows, get_sliding_windows, get_token_windows
+
+
+class CrossDocumentPredictor:
+    """跨文件批次推論：將多篇文件、所有 prompt 切片後的 chunk 合併成完整的 batch 後再送進模型。
+
+    Note:
+        Taskflow 每次只對單一 prompt（schema 的一層）做預測，run_infer.py 又是一篇文件呼叫一次，
+        因此 batch_size 只在「同一篇文件、同一個 prompt」的 chunk 之間生效，長短不一的判決書會讓多數 batch 填不滿。
+        此類別沿用 Taskflow 建好的 tokenizer 與 predictor，自行切片、組 batch 與還原結果，
+        每篇文件的輸出格式與 `uie(text)` 相同，可直接交給 Processer.postprocess。
+
+        bucket_size > 0 時，每累積 bucket_size 個 chunk 就依長度排序後再切成 batch，並且只 padding 到 batch 內最長的 chunk，
+        長短差異很大的判決書可省下大量 padding 的計算；padding_efficiency（real tokens / padded tokens）可用來觀察節省的比例。
+
+        chunk_overlap > 0 時，相鄰 chunk 重疊 chunk_overlap 字（見 data_utils.get_sliding_windows），跨過 chunk 邊界的 entity
+        至少會完整出現在一個 chunk；重疊區域的預測會合併回原文位置（見 merge_overlapping_spans）。
+
+        is_chunk_by_sentence=True 時，每個 chunk 由完整的子句組成（見 data_utils.get_sentence_windows），
+        num_chunks / num_fixed_chunks 為與固定長度切法相比的 chunk 數量。
+
+        is_chunk_by_token=True 時，chunk 長度以 token 數量計算（見 data_utils.get_token_windows），每個 chunk 放滿 max_seq_len；
+        num_truncated_chunks 為被 tokenizer truncation 截斷的 chunk 數量（截斷部分不會有預測）。
+
+        candidate_patterns 有值時，不符合 entity type 規則的 chunk 不會送進模型（見 data_utils.CandidateFilter），結果視為沒有預測；
+        num_skipped_chunks 為略過的 chunk 數量（不計入 num_chunks）。
+
+    Args:
+        uie (Any): paddlenlp.Taskflow("information_extraction", ...)，僅支援 UIE 模型。
+        schema (List[str]): 所有 entity type（只支援一層的 schema）。
+        batch_size (int, optional): 每個 batch 的 chunk 數量. Defaults to 16.
+        bucket_size (int, optional): 依長度排序的 chunk 數量（會進位成 batch_size 的倍數），0 表示依原始順序並 padding 到 max_seq_len. Defaults to 0.
+        chunk_overlap (int, optional): 相鄰 chunk 重疊的字數，0 表示與 Taskflow 相同的切法. Defaults to 0.
+        is_chunk_by_sentence (bool, optional): 是否以完整的子句組成 chunk，不可與 chunk_overlap 同時使用. Defaults to False.
+        is_chunk_by_token (bool, optional): 是否以 token 數量切分 chunk，不可與 chunk_overlap、is_chunk_by_sentence 同時使用. Defaults to False.
+        candidate_patterns (Optional[Dict[str, List[str]]], optional): entity type 對應的 regex 列表，None 表示不略過任何 chunk. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        uie: Any,
+        schema: List[str],
+        batch_size: int = 16,
+        bucket_size: int = 0,
+        chunk_overlap: int = 0,
+        is_chunk_by_sentence: bool = False,
+        is_chunk_by_token: bool = False,
+        candidate_patterns: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        self.task = getattr(uie, "task_instance", uie)
+        if self.task._init_class != "UIE":
+            raise ValueError(f"Cross document batching only supports UIE models, but got {self.task._init_class}.")
+        if not all(isinstance(entity, str) for entity in schema):
+            raise ValueError("Cross document batching only supports flat schema, e.g. ['精神慰撫金額', '醫療費用'].")
+        if chunk_overlap and is_chunk_by_sentence:
+            raise ValueError("chunk_overlap is not supported when is_chunk_by_sentence=True.")
+        if is_chunk_by_token and (chunk_overlap or is_chunk_by_sentence):
+            raise ValueError("Token chunking does not support chunk_overlap or is_chunk_by_sentence.")
+
+        self.schema = list(schema)
+        self.prompts = [dbc2sbc(entity) for entity in self.schema]
+        self.batch_size = max(1, batch_size)
+        self.bucket_size = -(-bucket_size // self.batch_size) * self.batch_size if bucket_size > 0 else 0
+        self.chunk_overlap = chunk_overlap
+        self.is_chunk_by_sentence = is_chunk_by_sentence
+        self.is_chunk_by_token = is_chunk_by_token
+        self.max_seq_len = self.task._max_seq_len
+        self.position_prob = self.task._position_prob
+        self.tokenizer = self.task._tokenizer
+        self.candidate_filter = CandidateFilter(candidate_patterns) if candidate_patterns else None
+
+        self.num_docs = 0
+        self.num_chunks = 0
+        self.num_fixed_chunks = 0
+        self.num_truncated_chunks = 0
+        self.num_skipped_chunks = 0
+        self.num_batches = 0
+        self.num_real_tokens = 0
+        self.num_padded_tokens = 0
+
+    @property
+    def padding_efficiency(self) -> float:
+        """real tokens / padded tokens，越接近 1 表示浪費在 padding 的計算越少。"""
+        return self.num_real_tokens / max(1, self.num_padded_tokens)
+
+    def split(self, text: str, prompt: str) -> List[Tuple[int, str]]:
+        """依照 Taskflow 的格式（[CLS] Prompt [SEP] Content [SEP]）將文本切成 chunk。
+
+        Returns:
+            List[Tuple[int, str]]: (chunk 在原文的起始位置, chunk)。
+        """
+        if self.is_chunk_by_token:
+            max_content_tokens = self.max_seq_len - len(self.tokenizer.tokenize(prompt)) - 3
+            return [(start, text[start:end]) for start, end in get_token_windows(text, self.tokenizer, max_content_tokens)]
+        max_content_len = self.max_seq_len - len(prompt) - 3
+        if len(text) <= max_content_len:
+            return [(0, text)]
+        if self.is_chunk_by_sentence:
+            windows = get_sentence_windows(text, max_content_len)
+        else:
+            windows = get_sliding_windows(len(text), max_content_len, chunk_overlap=self.chunk_overlap)
+        return [(start, text[start:end]) for start, end in windows]
+
+    def predict(self, texts: Iterable[str]) -> Iterator[List[Dict[str, List[dict]]]]:
+        """依序產生每篇文件的推論結果。
+
+        Args:
+            texts (Iterable[str]): 文件（可為 generator，不會一次全部讀進記憶體）。
+
+        Yields:
+            Iterator[List[Dict[str, List[dict]]]]: 與 `uie(text)` 相同格式的結果，順序與輸入相同。
+        """
+        pending = deque()
+        doc_states = {}
+        next_doc = 0
+
+        for doc_index, text in enumerate(texts):
+            chunk_results, num_pending = [], 0
+            for prompt_index, prompt in enumerate(self.prompts):
+                chunks = self.split(text, prompt)
+                chunk_results.append([None] * len(chunks))
+                self.num_fixed_chunks += max(1, -(-len(text) // (self.max_seq_len - len(prompt) - 3)))
+                for chunk_index, (offset, chunk) in enumerate(chunks):
+                    if self.candidate_filter and not self.candidate_filter.is_candidate(self.schema[prompt_index], chunk):
+                        chunk_results[prompt_index][chunk_index] = []
+                        self.num_skipped_chunks += 1
+                        continue
+                    pending.append((doc_index, prompt_index, chunk_index, offset, chunk))
+                    num_pending += 1
+            doc_states[doc_index] = [num_pending, chunk_results]
+            self.num_docs += 1
+
+            while len(pending) >= (self.bucket_size or self.batch_size):
+                self._run_bucket([pending.popleft() for _ in range(self.bucket_size or self.batch_size)], doc_states)
+                while next_doc in doc_states and doc_states[next_doc][0] == 0:
+                    yield self._join(doc_states.pop(next_doc)[1])
+                    next_doc += 1
+
+        self._run_bucket(list(pending), doc_states)
+        while next_doc in doc_states:
+            yield self._join(doc_states.pop(next_doc)[1])
+            next_doc += 1
+
+    def _join(self, chunk_results: List[List[List[dict]]]) -> List[Dict[str, List[dict]]]:
+        result = {}
+        for entity, each_prompt_results in zip(self.schema, chunk_results):
+            first_result = next((each_chunk[0] for each_chunk in each_prompt_results if each_chunk), None)
+            if first_result is not None and "start" not in first_result and "end" not in first_result:
+                # Same as Taskflow._auto_joiner: spans only found in the prompt are treated as a classification result.
+                cls_options = {}
+                for each_chunk in each_prompt_results:
+                    if each_chunk:
+                        count, prob = cls_options.get(each_chunk[0]["text"], [0, 0])
+                        cls_options[each_chunk[0]["text"]] = [count + 1, prob + each_chunk[0]["probability"]]
+                cls_text, (count, prob) = max(cls_options.items(), key=lambda x: x[1])
+                spans = [{"text": cls_text, "probability": prob / count}]
+            elif self.chunk_overlap and len(each_prompt_results) > 1:
+                spans = merge_overlapping_spans(each_prompt_results)
+            else:
+                spans = [span for each_chunk in each_prompt_results for span in each_chunk]
+            if spans:
+                result[entity] = spans
+        return [result]
+
+    def _run_bucket(self, bucket: List[Tuple[int, int, int, int, str]], doc_states: Dict[int, list]) -> None:
+        if self.bucket_size:
+            bucket = sorted(bucket, key=lambda chunk: len(self.prompts[chunk[1]]) + len(chunk[4]))
+        for start in range(0, len(bucket), self.batch_size):
+            self._run_batch(bucket[start : start + self.batch_size], doc_states)
+
+    def _run_batch(self, batch: List[Tuple[int, int, int, int, str]], doc_states: Dict[int, list]) -> None:
+        prompts = [self.prompts[prompt_index] for _, prompt_index, _, _, _ in batch]
+        encoded_inputs = self.tokenizer(
+            text=prompts,
+            text_pair=[chunk for *_, chunk in batch],
+            truncation=True,
+            max_seq_len=self.max_seq_len,
+            padding="longest" if self.bucket_size else "max_length",
+            return_attention_mask=True,
+            return_position_ids=True,
+            return_dict=False,
+            return_offsets_mapping=True,
+        )
+        input_ids, token_type_ids, position_ids, attention_mask = (
+            np.array([each[key] for each in encoded_inputs], dtype="int64")
+            for key in ("input_ids", "token_type_ids", "position_ids", "attention_mask")
+        )
+        start_prob, end_prob = self._run_model(input_ids, token_type_ids, position_ids, attention_mask)
+        if self.bucket_size:
+            # The padding length depends on the batch, so padded positions must never become spans.
+            start_prob, end_prob = start_prob * attention_mask, end_prob * attention_mask
+        start_ids_list = get_bool_ids_greater_than(start_prob.tolist(), limit=self.position_prob, return_prob=True)
+        end_ids_list = get_bool_ids_greater_than(end_prob.tolist(), limit=self.position_prob, return_prob=True)
+
+        for (doc_index, prompt_index, chunk_index, offset, chunk), prompt, each_encoded, start_ids, end_ids in zip(
+            batch, prompts, encoded_inputs, start_ids_list, end_ids_list
+        ):
+            offset_mapping = [list(mapping) for mapping in each_encoded["offset_mapping"]]
+            self.num_truncated_chunks += get_content_end(offset_mapping) < len(chunk.rstrip())
+            sentence_ids, probs = get_id_and_prob(get_span(start_ids, end_ids, with_prob=True), offset_mapping)
+            chunk_result = []
+            for (start, end), prob in zip(sentence_ids, probs):
+                if start < 0 and end >= 0:
+                    continue
+                if end < 0:
+                    start += len(prompt) + 1
+                    end += len(prompt) + 1
+                    chunk_result.append({"text": prompt[start:end], "probability": prob})
+                else:
+                    chunk_result.append(
+                        {"text": chunk[start:end], "start": start + offset, "end": end + offset, "probability": prob}
+                    )
+            doc_states[doc_index][1][prompt_index][chunk_index] = chunk_result
+            doc_states[doc_index][0] -= 1
+
+        self.num_chunks += len(batch)
+        self.num_batches += 1
+        self.num_real_tokens += sum(sum(each["attention_mask"]) for each in encoded_inputs)
+        self.num_padded_tokens += sum(len(each["input_ids"]) for each in encoded_inputs)
+
+    def _run_model(
+        self, input_ids: np.ndarray, token_type_ids: np.ndarray, position_ids: np.ndarray, attention_mask: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if self.task._predictor_type == "paddle-inference":
+            for handle, data in zip(self.task.input_handles, (input_ids, token_type_ids, position_ids, attention_mask)):
+                handle.copy_from_cpu(data)
+            self.task.predictor.run()
+            return self.task.output_handle[0].copy_to_cpu(), self.task.output_handle[1].copy_to_cpu()
+        start_prob, end_prob = self.task.predictor.run(
+            None,
+            {
+                "input_ids": input_ids,
+                "token_type_ids": token_type_ids,
+                "position_ids": position_ids,
+                "attention_mask": attention_mask,
+            },
+        )
+        return start_prob, end_prob
+
+
+def merge_overlapping_spans(chunk_spans: List[List[dict]]) -> List[dict]:
+    """合併重疊 chunk 的預測（start/end 為原文位置）：不同 chunk 的 span 只要位置有重疊，只保留 probability 最高的一個。
+
+    Note:
+        同一個 chunk 內互相重疊的 span 不會被合併（與 Taskflow 的結果相同）；沒有 start/end 的結果（只出現在 prompt）直接保留。
+
+    Args:
+        chunk_spans (List[List[dict]]): 依 chunk 順序排列的每個 chunk 的 span。
+
+    Returns:
+        List[dict]: 依 (start, end) 排序的 span。
+    """
+    kept = []
+    for chunk_index, spans in enumerate(chunk_spans):
+        for span in spans:
+            if "start" not in span:
+                kept.append((chunk_index, span))
+                continue
+            overlapped = [
+                i
+                for i, (other_chunk_index, other) in enumerate(kept)
+                if other_chunk_index != chunk_index
+                and "start" in other
+                and span["start"] < other["end"]
+                and other["start"] < span["end"]
+            ]
+            if any(kept[i][1]["probability"] >= span["probability"] for i in overlapped):
+                continue
+            for i in reversed(overlapped):
+                del kept[i]
+            kept.append((chunk_index, span))
+    return sorted((span for _, span in kept), key=lambda span: (span.get("start", -1), span.get("end", -1)))
+
+
+class TextRegularizer:
+    """一次掃描移除所有 regularized_token，並可將移除後文本上的位置還原成原始文本的位置。
+
+    Note:
+        所有 token 編譯成單一 regex，每篇文件只掃描一次（O(n)），結果與逐一 `re.sub` 相同
+        （除非移除某個 token 後恰好拼出另一個 token）。
+        regularize 在同一次 `sub` 中記錄被移除字元在原始文本的位置（deletions），remap_result 直接取用，不再掃描文本；
+        只保留最近 max_cached_texts 篇文件的 deletions。找不到時（例如 regularize 在其他 process 執行）才重新掃描。
+
+    Args:
+        regularized_token (List[str]): 要移除的 regex。
+        max_cached_texts (int, optional): 最多保留幾篇文件的 deletions. Defaults to 1024.
+    """
+
+    def __init__(self, regularized_token: List[str], max_cached_texts: int = 1024) -> None:
+        self.pattern = re.compile("|".join(f"(?:{token})" for token in regularized_token))
+        self.max_cached_texts = max_cached_texts
+        self._deletions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Deletions recorded in a worker process are not visible to the main process, do not ship them.
+        state = self.__dict__.copy()
+        state["_deletions"] = OrderedDict()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def regularize(self, text: str) -> str:
+        deletions = []
+
+        def record_deletion(match: re.Match) -> str:
+            deletions.extend(range(match.start(), match.end()))
+            return ""
+
+        regularized_text = self.pattern.sub(record_deletion, text)
+        with self._lock:
+            self._deletions[text] = np.array(deletions, dtype="int64")
+            self._deletions.move_to_end(text)
+            while len(self._deletions) > self.max_cached_texts:
+                self._deletions.popitem(last=False)
+        return regularized_text
+
+    def deletions(self, text: str) -> np.ndarray:
+        """被移除的字元在原始文本的位置（遞增），優先使用 regularize 記錄的結果。"""
+        with self._lock:
+            deletions = self._deletions.get(text)
+        if deletions is not None:
+            return deletions
+        deletions = [i for match in self.pattern.finditer(text) for i in range(match.start(), match.end())]
+        return np.array(deletions, dtype="int64")
+
+    def remap_result(self, text: str, result: List[Dict[str, List[dict]]]) -> List[Dict[str, List[dict]]]:
+        """將 `uie(regularize(text))` 結果的 start/end 還原成原始文本 text 的位置。
+
+        Args:
+            text (str): 原始文本（regularize 之前）。
+            result (List[Dict[str, List[dict]]]): 與 `uie(text)` 相同格式的推論結果。
+
+        Returns:
+            List[Dict[str, List[dict]]]: start/end 為原始文本位置的推論結果，`text[start:end]` 即為原文片段
+            （片段中間被移除的字元會保留，因此可能與結果的 text 不完全相同）。
+        """
+        deletions = self.deletions(text)
+        if len(deletions) == 0:
+            return result
+        # the regularized position where each deleted character would have been
+        deleted_positions = deletions - np.arange(len(deletions))
+
+        def to_original(position: int) -> int:
+            return position + int(np.searchsorted(deleted_positions, position, side="right"))
+
+        remapped_result = []
+        for each_result in result:
+            remapped = {}
+            for entity, spans in each_result.items():
+                remapped[entity] = []
+                for span in spans:
+                    span = dict(span)
+                    if "start" in span and "end" in span:
+                        start, end = span["start"], span["end"]
+                        span["start"] = to_original(start)
+                        span["end"] = to_original(end - 1) + 1 if end > start else span["start"]
+                    remapped[entity].append(span)
+            remapped_result.append(remapped)
+        return remapped_result
+
+
+def write_inference_results_by_line(
+    results: Iterable[Tuple[str, List[Dict[str, List[dict]]]]], save_path: str, flush_steps: int = 100
+) -> int:
+    """逐篇寫出推論結果（JSON Lines），每行為 {"Content": ..., "InferenceResults": ...}。
+
+    Note:
+        每寫完 flush_steps 篇就 flush 一次，程式中途中斷時已寫出的結果不會遺失。
+
+    Args:
+        results (Iterable[Tuple[str, List[Dict[str, List[dict]]]]]): (原始文本, 推論結果)，可為 generator。
+        save_path (str): 輸出檔案路徑。
+        flush_steps (int, optional): 每幾篇 flush 一次. Defaults to 100.
+
+    Returns:
+        int: 寫出的文件數量。
+    """
+    num_docs = 0
+    with open(save_path, "w", encoding="utf8") as f:
+        for content, result in results:
+            f.write(json.dumps({"Content": content, "InferenceResults": result}, ensure_ascii=False) + "\n")
+            num_docs += 1
+            if num_docs % max(1, flush_steps) == 0:
+                f.flush()
+    return num_docs
+
+
+TABULAR_SPAN_COLUMNS = ["doc_id", "entity", "text", "start", "end", "probability"]
+
+
+def write_inference_results_as_table(
+    results: Iterable[Tuple[str, List[Dict[str, List[dict]]]]],
+    save_path: str,
+    schema: List[str],
+    layout: str = "doc",
+    flush_steps: int = 100,
+) -> int:
+    """逐篇寫出推論結果（CSV），記憶體用量只與 flush_steps 有關。
+
+    Note:
+        - layout="doc": 每篇文件一列，欄位為 doc_id 與每個 entity type，值為該 entity 機率最高的 text（沒有結果則為空），
+          可直接交給 `tools/regularize_money_from_csv_results.py`。建議搭配 `--select_strategy max`。
+        - layout="span": 每個抽取結果一列，欄位為 TABULAR_SPAN_COLUMNS，select_key 沒有保留的欄位為空。
+        檔案以 utf_8_sig 編碼，與 regularize_money_from_csv_results.py 的輸出相同，可直接以 Excel 開啟。
+
+    Args:
+        results (Iterable[Tuple[str, List[Dict[str, List[dict]]]]]): (原始文本, 推論結果)，可為 generator。
+        save_path (str): 輸出檔案路徑。
+        schema (List[str]): 所有 entity type（layout="doc" 的欄位）。
+        layout (str, optional): "doc" 或 "span". Defaults to "doc".
+        flush_steps (int, optional): 每幾篇寫出並 flush 一次. Defaults to 100.
+
+    Raises:
+        ValueError: layout 不是 "doc" 或 "span"。
+
+    Returns:
+        int: 寫出的文件數量。
+    """
+    if layout not in ("doc", "span"):
+        raise ValueError(f"layout should be 'doc' or 'span', but got {layout}.")
+
+    num_docs = 0
+    rows = []
+    with open(save_path, "w", encoding="utf_8_sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["doc_id"] + schema if layout == "doc" else TABULAR_SPAN_COLUMNS)
+        for _, result in results:
+            entities = result[0] if result else {}
+            if layout == "doc":
+                rows.append([num_docs] + [_get_best_text(entities.get(entity, [])) for entity in schema])
+            else:
+                for entity, spans in entities.items():
+                    for span in spans:
+                        rows.append([num_docs, entity] + [span.get(key, "") for key in TABULAR_SPAN_COLUMNS[2:]])
+            num_docs += 1
+            if num_docs % max(1, flush_steps) == 0:
+                writer.writerows(rows)
+                f.flush()
+                rows = []
+        writer.writerows(rows)
+    return num_docs
+
+
+def _get_best_text(spans: List[dict]) -> str:
+    if not spans:
+        return ""
+    return max(spans, key=lambda span: span.get("probability", 0)).get("text", "")
+
+
+def get_data_checksum(data_file: str, text_list: Optional[List[str]] = None, block_size: int = 1 << 20) -> str:
+    """推論資料的 sha256，有 text_list 時以 text_list 計算，否則以 data_file 的內容計算。"""
+    checksum = hashlib.sha256()
+    if text_list:
+        checksum.update(json.dumps(text_list, ensure_ascii=False).encode("utf8"))
+        return checksum.hexdigest()
+    with open(data_file, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+class ResumableResultWriter:
+    """可中斷、可續跑的推論結果寫出器（JSON Lines，格式與 write_inference_results_by_line 相同）。
+
+    Note:
+        每寫完 flush_steps 篇，會先將輸出檔 fsync，再更新輸出檔旁的進度檔（`<save_path>.progress.json`），
+        內容為已完成的文件數量、當時輸出檔的大小與輸入資料的 checksum。
+        重新執行時，若輸入資料的 checksum 相同，會把輸出檔截斷到最後一次記錄的大小（丟掉寫到一半的結果），
+        並從 num_finished_docs 篇之後繼續 append；checksum 不同則重新開始。
+
+    Args:
+        save_path (str): 輸出檔案路徑。
+        data_checksum (str): 輸入資料的 checksum（通常來自 get_data_checksum）。
+        flush_steps (int, optional): 每幾篇記錄一次進度. Defaults to 100.
+    """
+
+    def __init__(self, save_path: str, data_checksum: str, flush_steps: int = 100) -> None:
+        self.save_path = save_path
+        self.progress_path = save_path + ".progress.json"
+        self.data_checksum = data_checksum
+        self.flush_steps = max(1, flush_steps)
+        self.num_finished_docs = 0
+        self.output_size = 0
+
+        progress = self._load_progress()
+        if progress is None:
+            return
+        if progress["data_checksum"] != data_checksum:
+            logger.warning(f"Input data is changed since {self.progress_path} was written. Start over.")
+        elif not os.path.exists(save_path) or os.path.getsize(save_path) < progress["output_size"]:
+            logger.warning(f"{save_path} is missing or shorter than recorded in {self.progress_path}. Start over.")
+        else:
+            self.num_finished_docs = progress["num_docs"]
+            self.output_size = progress["output_size"]
+            logger.info(f"Resume from {self.progress_path}: {self.num_finished_docs} documents are finished.")
+
+    def write(self, results: Iterable[Tuple[str, List[Dict[str, List[dict]]]]]) -> int:
+        """接續寫出尚未完成的推論結果。
+
+        Args:
+            results (Iterable[Tuple[str, List[Dict[str, List[dict]]]]]): 略過已完成文件後的 (原始文本, 推論結果)。
+
+        Returns:
+            int: 輸出檔內的文件總數（包含先前已完成的文件）。
+        """
+        with open(self.save_path, "r+b" if self.output_size else "wb") as f:
+            f.truncate(self.output_size)
+            f.seek(self.output_size)
+            num_docs = self.num_finished_docs
+            for content, result in results:
+                line = json.dumps({"Content": content, "InferenceResults": result}, ensure_ascii=False) + "\n"
+                f.write(line.encode("utf8"))
+                num_docs += 1
+                if num_docs % self.flush_steps == 0:
+                    self._commit(f, num_docs)
+            self._commit(f, num_docs, is_finished=True)
+        return self.num_finished_docs
+
+    def _commit(self, f: Any, num_docs: int, is_finished: bool = False) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+        self.num_finished_docs = num_docs
+        self.output_size = f.tell()
+        progress = {
+            "data_checksum": self.data_checksum,
+            "num_docs": num_docs,
+            "output_size": self.output_size,
+            "is_finished": is_finished,
+        }
+        tmp_path = self.progress_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf8") as progress_file:
+            json.dump(progress, progress_file)
+        os.replace(tmp_path, self.progress_path)
+
+    def _load_progress(self) -> Optional[dict]:
+        if not os.path.exists(self.progress_path):
+            return None
+        try:
+            with open(self.progress_path, "r", encoding="utf8") as f:
+                return json.load(f)
+        except ValueError as e:
+            logger.warning(f"Cannot read {self.progress_path}: {e}. Start over.")
+            return None
@@ -1,5 +1,12 @@
+from typing import List, Optional, Tuple
+import numpy as np
 from paddle import nn, cast
+from paddle.io import DataLoader, Dataset, Sampler
 from paddlenlp.metrics import SpanEvaluator
+from paddlenlp.trainer import Trainer
+from paddlenlp.trainer.trainer_utils import EvalLoopOutput
+from paddlenlp.utils.log import logger
+from .data_utils import LengthGroupedBatchSampler, NegativeSamplingBatchSampler, get_feature_lengths, get_positive_mask
 
 loss_function = nn.BCELoss()
 
@@ -25,3 +32,189 @@ def compute_metrics(p):
     precision, recall, f1 = metric.accumulate()
     metric.reset()
     return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def get_span_counts(
+    start_probs: np.ndarray,
+    end_probs: np.ndarray,
+    gold_start_ids: np.ndarray,
+    gold_end_ids: np.ndarray,
+    limit: float = 0.5,
+) -> np.ndarray:
+    """計算每筆資料 SpanEvaluator.compute 的 num_correct、num_infer、num_label，整個 batch 以 NumPy 一次完成。
+
+    Note:
+        SpanEvaluator.compute 只回傳整個 batch 的總和，且以 Python 迴圈逐一比較每個位置；
+        逐筆的結果可以依 entity_id 等分組加總（np.add.at），只需計算一次。
+        預測與標註的 span 都以 get_batch_spans 解出，(row, start, end) 編碼成整數後以 np.intersect1d 比對，
+        再以 np.bincount 依 row 計數，沒有逐筆的 Python 迴圈。
+
+    Args:
+        start_probs (np.ndarray): 模型輸出的 start 機率，shape 為 [batch_size, seq_len]。
+        end_probs (np.ndarray): 模型輸出的 end 機率。
+        gold_start_ids (np.ndarray): start_positions。
+        gold_end_ids (np.ndarray): end_positions。
+        limit (float, optional): 機率門檻，與 SpanEvaluator 相同. Defaults to 0.5.
+
+    Returns:
+        np.ndarray: shape 為 [batch_size, 3]，每筆資料的 (num_correct, num_infer, num_label)。
+    """
+    batch_size, seq_len = start_probs.shape
+
+    def encode(rows: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        # get_span pairs each end with at most one start, so the spans of a row are unique.
+        return (rows.astype("int64") * seq_len + starts) * seq_len + ends
+
+    pred_rows, pred_starts, pred_ends = get_batch_spans(start_probs, end_probs, limit=limit)
+    gold_rows, gold_starts, gold_ends = get_batch_spans(gold_start_ids, gold_end_ids, limit=limit)
+    correct_keys = np.intersect1d(
+        encode(pred_rows, pred_starts, pred_ends), encode(gold_rows, gold_starts, gold_ends), assume_unique=True
+    )
+    counts = np.zeros((batch_size, 3), dtype="int64")
+    counts[:, 0] = np.bincount(correct_keys // (seq_len * seq_len), minlength=batch_size)
+    counts[:, 1] = np.bincount(pred_rows, minlength=batch_size)
+    counts[:, 2] = np.maximum((gold_start_ids > limit).sum(axis=1), (gold_end_ids > limit).sum(axis=1))
+    return counts
+
+
+def get_batch_spans(
+    start_probs: np.ndarray, end_probs: np.ndarray, limit: float = 0.5
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """一次解出整個 batch 的 span，結果與逐筆呼叫 get_bool_ids_greater_than 與 get_span 相同。
+
+    Note:
+        get_span 依序配對 start 與 end：每個 end 配對「前一個 end 之後、不超過此 end」的最後一個 start。
+        將 (row, token) 攤平成 row * seq_len + token 後，以 np.searchsorted 一次完成所有 row 的配對。
+
+    Args:
+        start_probs (np.ndarray): 模型輸出的 start 機率，shape 為 [batch_size, seq_len]。
+        end_probs (np.ndarray): 模型輸出的 end 機率。
+        limit (float, optional): 機率門檻. Defaults to 0.5.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: 每個 span 的 row、start token index、end token index。
+    """
+    seq_len = start_probs.shape[1]
+    starts = np.flatnonzero(start_probs > limit)
+    ends = np.flatnonzero(end_probs > limit)
+    # The previous end in the same row, or the position before the row for its first end.
+    end_rows = ends // seq_len
+    previous_ends = np.concatenate([[-1], ends[:-1]])
+    is_row_start = np.concatenate([[True], end_rows[1:] != end_rows[:-1]])
+    previous_ends = np.where(is_row_start, end_rows * seq_len - 1, previous_ends)
+    pointers = np.searchsorted(starts, ends, side="right") - 1
+    candidates = starts[np.clip(pointers, 0, None)] if len(starts) else np.zeros_like(ends)
+    is_paired = (pointers >= 0) & (candidates > previous_ends)
+    return end_rows[is_paired], candidates[is_paired] % seq_len, ends[is_paired] % seq_len
+
+
+class UIETrainer(Trainer):
+    """paddlenlp.trainer.Trainer，可將長度相近的資料放在同一個 batch（見 LengthGroupedBatchSampler），
+    每個 epoch 抽樣訓練用的 negative chunk（見 NegativeSamplingBatchSampler），以及驗證時逐 batch 累加 span 數量。
+
+    Note:
+        只在單卡（world_size <= 1）時使用上述 sampler 與逐 batch 累加，多卡時仍使用 Trainer 預設的 DistributedBatchSampler 與 compute_metrics。
+        驗證時依長度由長到短組 batch，trainer.predict 的 predictions 順序因此與資料集不同。
+        is_accumulate_metrics=True 時，每個 batch 只保留 (num_correct, num_infer, num_label)（見 get_span_counts），
+        不會串接整個驗證集的機率與 label，指標與 compute_metrics 相同；evaluate / predict 的 predictions 與 label_ids 為 None。
+
+    Args:
+        is_group_by_length (bool, optional): 是否依長度組 batch，搭配 UIEDataCollator 減少 padding. Defaults to False.
+        negative_ratio (Optional[float], optional): 每個 epoch negative 與 positive chunk 數量的比例，None 表示使用所有 chunk. Defaults to None.
+        is_accumulate_metrics (bool, optional): 是否逐 batch 累加 SpanEvaluator 的數量計算 precision、recall、F1，取代 compute_metrics. Defaults to False.
+        train_positive_mask (Optional[List[bool]], optional): 訓練資料每筆是否有 result，None 時由 get_positive_mask 計算. Defaults to None.
+        **kwargs: 見 paddlenlp.trainer.Trainer。
+    """
+
+    def __init__(
+        self,
+        *args,
+        is_group_by_length: bool = False,
+        negative_ratio: Optional[float] = None,
+        is_accumulate_metrics: bool = False,
+        train_positive_mask: Optional[List[bool]] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.train_positive_mask = train_positive_mask
+        self.is_group_by_length = is_group_by_length
+        self.negative_ratio = negative_ratio
+        self.is_accumulate_metrics = is_accumulate_metrics and self.args.world_size <= 1
+        self.span_counts = None
+        if (is_group_by_length or negative_ratio is not None or is_accumulate_metrics) and self.args.world_size > 1:
+            logger.warning(
+                "is_group_by_length, negative_ratio and is_accumulate_metrics only apply to single device training, ignored."
+            )
+
+    def _get_train_sampler(self) -> Optional[Sampler]:
+        if self.args.world_size > 1 or self.train_dataset is None:
+            return super()._get_train_sampler()
+        if self.negative_ratio is not None:
+            return NegativeSamplingBatchSampler(
+                self.train_positive_mask
+                if self.train_positive_mask is not None
+                else get_positive_mask(self.train_dataset),
+                batch_size=self.args.per_device_train_batch_size,
+                negative_ratio=self.negative_ratio,
+                lengths=get_feature_lengths(self.train_dataset) if self.is_group_by_length else None,
+                drop_last=self.args.dataloader_drop_last,
+                seed=self.args.seed,
+            )
+        if not self.is_group_by_length:
+            return super()._get_train_sampler()
+        return LengthGroupedBatchSampler(
+            get_feature_lengths(self.train_dataset),
+            batch_size=self.args.per_device_train_batch_size,
+            shuffle=True,
+            drop_last=self.args.dataloader_drop_last,
+            seed=self.args.seed,
+        )
+
+    def _get_eval_sampler(self, eval_dataset: Dataset) -> Sampler:
+        if not self.is_group_by_length or self.args.world_size > 1:
+            return super()._get_eval_sampler(eval_dataset)
+        return LengthGroupedBatchSampler(
+            get_feature_lengths(eval_dataset), batch_size=self.args.per_device_eval_batch_size, shuffle=False
+        )
+
+    def prediction_step(
+        self, model: nn.Layer, inputs: dict, prediction_loss_only: bool, ignore_keys: Optional[List[str]] = None
+    ):
+        if not self.is_accumulate_metrics or prediction_loss_only:
+            return super().prediction_step(model, inputs, prediction_loss_only, ignore_keys=ignore_keys)
+        loss, (start_prob, end_prob), labels = super().prediction_step(model, inputs, False, ignore_keys=ignore_keys)
+        if labels is not None:
+            start_ids, end_ids = labels
+            counts = get_span_counts(start_prob.numpy(), end_prob.numpy(), start_ids.numpy(), end_ids.numpy())
+            self.span_counts = counts.sum(axis=0) + (0 if self.span_counts is None else self.span_counts)
+        # Nothing but the loss is gathered, the metrics come from self.span_counts.
+        return loss, None, None
+
+    def evaluation_loop(
+        self,
+        dataloader: DataLoader,
+        description: str,
+        prediction_loss_only: Optional[bool] = None,
+        ignore_keys: Optional[List[str]] = None,
+        metric_key_prefix: str = "eval",
+        max_eval_iters: Optional[int] = -1,
+    ) -> EvalLoopOutput:
+        if not self.is_accumulate_metrics:
+            return super().evaluation_loop(
+                dataloader, description, prediction_loss_only, ignore_keys, metric_key_prefix, max_eval_iters
+            )
+        self.span_counts = None
+        output = super().evaluation_loop(
+            dataloader, description, prediction_loss_only, ignore_keys, metric_key_prefix, max_eval_iters
+        )
+        if self.span_counts is None:
+            return output
+        metric = SpanEvaluator()
+        metric.update(*self.span_counts)
+        precision, recall, f1 = metric.accumulate()
+        metrics = {
+            f"{metric_key_prefix}_precision": precision,
+            f"{metric_key_prefix}_recall": recall,
+            f"{metric_key_prefix}_f1": f1,
+        }
+        return output._replace(metrics={**metrics, **output.metrics})
@@ -0,0 +1,204 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from paddlenlp.utils.log import logger
+from .exceptions import ServiceBusyError
+
+
+class MicroBatcher:
+    """將同時送進來的多個 request 合併成 micro-batch 後，再一次交給模型推論。
+
+    Note:
+        背景 thread 取出第一個 request 後，最多再等待 max_wait_ms，期間到達的 request 都會併進同一個 batch，
+        直到文件數量達到 max_batch_docs。等待中的 request 超過 max_queue_size 時，submit 直接丟出 ServiceBusyError（backpressure）。
+
+    Args:
+        predict_fun (Callable[[List[str]], List[list]]): 推論函式，回傳與輸入相同順序的 Taskflow 原始結果。
+        max_batch_docs (int, optional): 每個 micro-batch 最多的文件數量. Defaults to 32.
+        max_wait_ms (float, optional): 湊 batch 的最長等待時間（毫秒）. Defaults to 10.
+        max_queue_size (int, optional): 最多等待中的 request 數量. Defaults to 256.
+        num_latencies (int, optional): 計算 p50/p99 時保留最近幾筆 latency. Defaults to 10000.
+    """
+
+    def __init__(
+        self,
+        predict_fun: Callable[[List[str]], List[list]],
+        max_batch_docs: int = 32,
+        max_wait_ms: float = 10,
+        max_queue_size: int = 256,
+        num_latencies: int = 10000,
+    ) -> None:
+        self.predict_fun = predict_fun
+        self.max_batch_docs = max(1, max_batch_docs)
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue(maxsize=max_queue_size)
+        self.latencies = deque(maxlen=num_latencies)
+        self.num_requests = 0
+        self.num_rejected = 0
+        self.num_batches = 0
+        self.num_docs = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """送出一個 request，回傳的 Future 會在推論完成後得到與 texts 相同順序的結果。
+
+        Raises:
+            ServiceBusyError: 等待中的 request 已滿。
+        """
+        future = Future()
+        try:
+            self.requests.put_nowait((texts, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.num_rejected += 1
+            raise ServiceBusyError(f"Too many pending requests (max_queue_size={self.requests.maxsize}).")
+        return future
+
+    def predict(self, texts: List[str], timeout: Optional[float] = None) -> List[list]:
+        return self.submit(texts).result(timeout=timeout)
+
+    def statistics(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            return {
+                "queue_depth": self.requests.qsize(),
+                "num_requests": self.num_requests,
+                "num_rejected": self.num_rejected,
+                "num_batches": self.num_batches,
+                "avg_batch_docs": self.num_docs / max(1, self.num_batches),
+                "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            }
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self.requests.get()]
+            num_docs = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while num_docs < self.max_batch_docs:
+                try:
+                    request = self.requests.get(timeout=max(0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                num_docs += len(request[0])
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list) -> None:
+        texts = [text for each_texts, _, _ in batch for text in each_texts]
+        try:
+            results = list(self.predict_fun(texts))
+        except Exception as e:
+            logger.error(f"Inference Error: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        start = 0
+        now = time.perf_counter()
+        for each_texts, future, submit_time in batch:
+            future.set_result(results[start : start + len(each_texts)])
+            start += len(each_texts)
+            with self._lock:
+                self.latencies.append(now - submit_time)
+        with self._lock:
+            self.num_requests += len(batch)
+            self.num_batches += 1
+            self.num_docs += len(texts)
+
+
+def create_inference_server(
+    host: str,
+    port: int,
+    batcher: MicroBatcher,
+    postprocess_fun_factory: Callable[[dict], Callable[[list], list]],
+    preprocess_fun: Callable[[str], str] = lambda x: x,
+    offset_remap_fun: Optional[Callable[[str, list], list]] = None,
+    request_timeout: float = 600,
+) -> ThreadingHTTPServer:
+    """建立推論服務（JSON over HTTP）。
+
+    Note:
+        - POST /predict: {"texts": [...], "select_strategy": "max", "select_key": ["text", "probability"], "threshold": 0.5}
+          回傳 {"results": [...]}，每篇文件的格式與 run_infer.inference 相同。select_* 可省略（使用服務的預設值）。
+        - GET /stats: queue 長度、latency p50/p99 等統計。
+        - GET /health: 服務狀態。
+
+    Args:
+        host (str): 服務位址。
+        port (int): 服務 port。
+        batcher (MicroBatcher): 共用的 micro-batcher。
+        postprocess_fun_factory (Callable[[dict], Callable[[list], list]]): 依照 request 內容建立 postprocess 函式。
+        preprocess_fun (Callable[[str], str], optional): 前處理. Defaults to lambda x: x.
+        offset_remap_fun (Callable[[str, list], list], optional): 將 start/end 還原成原始文本的位置. Defaults to None.
+        request_timeout (float, optional): 每個 request 最長等待秒數. Defaults to 600.
+
+    Returns:
+        ThreadingHTTPServer: 呼叫 serve_forever() 開始服務。
+    """
+
+    class InferenceRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == "/stats":
+                self._send(200, batcher.statistics())
+            elif self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": f"Path not found: {self.path}."})
+
+        def do_POST(self) -> None:
+            if self.path != "/predict":
+                self._send(404, {"error": f"Path not found: {self.path}."})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                texts = body["texts"]
+                if isinstance(texts, str) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts should be a list of strings.")
+                postprocess_fun = postprocess_fun_factory(body)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self._send(400, {"error": f"Invalid request: {e}"})
+                return
+
+            try:
+                results = batcher.predict([preprocess_fun(text) for text in texts], timeout=request_timeout)
+            except ServiceBusyError as e:
+                self._send(503, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send(500, {"error": f"Inference Error: {e}"})
+                return
+
+            try:
+                if offset_remap_fun:
+                    results = [offset_remap_fun(text, result) for text, result in zip(texts, results)]
+                results = postprocess_fun(results)
+            except (KeyError, TypeError) as e:
+                # Raised by postprocess_fun for select_key / threshold that do not fit the results.
+                self._send(400, {"error": f"Invalid request: {e}"})
+                return
+            except Exception as e:
+                self._send(500, {"error": f"Inference Error: {e}"})
+                return
+            self._send(200, {"results": results})
+
+        def _send(self, status: int, content: dict) -> None:
+            data = json.dumps(content, ensure_ascii=False).encode("utf8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), InferenceRequestHandler)